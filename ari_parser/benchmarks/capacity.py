@@ -0,0 +1,282 @@
+"""
+Measure resources spent per account to size hosts.
+
+Every account count runs `crawler.main` against the mock portal and
+    the fake Bot API in a separate process, while Chrome, chromedriver
+    and Python processes are sampled. The report shows marginal cost
+    of an account and the count at which scan latency degrades.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.capacity -a 1 2 4 8 -p 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import psutil
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from benchmarks.mock_portal import (
+    MockPortal, add_arguments, config_from_arguments
+)
+
+RESOURCES = ('rss, MiB', 'cpu, %', 'threads', 'fds')
+
+
+def process_stats(processes: list[psutil.Process]) -> dict[str, float]:
+    """
+    Sum resources of the processes, gone ones are skipped.
+
+    Returns:
+        dict[str, float]: RSS in bytes, CPU time in seconds,
+            threads and open file descriptors (handles on Windows)
+    """
+    stats = {'rss': 0, 'cpu': 0.0, 'threads': 0, 'fds': 0}
+    for process in processes:
+        try:
+            with process.oneshot():
+                cpu = process.cpu_times()
+                stats['rss'] += process.memory_info().rss
+                stats['cpu'] += cpu.user + cpu.system
+                stats['threads'] += process.num_threads()
+                stats['fds'] += (
+                    process.num_fds() if hasattr(process, 'num_fds')
+                    else process.num_handles()
+                )
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return stats
+
+
+def debugging_port(processes: list[psutil.Process]) -> Optional[int]:
+    for process in processes:
+        try:
+            for arg in process.cmdline():
+                if arg.startswith('--remote-debugging-port='):
+                    return int(arg.split('=')[1])
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return None
+
+
+def sample(python: psutil.Process) -> dict[str, dict[str, float]]:
+    """
+    Sample Python process and the browsers started by it.
+    Browsers are told apart by their remote debugging port,
+        which is unique per account.
+
+    Returns:
+        dict[str, dict[str, float]]: 'python', 'chromedriver', 'chrome'
+            and 'account <id>' mapped to `process_stats()`
+    """
+    result = {'python': process_stats([python])}
+    drivers, browsers = [], []
+    for driver in python.children():
+        try:
+            if 'chromedriver' not in driver.name().lower():
+                continue
+            chrome = driver.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        drivers.append(driver)
+        browsers.extend(chrome)
+        if (port := debugging_port(chrome)) is not None:
+            result[f'account {port - 9222}'] = process_stats([driver] + chrome)
+    result['chromedriver'] = process_stats(drivers)
+    result['chrome'] = process_stats(browsers)
+    return result
+
+
+def summarize(
+            samples: list[dict[str, dict[str, float]]], seconds: float
+        ) -> dict[str, dict[str, float]]:
+    """
+    Average RSS, threads and descriptors over the samples,
+        CPU time is turned into utilization.
+    """
+    summary = {}
+    for group in samples[-1]:
+        values = [x[group] for x in samples if group in x]
+        summary[group] = {
+            'rss, MiB': sum(x['rss'] for x in values) / len(values) / 2 ** 20,
+            'cpu, %': (
+                values[-1]['cpu'] - values[0]['cpu']
+            ) / seconds * 100,
+            'threads': sum(x['threads'] for x in values) / len(values),
+            'fds': sum(x['fds'] for x in values) / len(values),
+        }
+    return summary
+
+
+def run_step(args: argparse.Namespace) -> dict:
+    """
+    Run `crawler.main` with `args.step` accounts and sample it.
+    """
+    from benchmarks.end_to_end import configure
+
+    portal = MockPortal(config_from_arguments(args))
+    base_url = portal.start()
+    bot_api = FakeBotAPI()
+    bot_api.start()
+    directory = tempfile.mkdtemp(prefix='ari_capacity_')
+    configure(base_url, directory, headless=True)
+    import settings
+    from utils import Default, FrozenDict
+    settings.BOT_TOKEN = '1:capacity'
+    settings.MetricsData.PORT = None
+    settings.MetricsData.DUMP_PATH = None
+    settings.RequestTimeout.APPOINTMENT = Default(range(
+        args.check_interval, args.check_interval + 1
+    ))
+    if args.mode:
+        settings.ChromeData.DRIVER_MODE = args.mode
+    settings.ACCOUNTS = {
+        FrozenDict({
+            'email': f'capacity{i}@example.com', 'password': 'password'
+        }): {
+            'day_offset': 0, 'unavailability_datetime': [], 'dependents': [],
+            'checks': [settings.Check.STATUS, settings.Check.APPOINTMENT],
+        } for i in range(args.step)
+    }
+    import telebot
+    telebot.apihelper.API_URL = bot_api.api_url
+    import crawler
+    from models.chat import Chat
+    from models.page import SCAN_SECONDS
+    Chat(1).subscribe()  # notifications are sent to the fake Bot API
+
+    python = psutil.Process()
+    threading.Thread(target=crawler.main, daemon=True).start()
+    samples = []
+    start = time.monotonic()
+    while (elapsed := time.monotonic() - start) < args.period:
+        samples.append(sample(python))
+        time.sleep(min(args.interval, args.period - elapsed))
+    samples.append(sample(python))
+    seconds = time.monotonic() - start
+    for child in python.children(recursive=True):
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+    portal.stop()
+    bot_api.stop()
+    summary = summarize(samples, seconds)
+    return {
+        'accounts': args.step,
+        'started': sum(1 for x in summary if x.startswith('account ')),
+        'scans': SCAN_SECONDS.count(),
+        'scan p50, s': SCAN_SECONDS.quantile(0.5),
+        'scan p95, s': SCAN_SECONDS.quantile(0.95),
+        'bot calls': bot_api.count(),
+        'groups': summary,
+    }
+
+
+def slope(xs: list[float], ys: list[float]) -> float:
+    """
+    Least-squares slope of ys over xs, NaN for less than 2 points.
+    """
+    if len(set(xs)) < 2:
+        return float('nan')
+    x_mean, y_mean = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / sum(
+        (x - x_mean) ** 2 for x in xs
+    )
+
+
+def report(steps: list[dict], tolerance: float) -> None:
+    counts = [x['accounts'] for x in steps]
+    print(f"{'accounts':<24}" + ''.join(f'{x:>10}' for x in counts))
+    for key in ('started', 'scans', 'scan p50, s', 'scan p95, s'):
+        print(f'{key:<24}' + ''.join(
+            f"{x[key] if x[key] is not None else float('nan'):>10.3f}"
+            for x in steps
+        ))
+    totals = {}
+    for group in ('python', 'chromedriver', 'chrome'):
+        for resource in RESOURCES:
+            values = [x['groups'][group][resource] for x in steps]
+            previous = totals.get(resource, [0] * len(steps))
+            totals[resource] = [a + b for a, b in zip(previous, values)]
+            print(f'{group + " " + resource:<24}' + ''.join(
+                f'{x:>10.1f}' for x in values
+            ))
+    print('\nmarginal cost of an account:')
+    for resource, values in totals.items():
+        print(f'  {resource:<22}{slope(counts, values):>10.1f}')
+    baseline = steps[0]['scan p95, s']
+    degraded = next((
+        x['accounts'] for x in steps
+        if baseline and x['scan p95, s'] and (
+            x['scan p95, s'] > baseline * tolerance
+        )
+    ), None)
+    if degraded is None:
+        print(
+            f'\nscan p95 stays within {tolerance}x of {counts[0]} account(s)'
+        )
+    else:
+        print(
+            f'\nscan p95 exceeds {tolerance}x of {counts[0]} account(s) '
+            f'at {degraded} accounts'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '-a', '--accounts', type=int, nargs='+', default=[1, 2, 4],
+        help='account counts to be measured'
+    )
+    parser.add_argument(
+        '-p', '--period', type=float, default=300,
+        help='seconds to sample every account count'
+    )
+    parser.add_argument(
+        '-i', '--interval', type=float, default=5,
+        help='seconds between samples'
+    )
+    parser.add_argument(
+        '--check-interval', type=int, default=30,
+        help='seconds between appointment checks of an account'
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=1.5,
+        help='scan p95 growth considered as degradation'
+    )
+    parser.add_argument('-m', '--mode', help='driver mode, wire or native')
+    parser.add_argument('-o', '--output', help='file to save results as JSON')
+    parser.add_argument('--step', type=int, help=argparse.SUPPRESS)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.step:
+        print(json.dumps(run_step(args)), flush=True)
+        # threads of the killed drivers must not keep the process alive
+        os._exit(0)
+    steps = []
+    for count in sorted(args.accounts):
+        command = [
+            sys.executable, '-m', 'benchmarks.capacity', *sys.argv[1:],
+            '--step', str(count)
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        steps.append(json.loads(output.strip().splitlines()[-1]))
+        print(f"{count} account(s): {steps[-1]['started']} started")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(steps, file, indent=2)
+    report(steps, args.tolerance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare memory and latency of the driver modes side by side.
+
+Every mode is measured with the resource policy on and off, loading
+    the same urls, and the page load time saved by the policy is the
+    difference of the mean `loadEventEnd` of Navigation Timing.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.driver_modes https://example.com -n 20
+"""
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+import psutil
+
+from models.driver import create_driver
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    Get resident memory of the process and all its children.
+
+    Args:
+        pid (int): id of the root process
+
+    Returns:
+        int: bytes
+    """
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def load_event_end(driver) -> float:
+    """
+    Get `loadEventEnd` of the current page by Navigation Timing.
+
+    Returns:
+        float: seconds since the navigation start
+    """
+    return driver.execute_script(
+        "return performance.getEntriesByType('navigation')[0].loadEventEnd"
+    ) / 1000
+
+
+def measure(
+            mode: str, urls: list[str], count: int,
+            *, account_id: int, policy: bool = True
+        ) -> dict[str, float]:
+    account = SimpleNamespace(id=account_id, email=f'benchmark-{mode}')
+    python = psutil.Process()
+    rss_before = python.memory_info().rss
+    start = time.perf_counter()
+    driver = create_driver(account, mode=mode)
+    startup = time.perf_counter() - start
+    driver.resource_policy.enabled = policy
+    latencies = []
+    load_events = []
+    try:
+        for i in range(count):
+            start = time.perf_counter()
+            driver.raw_get(urls[i % len(urls)])
+            latencies.append(time.perf_counter() - start)
+            load_events.append(load_event_end(driver))
+        browser_rss = process_tree_rss(driver.service.process.pid)
+        python_rss = python.memory_info().rss - rss_before
+    finally:
+        driver.quit()
+    latencies.sort()
+    return {
+        'startup, s': startup,
+        'mean load, s': statistics.mean(latencies),
+        'p95 load, s': latencies[
+            min(int(len(latencies) * 0.95), len(latencies) - 1)
+        ],
+        'mean loadEventEnd, s': statistics.mean(load_events),
+        'python RSS growth, MiB': python_rss / 2 ** 20,
+        'browser RSS, MiB': browser_rss / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('urls', nargs='+', help='urls to be loaded in turn')
+    parser.add_argument('-n', '--count', type=int, default=20)
+    parser.add_argument(
+        '-m', '--mode', action='append', dest='modes',
+        help='driver mode to measure, both by default'
+    )
+    args = parser.parse_args()
+    modes = args.modes or ['wire', 'native']
+    results = {}
+    for i, mode in enumerate(modes):
+        for policy in (True, False):
+            results[mode if policy else f'{mode}, off'] = measure(
+                mode, args.urls, args.count, account_id=1000 + i,
+                policy=policy
+            )
+    for mode in modes:
+        # the same urls are loaded, so the difference is due to the policy
+        saved = (
+            results[f'{mode}, off']['mean loadEventEnd, s']
+            - results[mode]['mean loadEventEnd, s']
+        )
+        results[mode]['page load saved, s'] = saved
+        results[f'{mode}, off']['page load saved, s'] = 0.0
+    columns = list(results)
+    metrics = list(next(iter(results.values())))
+    width = max(map(len, metrics))
+    print(f"{'':<{width}}" + ''.join(f'{column:>13}' for column in columns))
+    for metric in metrics:
+        print(f'{metric:<{width}}' + ''.join(
+            f'{results[column][metric]:>13.3f}' for column in columns
+        ))
+
+
+if __name__ == '__main__':
+    main()
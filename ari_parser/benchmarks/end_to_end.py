@@ -0,0 +1,145 @@
+"""
+Measure scan time, detect-to-book latency and throughput per account
+    against the local mock portal.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.end_to_end -a 2 -d 300 --latency 0.05 0.2
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_portal import (
+    MockPortal, add_arguments, config_from_arguments, percentile
+)
+
+
+def configure(base_url: str, directory: str, *, headless: bool) -> None:
+    """
+    Point settings to the portal and keep all files in the directory.
+    Must be called before the crawler is imported, as databases
+        and pages are set up on import.
+    """
+    os.environ['BASE_URL'] = base_url
+    import settings
+    settings.BASE_URL = base_url
+    settings.DB_NAME = os.path.join(directory, 'db.sqlite3')
+    settings.LOGS_PATH = os.path.join(directory, 'logs')
+    settings.ArtifactData.PATH = os.path.join(directory, 'artifacts')
+    settings.TracingData.PATH = os.path.join(directory, 'traces')
+    settings.ChromeData.HEADLESS = headless
+    settings.PROXIES = []
+
+
+def run_account(crawler, deadline: float) -> dict[str, float]:
+    """
+    Run appointment checks back to back until the deadline.
+    The booked appointment is forgotten after each check,
+        so every check scans and books.
+    """
+    crawler.update_status()
+    durations = []
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        crawler.schedule_appointments()
+        durations.append(time.perf_counter() - start)
+        if crawler.account.is_signed:
+            crawler.account.updates.update(
+                datetime_signed=None, office_signed=None,
+                additional={'to_notify': False}
+            )
+    durations.sort()
+    return {
+        'checks': len(durations),
+        'check mean, s': (
+            statistics.mean(durations) if durations else float('nan')
+        ),
+        'check p95, s': percentile(durations, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-a', '--accounts', type=int, default=1)
+    parser.add_argument(
+        '-d', '--duration', type=float, default=300,
+        help='seconds of appointment checks per account'
+    )
+    parser.add_argument('-m', '--mode', help='driver mode, wire or native')
+    parser.add_argument(
+        '--headless', default=True, action=argparse.BooleanOptionalAction
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    portal = MockPortal(config_from_arguments(args))
+    base_url = portal.start()
+    directory = tempfile.mkdtemp(prefix='ari_benchmark_')
+    configure(base_url, directory, headless=args.headless)
+    import settings
+    if args.mode:
+        settings.ChromeData.DRIVER_MODE = args.mode
+    import crawler
+    from models.page import SCAN_SECONDS
+    from utils import FrozenDict
+
+    accounts = {
+        FrozenDict({
+            'email': f'benchmark{i}@example.com', 'password': 'password'
+        }): {
+            'day_offset': 0, 'unavailability_datetime': [],
+            'dependents': [], 'checks': [settings.Check.APPOINTMENT],
+        } for i in range(args.accounts)
+    }
+    with ThreadPoolExecutor(
+                max_workers=settings.STARTUP_CONCURRENCY
+            ) as executor:
+        crawlers = [
+            x for x in executor.map(
+                lambda item: crawler._create_crawler(*item), accounts.items()
+            ) if x is not None
+        ]
+    results = {}
+    deadline = time.monotonic() + args.duration
+
+    def run(c):
+        results[c.account.email] = run_account(c, deadline)
+
+    threads = [threading.Thread(target=run, args=(c, )) for c in crawlers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for c in crawlers:
+        c.driver.quit()
+    portal.stop()
+    minutes = args.duration / 60
+    for email, result in results.items():
+        result.update(portal.stats(email))
+        result['checks per minute'] = result['checks'] / minutes
+        result['bookings per minute'] = result['bookings'] / minutes
+        result['requests per minute'] = result['requests'] / minutes
+    if not results:
+        print('No crawler started, see logs in', directory)
+        return
+    metrics = list(next(iter(results.values())))
+    width = max(map(len, metrics))
+    print(f"{'':<{width}}" + ''.join(
+        f'{f"#{i}":>12}' for i in range(len(results))
+    ))
+    for metric in metrics:
+        print(f'{metric:<{width}}' + ''.join(
+            f'{result[metric]:>12.3f}' for result in results.values()
+        ))
+    scan = [SCAN_SECONDS.quantile(q) or float('nan') for q in (0.5, 0.95)]
+    print(
+        f'scan p50={scan[0]:.3f}s p95={scan[1]:.3f}s, '
+        f'files are in {directory}'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Local stand-in of Telegram Bot API, so notifications of benchmarks
+    go through the real bot without reaching Telegram.
+
+Usage:
+    ```
+    >>> api = FakeBotAPI()
+    >>> api.start()
+    >>> telebot.apihelper.API_URL = api.api_url
+    ```
+"""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlparse
+
+BOT_USER = {
+    'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'
+}
+
+
+class FakeBotAPI:
+    """
+    Answers every method successfully and records the calls.
+    `getUpdates` is long-polled and returns no updates.
+    Sending can be throttled with `throttle()`, as Telegram does once
+        rate limits are exceeded.
+    Uploaded photos get new file_ids, photos sent by file_id keep it.
+    """
+
+    def __init__(self):
+        self.calls: list[dict] = []
+        self.throttled = 0  # number of calls answered with 429
+        self._throttle_count = 0
+        self._retry_after = 0
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self) -> str:
+        """
+        Template of method urls, as `telebot.apihelper.API_URL`.
+        """
+        return f'{self.url}/bot{{0}}/{{1}}'
+
+    def start(self, port: int = 0, host: str = '127.0.0.1') -> str:
+        class Handler(_BotAPIHandler):
+            api = self
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def throttle(self, count: int, retry_after: int = 1) -> None:
+        """
+        Answer the next `count` sending calls with 429 Too Many Requests.
+        """
+        with self._lock:
+            self._throttle_count = count
+            self._retry_after = retry_after
+
+    def handle(self, method: str, params: dict[str, str], size: int) -> dict:
+        if method == 'getUpdates':
+            self._stopped.wait(min(float(params.get('timeout', 0)), 30))
+            return {'ok': True, 'result': []}
+        with self._lock:
+            if method.startswith('send') and self._throttle_count > 0:
+                self._throttle_count -= 1
+                self.throttled += 1
+                return {
+                    'ok': False, 'error_code': 429,
+                    'description': (
+                        'Too Many Requests: '
+                        f'retry after {self._retry_after}'
+                    ),
+                    'parameters': {'retry_after': self._retry_after},
+                }
+            self.calls.append({
+                'method': method, 'chat_id': params.get('chat_id'),
+                'bytes': size, 'time': time.monotonic(),
+            })
+        if method == 'getMe':
+            return {'ok': True, 'result': BOT_USER}
+        if method.startswith('send'):
+            chat = {'id': int(params.get('chat_id', 0)), 'type': 'private'}
+            message = {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()), 'from': BOT_USER, 'chat': chat,
+            }
+            if 'text' in params:
+                message['text'] = params['text']
+            if method == 'sendPhoto':
+                file_id = params.get('photo') or (
+                    f'photo-{next(self._file_ids)}'
+                )
+                message['photo'] = [{
+                    'file_id': file_id, 'file_unique_id': file_id,
+                    'width': 1280, 'height': 720,
+                }]
+            return {'ok': True, 'result': message}
+        return {'ok': True, 'result': True}
+
+    def uploaded(self, method: Optional[str] = None) -> int:
+        """
+        Get number of bytes sent to the method, or to all the methods.
+        """
+        with self._lock:
+            return sum(
+                x['bytes'] for x in self.calls if method in (None, x['method'])
+            )
+
+    def count(self, method: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                1 for x in self.calls if method in (None, x['method'])
+            )
+
+
+class _BotAPIHandler(BaseHTTPRequestHandler):
+    api: FakeBotAPI
+
+    def _handle(self) -> None:
+        url = urlparse(self.path)
+        method = url.path.rsplit('/', maxsplit=1)[-1]
+        params = dict(parse_qsl(url.query))
+        size = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(size)
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            params.update(parse_qsl(body.decode('utf-8')))
+        elif content_type.startswith('application/json') and body:
+            params.update({k: str(v) for k, v in json.loads(body).items()})
+        result = self.api.handle(method, params, size)
+        response = json.dumps(result).encode('utf-8')
+        self.send_response(result.get('error_code', 200))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def log_message(self, format, *args):
+        pass
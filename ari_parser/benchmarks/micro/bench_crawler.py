@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+DateTimeRange = pytest.importorskip('datetimerange').DateTimeRange
+
+
+@pytest.fixture
+def crawler(settings):
+    """
+    Stand-in of `crawler.Crawler` with the state `is_valid_meeting()`
+        reads: 2 signed dependents and 5 unavailability periods.
+    Logging is left out to measure the validation itself.
+    """
+    Crawler = pytest.importorskip('crawler').Crawler
+    from utils import EventSampler
+
+    now = datetime.now()
+
+    def updates(days: int, office: str) -> SimpleNamespace:
+        return SimpleNamespace(
+            datetime_signed=now + timedelta(days=days), office_signed=office
+        )
+
+    account = SimpleNamespace(
+        day_offset=3,
+        unavailability_datetime=[
+            DateTimeRange(
+                now + timedelta(days=days), now + timedelta(days=days + 2)
+            ) for days in range(5, 55, 10)
+        ],
+        dependents=[
+            SimpleNamespace(updates=updates(20, 'Porto')),
+            SimpleNamespace(updates=updates(40, 'Faro')),
+        ],
+        updates=updates(30, 'Lisboa'),
+    )
+    crawler = SimpleNamespace(
+        account=account, rejections=EventSampler(50),
+        logger=SimpleNamespace(debug=lambda *args, **kwargs: None),
+    )
+    crawler._reject = partial(Crawler._reject, crawler)
+    crawler.is_valid_meeting = partial(Crawler.is_valid_meeting, crawler)
+    return crawler
+
+
+def test_is_valid_meeting_scan(benchmark, crawler, meetings):
+    benchmark(lambda: [crawler.is_valid_meeting(x) for x in meetings])
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture(scope='module')
+def db(settings):
+    from models.db import AccountDatabase
+    db = AccountDatabase()
+    for i in range(100):
+        if not db.check_account_exists(email=f'user{i}@example.com'):
+            db.add_account(f'user{i}@example.com', 'secret')
+    return db
+
+
+def test_execute_select(benchmark, db):
+    benchmark(
+        db.execute, 'SELECT * FROM account WHERE email = ?',
+        ('user50@example.com', )
+    )
+
+
+def test_execute_update(benchmark, db):
+    benchmark(
+        db.execute, 'UPDATE account SET day_offset = ? WHERE email = ?',
+        (3, 'user50@example.com')
+    )
+
+
+def test_get_account(benchmark, db):
+    benchmark(lambda: db.get_account(email='user50@example.com'))
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture(scope='module')
+def dispatcher_module(settings):
+    return pytest.importorskip('models.dispatcher')
+
+
+def test_fan_out(benchmark, dispatcher_module):
+    Dispatcher = dispatcher_module.Dispatcher
+    Notification = dispatcher_module.Notification
+    dispatcher = Dispatcher(
+        lambda _: None, workers=8, chat_rate=10 ** 6, chat_burst=10 ** 6,
+        global_rate=10 ** 6
+    )
+
+    def fan_out():
+        for chat_id in range(100):
+            dispatcher.put(Notification(chat_id, 'Status: Approved'))
+        assert dispatcher.join(timeout=10)
+
+    benchmark(fan_out)
+
+
+def test_coalesce_errors(benchmark, dispatcher_module):
+    sent = []
+    dispatcher = dispatcher_module.Dispatcher(
+        lambda x: sent.append(x.text), global_rate=10 ** 6
+    )
+    coalescer = dispatcher_module.Coalescer(dispatcher, window=60)
+    errors = [f'<b>Email</b>: user{i}@example.com' for i in range(10)]
+
+    def storm():
+        for _ in range(2):
+            for error in errors:
+                coalescer.add(1, error, key=error)
+
+    benchmark(storm)
+    coalescer.add(1, 'Booked', urgent=True)
+    coalescer.close()
+    assert dispatcher.join(timeout=5)
+    # bookings are not delayed, the storm is a single digest
+    assert len(sent) == 2 and sent[0] == 'Booked'
+    assert sent[1].count('user0@example.com (x') == 1
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+# options of a single scan: 2 months, 20 days, 8 times a day
+DATES = ['2021 - November', '2021 - December']
+DAYS = [str(x) for x in range(1, 21)]
+TIMES = [
+    f'{hour:02}:{minute:02}' for hour in range(9, 13) for minute in (0, 30)
+]
+
+
+def test_parse_dates(benchmark):
+    benchmark(lambda: [datetime.strptime(x, '%Y - %B') for x in DATES])
+
+
+def test_parse_meetings(benchmark, settings):
+    AppointmentPage = pytest.importorskip('models.page').AppointmentPage
+    dates = [datetime.strptime(x, '%Y - %B') for x in DATES]
+    benchmark(lambda: [
+        AppointmentPage.parse_meeting('Lisboa', date, day, time)
+        for date in dates for day in DAYS for time in TIMES
+    ])
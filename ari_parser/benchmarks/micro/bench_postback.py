@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+SELECT_IDS = [
+    'Conteudo_lstUNOR', 'Conteudo_lstAgendamentoMes',
+    'Conteudo_lstAgendamentoDia', 'Conteudo_lstAgendamentoHora'
+]
+
+
+@pytest.fixture(scope='module')
+def panel() -> str:
+    from benchmarks.mock_portal import render_select
+    return '\n'.join([
+        render_select(SELECT_IDS[0], ['Lisboa', 'Porto', 'Faro'], 'Porto'),
+        render_select(SELECT_IDS[1], ['2021 - November'], None),
+        render_select(SELECT_IDS[2], [str(x) for x in range(1, 21)], '5'),
+        render_select(SELECT_IDS[3], [
+            f'{hour:02}:{minute:02}'
+            for hour in range(9, 17) for minute in (0, 30)
+        ], None),
+    ])
+
+
+def test_parse_full_response(benchmark, panel):
+    from models.postback import parse_response
+    page = f'<html><body><form>{panel}</form></body></html>'
+    benchmark(parse_response, page, SELECT_IDS)
+
+
+def test_parse_delta_response(benchmark, panel):
+    from models.postback import parse_response
+    delta = (
+        f'{len(panel)}|updatePanel|Conteudo_UpdatePanel1|{panel}|'
+        '8|hiddenField|__VIEWSTATE|dmlld3N0|'
+    )
+    states, partial = parse_response(delta, SELECT_IDS)
+    assert partial and states['Conteudo_lstAgendamentoDia'].selected == 4
+    benchmark(parse_response, delta, SELECT_IDS)
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+BASE_URL = 'https://example.com/ARIRF'
+URL_WITH_PARAMS = (
+    f'{BASE_URL}/Account/Entrada.aspx?ReturnUrl=%2fARIRF%2fARIAgenda.aspx'
+    '&lang=en&lang=pt'
+)
+
+
+@pytest.fixture
+def url():
+    from utils.url import Url
+    return Url(URL_WITH_PARAMS)
+
+
+def test_path(benchmark, url):
+    benchmark(lambda: url.path)
+
+
+def test_eq_url(benchmark, url):
+    from utils.url import Url
+    other = Url(f'{BASE_URL}/Account/Entrada.aspx')
+    benchmark(lambda: url == other)
+
+
+def test_eq_str(benchmark, url):
+    # as in `Driver.get()`, current url is compared to the requested one
+    benchmark(lambda: url != f'{BASE_URL}/ARIApplication.aspx')
+
+
+def test_params(benchmark, url):
+    benchmark(lambda: url.params)
+
+
+def test_intern(benchmark):
+    # as in `Driver.url`, current url is wrapped on every access
+    from utils.url import Url
+    benchmark(Url.intern, URL_WITH_PARAMS)
+
+
+def test_encode_params(benchmark, url):
+    params = url.params
+    benchmark(url.encode_params, params)
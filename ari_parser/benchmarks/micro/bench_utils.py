@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture
+def accounts(settings):
+    from utils import FrozenDict
+    return {
+        FrozenDict({'email': f'user{i}@example.com', 'password': 'secret'}): {
+            'day_offset': 0, 'dependents': []
+        } for i in range(50)
+    }
+
+
+def test_frozen_dict_hash(benchmark, settings):
+    from utils import FrozenDict
+    benchmark(lambda: hash(FrozenDict(
+        {'email': 'user@example.com', 'password': 'secret'}
+    )))
+
+
+def test_frozen_dict_lookup(benchmark, accounts):
+    keys = list(accounts)
+    benchmark(lambda: [accounts[key] for key in keys])
+
+
+def test_safe_iter(benchmark, meetings):
+    from utils import safe_iter
+
+    def consume():
+        iterator = safe_iter(iter(meetings))
+        while next(iterator):
+            pass
+
+    benchmark(consume)
@@ -0,0 +1,58 @@
+"""
+Microbenchmarks of the pure-Python hot paths, run by pytest-benchmark.
+Correctness tests are in `tests`, these modules only measure timings.
+
+Usage (from the repository root):
+    pytest --benchmark-save=baseline  # measure and save as the new baseline
+    pytest --benchmark-compare  # fail if slower than the last baseline
+
+Baselines are kept in `baselines` per machine and interpreter, e.g.
+    `Linux-CPython-3.9-64bit`, and `--benchmark-compare` only looks at
+    the directory of the running interpreter. The committed baseline is
+    recorded with CPython 3.9, the version pinned in pyproject.toml, so
+    run the benchmarks with it, e.g. `poetry env use 3.9`.
+A benchmark fails the comparison if its mean regresses by more than
+    `REGRESSION_THRESHOLD`, unless `--benchmark-compare-fail` is passed.
+"""
+import os
+from datetime import datetime, timedelta
+from random import Random
+
+import pytest
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines')
+REGRESSION_THRESHOLD = 'mean:15%'
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if not config.pluginmanager.hasplugin('benchmark'):
+        return
+    from pytest_benchmark.utils import parse_compare_fail
+
+    option = config.option
+    if option.benchmark_storage == 'file://./.benchmarks':
+        option.benchmark_storage = f'file://{BASELINES_PATH}'
+    if option.benchmark_compare and not option.benchmark_compare_fail:
+        option.benchmark_compare_fail = [
+            parse_compare_fail(REGRESSION_THRESHOLD)
+        ]
+
+
+@pytest.fixture(scope='session')
+def meetings() -> list[dict]:
+    """
+    Slots of a single scan: 4 offices, 2 months, 8 times a day.
+    """
+    random = Random(0)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        {
+            'datetime': start + timedelta(
+                days=random.randint(1, 60), hours=random.randint(0, 8)
+            ),
+            'office': office
+        }
+        for office in ('Lisboa', 'Porto', 'Faro', 'Coimbra')
+        for _ in range(125)
+    ]
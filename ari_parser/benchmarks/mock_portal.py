@@ -0,0 +1,603 @@
+"""
+Local stand-in of the ARI portal for offline end-to-end benchmarks.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.mock_portal -p 8080 --latency 0.05 0.2
+"""
+import argparse
+import html
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlparse
+
+LOGIN_PATH = '/Account/Entrada.aspx'
+HOME_PATH = '/ARIApplication.aspx'
+APPLICANTS_PATH = '/ARIRF.aspx'
+AGENDA_PATH = '/ARIAgenda.aspx'
+
+AUTH_COOKIE = '.ASPXAUTH'
+SESSION_COOKIE = 'ASP.NET_SessionId'
+
+# agenda selects in order of dependence, field name -> element id
+AGENDA_FIELDS = {
+    'matter': 'Conteudo_lstAAG',
+    'office': 'Conteudo_lstUNOR',
+    'month': 'Conteudo_lstAgendamentoMes',
+    'day': 'Conteudo_lstAgendamentoDia',
+    'time': 'Conteudo_lstAgendamentoHora',
+}
+MATTERS = ['ARI']
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script>
+function __doPostBack(target) {{
+    document.getElementById('__EVENTTARGET').value = target;
+    document.forms[0].submit();
+}}
+</script></head>
+<body><form method="post" action="{action}" id="form1">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}">
+<select name="lstIdioma" id="lstIdioma" onchange="__doPostBack(this.name)">
+{languages}
+</select>
+{content}
+</form></body></html>'''
+
+
+def element_name(element_id: str) -> str:
+    """
+    Get name of the form field as ASP.NET renders it, e.g.
+        'Conteudo_lstAAG' -> 'ctl00$Conteudo$lstAAG'
+    """
+    return 'ctl00$' + element_id.replace('_', '$')
+
+
+def render_select(
+            element_id: str, options: list[str], selected: Optional[str]
+        ) -> str:
+    rendered = '\n'.join(
+        f'<option value="{html.escape(x)}"'
+        f'{" selected" if x == selected else ""}>{html.escape(x)}</option>'
+        for x in options
+    )
+    return (
+        f'<select name="{element_name(element_id)}" id="{element_id}" '
+        f'onchange="__doPostBack(this.name)">\n{rendered}\n</select>'
+    )
+
+
+def render_button(element_id: str, value: str) -> str:
+    return (
+        f'<input type="submit" name="{element_name(element_id)}" '
+        f'id="{element_id}" value="{html.escape(value)}">'
+    )
+
+
+@dataclass
+class PortalConfig:
+    offices: list[str] = field(
+        default_factory=lambda: ['Lisboa', 'Porto', 'Faro', 'Coimbra']
+    )
+    slots: int = 20  # initial number of slots per office
+    days: int = 60  # slots are spread over that many days ahead
+    hours: range = range(9, 17)  # slots start on the hour and half hour
+    latency: tuple[float, float] = (0.05, 0.2)  # in seconds, per response
+    churn_interval: float = 5  # in seconds, 0 to disable churn
+    churn_rate: float = 0.2  # share of slots replaced every interval
+    session_ttl: float = 20 * 60  # in seconds of inactivity
+    status: str = 'Approved'
+    # name of dependent -> status, shown in the applicants table
+    applicants: dict[str, str] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+
+class SlotInventory:
+    """
+    Free appointment slots, each remembers when it appeared.
+    """
+
+    def __init__(self, config: PortalConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.slots: dict[tuple[str, datetime], float] = {}
+        self._lock = threading.Lock()
+        for office in config.offices:
+            for _ in range(config.slots):
+                self._add(office)
+
+    def _add(self, office: str) -> None:
+        today = date.today()
+        while True:
+            day = today + timedelta(days=self.random.randint(
+                1, self.config.days
+            ))
+            slot = (office, datetime(
+                day.year, day.month, day.day,
+                self.random.choice(self.config.hours),
+                self.random.choice((0, 30))
+            ))
+            if slot not in self.slots:
+                self.slots[slot] = time.monotonic()
+                return
+
+    def churn(self) -> None:
+        """
+        Replace `churn_rate` share of slots with new ones.
+        """
+        with self._lock:
+            count = round(len(self.slots) * self.config.churn_rate)
+            for slot in self.random.sample(list(self.slots), count):
+                del self.slots[slot]
+                self._add(slot[0])
+
+    def options(self, office: str) -> list[datetime]:
+        with self._lock:
+            return sorted(dt for o, dt in self.slots if o == office)
+
+    def take(self, office: str, datetime_: datetime) -> Optional[float]:
+        """
+        Book the slot.
+
+        Returns:
+            Optional[float]: when the slot appeared, None if it is taken
+        """
+        with self._lock:
+            return self.slots.pop((office, datetime_), None)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+@dataclass
+class Session:
+    id: str
+    last_seen: float = field(default_factory=time.monotonic)
+    email: Optional[str] = None
+    language: str = 'pt'
+    applicant: Optional[str] = None  # None for main applicant
+    agenda: dict[str, Optional[str]] = field(default_factory=dict)
+    message: str = ''
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: str = ''
+    headers: dict[str, str] = field(default_factory=dict)
+    cookies: dict[str, str] = field(default_factory=dict)
+
+
+class MockPortal:
+    """
+    Reproduces login, status, applicants and agenda pages of the portal
+        with the element ids of `settings.locators`.
+    Selects post the whole form back, as ASP.NET pages do, and the agenda
+        selects depend on each other: office -> month -> day -> time.
+    Slots churn in the background and sessions expire after inactivity,
+        what redirects to the login page.
+    Requests, postbacks and bookings are counted per account.
+    """
+
+    def __init__(self, config: Optional[PortalConfig] = None):
+        self.config = config or PortalConfig()
+        self.inventory = SlotInventory(self.config)
+        self.sessions: dict[str, Session] = {}
+        self.auth_tokens: dict[str, str] = {}  # token -> email
+        self.requests: dict[str, int] = {}  # email -> number of requests
+        self.postbacks: dict[str, int] = {}
+        self.bookings: list[dict] = []
+        self.rejected: dict[str, int] = {}  # email -> failed bookings
+        # (email, office, datetime) -> when the slot was first shown
+        self.first_seen: dict[tuple[str, str, datetime], float] = {}
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port: int = 0, host: str = '127.0.0.1') -> str:
+        """
+        Serve the portal in background threads.
+
+        Args:
+            port (int, optional): port to listen to, any free by default
+            host (str, optional): interface to listen to
+
+        Returns:
+            str: base url of the portal, to be used as `BASE_URL`
+        """
+        class Handler(_PortalHandler):
+            portal = self
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if self.config.churn_interval:
+            threading.Thread(target=self._churn_loop, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _churn_loop(self) -> None:
+        while not self._stopped.wait(self.config.churn_interval):
+            self.inventory.churn()
+
+    def handle(
+                self, method: str, path: str, form: dict[str, str],
+                cookies: dict[str, str]
+            ) -> Response:
+        time.sleep(random.uniform(*self.config.latency))
+        response = Response()
+        now = time.monotonic()
+        with self._lock:
+            session = self.sessions.get(cookies.get(SESSION_COOKIE))
+            if session is None or (
+                        now - session.last_seen > self.config.session_ttl
+                    ):
+                if session is not None:
+                    self.auth_tokens.pop(cookies.get(AUTH_COOKIE), None)
+                session = Session(secrets.token_hex(12))
+                self.sessions[session.id] = session
+                response.cookies[SESSION_COOKIE] = session.id
+            session.last_seen = now
+            email = self.auth_tokens.get(cookies.get(AUTH_COOKIE))
+            if email is not None:
+                session.email = email
+                self.requests[email] = self.requests.get(email, 0) + 1
+                if method == 'POST':
+                    self.postbacks[email] = self.postbacks.get(email, 0) + 1
+        if method == 'POST' and form.get('__EVENTTARGET') == 'lstIdioma':
+            session.language = form.get('lstIdioma', session.language)
+        if path == LOGIN_PATH:
+            return self._login(session, method, form, response)
+        if path not in (HOME_PATH, APPLICANTS_PATH, AGENDA_PATH):
+            response.status = 404
+            response.body = 'Not found'
+            return response
+        if email is None:
+            return self._redirect(
+                response, f'{LOGIN_PATH}?ReturnUrl={quote(path, safe="")}'
+            )
+        if path == HOME_PATH:
+            return self._home(session, method, form, response)
+        elif path == APPLICANTS_PATH:
+            return self._applicants(session, method, form, response)
+        return self._agenda(session, method, form, response)
+
+    @staticmethod
+    def _redirect(response: Response, location: str) -> Response:
+        response.status = 302
+        response.headers['Location'] = location
+        return response
+
+    def _page(
+                self, session: Session, path: str, title: str, content: str
+            ) -> str:
+        languages = '\n'.join(
+            f'<option value="{code}"'
+            f'{" selected" if code == session.language else ""}>{name}'
+            '</option>'
+            for code, name in (('pt', 'Português'), ('en', 'English'))
+        )
+        return PAGE_TEMPLATE.format(
+            title=title, action=path, viewstate=secrets.token_urlsafe(48),
+            languages=languages, content=content
+        )
+
+    def _login(
+                self, session: Session, method: str, form: dict[str, str],
+                response: Response
+            ) -> Response:
+        message = ''
+        if method == 'POST' and 'btnAutenticar' in form:
+            email = form.get('txtUtilizador', '').strip()
+            if email and form.get('txtChaveAcesso'):
+                token = secrets.token_hex(32)
+                with self._lock:
+                    self.auth_tokens[token] = email
+                session.email = email
+                response.cookies[AUTH_COOKIE] = token
+                return_url = form.get('ReturnUrl', '')
+                if not return_url.startswith('/'):
+                    return_url = HOME_PATH
+                return self._redirect(response, return_url)
+            message = 'Invalid user or password'
+        return_url = form.get('ReturnUrl', '')
+        response.body = self._page(session, LOGIN_PATH, 'Entrada', f'''
+<input type="hidden" name="ReturnUrl" value="{html.escape(return_url)}">
+<input type="text" name="txtUtilizador" id="txtUtilizador">
+<input type="password" name="txtChaveAcesso" id="txtChaveAcesso">
+<input type="submit" name="btnAutenticar" id="btnAutenticar" value="Login">
+<span id="Mensagem">{message}</span>''')
+        return response
+
+    def _home(
+                self, session: Session, method: str, form: dict[str, str],
+                response: Response
+            ) -> Response:
+        if method == 'POST':
+            if element_name('Conteudo_btnAgendamento') in form:
+                session.applicant = None
+                session.agenda.clear()
+                return self._redirect(response, AGENDA_PATH)
+            elif element_name('Conteudo_btnAF') in form:
+                return self._redirect(response, APPLICANTS_PATH)
+        applicants_button = render_button(
+            'Conteudo_btnAF', 'Applicants'
+        ) if self.config.applicants else ''
+        response.body = self._page(session, HOME_PATH, 'ARI', f'''
+<div id="Conteudo_UpdatePanel1"><div><div class="divConteudo"><table>
+<tr><td>Status</td><td><span id="Conteudo_lblSituacao">
+{html.escape(self.config.status)}</span></td></tr>
+</table></div></div></div>
+{render_button('Conteudo_btnAgendamento', 'Schedule')}
+{applicants_button}''')
+        return response
+
+    def _applicants(
+                self, session: Session, method: str, form: dict[str, str],
+                response: Response
+            ) -> Response:
+        if method == 'POST':
+            if (name := form.get('rbApplicant')) in self.config.applicants:
+                session.applicant = name
+            if element_name('Conteudo_btnAgendamento') in form and (
+                        session.applicant is not None
+                    ):
+                session.agenda.clear()
+                return self._redirect(response, AGENDA_PATH)
+        rows = '\n'.join(
+            '<tr><td><input type="radio" name="rbApplicant" '
+            f'value="{html.escape(name)}"'
+            f'{" checked" if name == session.applicant else ""} '
+            'onclick="__doPostBack(this.name)"></td>'
+            f'<td>{html.escape(name)}</td><td>{html.escape(status)}</td></tr>'
+            for name, status in self.config.applicants.items()
+        )
+        status = self.config.applicants.get(session.applicant, '')
+        response.body = self._page(session, APPLICANTS_PATH, 'ARI', f'''
+<table id="Conteudo_dg"><tbody>
+<tr><td></td><td>Name</td><td>Status</td></tr>
+{rows}
+</tbody></table>
+<span id="Conteudo_txtSituacao">{html.escape(status)}</span>
+{render_button('Conteudo_btnAgendamento', 'Schedule')}''')
+        return response
+
+    def _agenda_options(
+                self, session: Session, email: str
+            ) -> dict[str, list[str]]:
+        """
+        Get options of the agenda selects, fixing invalid selections
+            in `session.agenda` to the first option.
+        """
+        state = session.agenda
+        options = {'matter': MATTERS, 'office': self.config.offices}
+        for name in ('matter', 'office'):
+            if state.get(name) not in options[name]:
+                state[name] = options[name][0]
+        slots = self.inventory.options(state['office'])
+        options['month'] = list(dict.fromkeys(
+            x.strftime('%Y - %B') for x in slots
+        ))
+        if state.get('month') not in options['month']:
+            state['month'] = next(iter(options['month']), None)
+        slots = [x for x in slots if x.strftime('%Y - %B') == state['month']]
+        options['day'] = list(dict.fromkeys(str(x.day) for x in slots))
+        if state.get('day') not in options['day']:
+            state['day'] = next(iter(options['day']), None)
+        slots = [x for x in slots if str(x.day) == state['day']]
+        options['time'] = [x.strftime('%H:%M') for x in slots]
+        if state.get('time') not in options['time']:
+            state['time'] = next(iter(options['time']), None)
+        now = time.monotonic()
+        with self._lock:
+            for slot in slots:
+                self.first_seen.setdefault((email, state['office'], slot), now)
+        return options
+
+    def _selected_slot(self, session: Session) -> Optional[datetime]:
+        state = session.agenda
+        if None in (state.get('month'), state.get('day'), state.get('time')):
+            return None
+        return datetime.strptime(
+            f"{state['month']} {state['day']} {state['time']}",
+            '%Y - %B %d %H:%M'
+        )
+
+    def _agenda(
+                self, session: Session, method: str, form: dict[str, str],
+                response: Response
+            ) -> Response:
+        state = session.agenda
+        email = session.email
+        if method == 'POST':
+            session.message = ''
+            target = form.get('__EVENTTARGET')
+            for name, element_id in AGENDA_FIELDS.items():
+                if target == element_name(element_id):
+                    state[name] = form.get(target)
+                    # dependent selects are reset
+                    for dependent in list(AGENDA_FIELDS)[
+                                list(AGENDA_FIELDS).index(name) + 1:
+                            ]:
+                        state.pop(dependent, None)
+                    break
+            if element_name('Conteudo_btnNovo') in form:
+                state.clear()
+            elif element_name('Conteudo_btnConfirmar') in form:
+                slot = self._selected_slot(session)
+                appeared = None if slot is None else self.inventory.take(
+                    state['office'], slot
+                )
+                if appeared is not None:
+                    now = time.monotonic()
+                    with self._lock:
+                        self.bookings.append({
+                            'email': email, 'applicant': session.applicant,
+                            'office': state['office'], 'datetime': slot,
+                            'appeared': appeared, 'booked': now,
+                            'first_seen': self.first_seen.get(
+                                (email, state['office'], slot), appeared
+                            ),
+                        })
+                    state.clear()
+                    return self._redirect(response, HOME_PATH)
+                with self._lock:
+                    self.rejected[email] = self.rejected.get(email, 0) + 1
+                session.message = 'The selected slot is not available'
+        options = self._agenda_options(session, email)
+        selects = '\n'.join(
+            render_select(element_id, options[name], state.get(name))
+            for name, element_id in AGENDA_FIELDS.items()
+        )
+        response.body = self._page(session, AGENDA_PATH, 'ARI', f'''
+{render_button('Conteudo_btnNovo', 'New')}
+{selects}
+<span id="Conteudo_lblMensagem">{session.message}</span>
+{render_button('Conteudo_btnConfirmar', 'Confirm')}''')
+        return response
+
+    def stats(self, email: str) -> dict[str, float]:
+        """
+        Get portal-side statistics of the account.
+
+        Returns:
+            dict[str, float]: requests, postbacks, bookings, rejected
+                bookings and detect-to-book latencies, from the slot
+                was first shown to the account till it was booked
+        """
+        with self._lock:
+            latencies = sorted(
+                x['booked'] - x['first_seen']
+                for x in self.bookings if x['email'] == email
+            )
+            return {
+                'requests': self.requests.get(email, 0),
+                'postbacks': self.postbacks.get(email, 0),
+                'bookings': len(latencies),
+                'rejected': self.rejected.get(email, 0),
+                'detect-to-book p50, s': percentile(latencies, 0.5),
+                'detect-to-book p95, s': percentile(latencies, 0.95),
+            }
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Get percentile of the sorted values, NaN if there are no values.
+    """
+    if not values:
+        return float('nan')
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    portal: MockPortal
+
+    def _cookies(self) -> dict[str, str]:
+        cookies = {}
+        for pair in self.headers.get('Cookie', '').split(';'):
+            if '=' in pair:
+                k, v = pair.strip().split('=', maxsplit=1)
+                cookies[k] = unquote(v)
+        return cookies
+
+    def _handle(self, method: str) -> None:
+        url = urlparse(self.path)
+        form = dict(parse_qsl(url.query))
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length', 0))
+            form.update(parse_qsl(self.rfile.read(length).decode('utf-8')))
+        response = self.portal.handle(method, url.path, form, self._cookies())
+        body = response.body.encode('utf-8')
+        self.send_response(response.status)
+        for k, v in response.headers.items():
+            self.send_header(k, v)
+        for k, v in response.cookies.items():
+            self.send_header('Set-Cookie', f'{k}={v}; Path=/; HttpOnly')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add arguments of `PortalConfig` to the parser.
+    """
+    defaults = PortalConfig()
+    parser.add_argument(
+        '--offices', nargs='+', default=defaults.offices
+    )
+    parser.add_argument(
+        '--slots', type=int, default=defaults.slots,
+        help='initial number of slots per office'
+    )
+    parser.add_argument(
+        '--latency', type=float, nargs=2, default=defaults.latency,
+        metavar=('MIN', 'MAX'), help='seconds per response'
+    )
+    parser.add_argument(
+        '--churn-interval', type=float, default=defaults.churn_interval,
+        help='seconds between slot replacements, 0 to disable'
+    )
+    parser.add_argument(
+        '--churn-rate', type=float, default=defaults.churn_rate,
+        help='share of slots replaced every interval'
+    )
+    parser.add_argument(
+        '--session-ttl', type=float, default=defaults.session_ttl,
+        help='seconds of inactivity before the session expires'
+    )
+    parser.add_argument('--seed', type=int)
+
+
+def config_from_arguments(args: argparse.Namespace) -> PortalConfig:
+    return PortalConfig(
+        offices=args.offices, slots=args.slots, latency=tuple(args.latency),
+        churn_interval=args.churn_interval, churn_rate=args.churn_rate,
+        session_ttl=args.session_ttl, seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    portal = MockPortal(config_from_arguments(args))
+    url = portal.start(args.port)
+    print(f'Serving on {url}, set BASE_URL to it. Press Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Serve traffic recorded by `Driver` to any HTTP client.
+
+Record a session by setting `settings.CaptureData.RECORD_PATH`, then
+    either set `settings.CaptureData.REPLAY_PATH` to the fixture to
+    replay it to the browser through selenium-wire, or serve it here
+    and set `BASE_URL` to the printed url.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.replay_server records/fixture.jsonl.gz -p 8080
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse
+
+from models.recording import Fixture
+
+
+class ReplayServer:
+    """
+    Answers requests with the matching recorded responses.
+    Unrecorded paths get 404.
+    """
+
+    def __init__(self, fixture: Fixture, latency: float = 0):
+        self.fixture = fixture
+        self.latency = latency
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port: int = 0, host: str = '127.0.0.1') -> str:
+        class Handler(_ReplayHandler):
+            replay = self
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    replay: ReplayServer
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        exchange = self.replay.fixture.match(method, self.path, body)
+        time.sleep(self.replay.latency)
+        if exchange is None:
+            self.send_error(404)
+            return
+        self.send_response(exchange.status, exchange.reason or None)
+        for k, v in exchange.response_headers:
+            if k.lower() == 'location':
+                # redirects must stay on this server
+                location = urlparse(v)
+                v = location._replace(scheme='', netloc='').geturl()
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(exchange.body)))
+        self.end_headers()
+        self.wfile.write(exchange.body)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('fixture', help='recorded .jsonl.gz file')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument(
+        '--latency', type=float, default=0,
+        help='seconds to wait before every response'
+    )
+    args = parser.parse_args()
+    fixture = Fixture.load(args.fixture)
+    server = ReplayServer(fixture, args.latency)
+    url = server.start(args.port)
+    print(
+        f'Serving {len(fixture.exchanges)} exchanges on {url}, '
+        'set BASE_URL to it. Press Ctrl+C to stop.'
+    )
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+    print(f'{fixture.hits} requests replayed, {fixture.misses} not recorded')
+
+
+if __name__ == '__main__':
+    main()
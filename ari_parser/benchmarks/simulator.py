@@ -0,0 +1,464 @@
+"""
+Simulate polling and booking strategies on a virtual clock.
+
+Slots are released and booked away by others according to recorded
+    or synthetic data, while the decision logic of `crawler.Crawler`
+    (validation, office ordering, burst mode, dependents scheduling)
+    runs without a browser. Weeks are simulated in seconds.
+
+Usage (from the `ari_parser` directory):
+    python -m benchmarks.simulator -d 14 --dependents 2
+    python -m benchmarks.simulator -s strategies.json --slots slots.jsonl
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import chain, groupby
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    from utils import Default
+
+DAY = 24 * 60 * 60
+# requests of a check before the slots are enumerated:
+# home page, calendar, refresh, language and matter postbacks
+CHECK_REQUESTS = 5
+# postbacks of 5 selects and the submission
+BOOKING_REQUESTS = 6
+
+
+@dataclass
+class Slot:
+    office: str
+    datetime: datetime
+    appeared: float  # in virtual seconds
+    gone: float  # booked away by someone else, in virtual seconds
+    captured: bool = False
+
+    def is_free(self, moment: float) -> bool:
+        return not self.captured and self.appeared <= moment < self.gone
+
+
+@dataclass
+class SlotModel:
+    """
+    Slots are released one by one as cancellations and in batches,
+        both as Poisson processes per office, and live for exponentially
+        distributed time before someone else books them.
+    """
+    offices: list[str] = field(
+        default_factory=lambda: ['Lisboa', 'Porto', 'Faro', 'Coimbra']
+    )
+    cancellations_per_day: float = 6  # per office
+    batches_per_day: float = 0.5  # per office
+    batch_size: int = 20
+    lifetime: float = 30 * 60  # mean, in seconds
+    horizon: int = 60  # slots are spread over that many days ahead
+    hours: range = range(9, 17)
+
+
+def generate_slots(
+            model: SlotModel, days: float, start: datetime,
+            rng: random.Random
+        ) -> list[Slot]:
+    slots = []
+    for office in model.offices:
+        for rate, size in (
+                    (model.cancellations_per_day, 1),
+                    (model.batches_per_day, model.batch_size)
+                ):
+            moment = 0.0
+            while rate and (
+                        moment := moment + rng.expovariate(rate / DAY)
+                    ) < days * DAY:
+                released = start + timedelta(seconds=moment)
+                for _ in range(size):
+                    day = released.replace(
+                        hour=0, minute=0, second=0, microsecond=0
+                    ) + timedelta(days=rng.randint(1, model.horizon))
+                    slots.append(Slot(
+                        office, day + timedelta(
+                            hours=rng.choice(model.hours),
+                            minutes=rng.choice((0, 30))
+                        ), moment, moment + rng.expovariate(1 / model.lifetime)
+                    ))
+    return sorted(slots, key=lambda x: x.appeared)
+
+
+def load_slots(filename: str, start: datetime) -> list[Slot]:
+    """
+    Load slots from JSON lines with 'office', 'offset', 'appeared'
+        and 'gone' fields, all but office are in seconds since the start
+        of the recording.
+    """
+    slots = []
+    with open(filename) as file:
+        for line in filter(str.strip, file):
+            data = json.loads(line)
+            slots.append(Slot(
+                data['office'], start + timedelta(seconds=data['offset']),
+                data['appeared'], data['gone']
+            ))
+    return sorted(slots, key=lambda x: x.appeared)
+
+
+def save_slots(filename: str, slots: list[Slot], start: datetime) -> None:
+    with open(filename, 'w') as file:
+        for slot in slots:
+            file.write(json.dumps({
+                'office': slot.office,
+                'offset': (slot.datetime - start).total_seconds(),
+                'appeared': slot.appeared, 'gone': slot.gone
+            }) + '\n')
+
+
+@dataclass
+class Strategy:
+    name: str
+    appointment: tuple[int, int]  # seconds between checks, [min, max)
+    burst: Optional[tuple[int, int]]  # after detection, None to disable
+    stash_count: int  # number of checks in burst mode
+    priority_offices: list[str] = field(default_factory=list)
+    blocked_offices: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_settings(cls, name: str = 'settings') -> 'Strategy':
+        import settings
+        appointment = settings.RequestTimeout.APPOINTMENT
+        burst = settings.RequestTimeout.BURST_APPOINTMENT
+        return cls(
+            name, (appointment.default_value.start,
+                   appointment.default_value.stop),
+            (burst.start, burst.stop), appointment.default_stash_count,
+            list(settings.AppointmentData.PRIORITY_OFFICES),
+            list(settings.AppointmentData.BLOCKED_OFFICES)
+        )
+
+
+def default_strategies() -> list[Strategy]:
+    current = Strategy.from_settings()
+    return [
+        current,
+        Strategy(
+            'no burst', current.appointment, None, current.stash_count,
+            current.priority_offices, current.blocked_offices
+        ),
+        Strategy(
+            'fast', (30, 61), current.burst, current.stash_count,
+            current.priority_offices, current.blocked_offices
+        ),
+        Strategy(
+            'slow', (300, 601), current.burst, current.stash_count,
+            current.priority_offices, current.blocked_offices
+        ),
+    ]
+
+
+@contextmanager
+def applied(strategy: Strategy) -> Iterator[None]:
+    """
+    Set office preferences of the strategy to settings,
+        as they are read by `Crawler.order_offices()`.
+    """
+    import settings
+    data = settings.AppointmentData
+    previous = data.PRIORITY_OFFICES, data.BLOCKED_OFFICES
+    data.PRIORITY_OFFICES = strategy.priority_offices
+    data.BLOCKED_OFFICES = strategy.blocked_offices
+    try:
+        yield
+    finally:
+        data.PRIORITY_OFFICES, data.BLOCKED_OFFICES = previous
+
+
+class _Applicant:
+    def __init__(self, id_: int = 0):
+        self.id = id_
+        self.updates = SimpleNamespace(
+            datetime_signed=None, office_signed=None, status=None
+        )
+
+    @property
+    def is_signed(self) -> bool:
+        return bool(
+            self.updates.datetime_signed and self.updates.office_signed
+        )
+
+
+def make_crawler(crawler_class: type, *, day_offset: int, dependents: int):
+    """
+    Make stand-in of the crawler with the state its decision logic reads.
+    """
+    from utils import EventSampler
+
+    account = _Applicant()
+    account.day_offset = day_offset
+    account.unavailability_datetime = []
+    account.dependents = [_Applicant(i) for i in range(1, dependents + 1)]
+    crawler = SimpleNamespace(
+        account=account, rejections=EventSampler(1),
+        logger=SimpleNamespace(debug=lambda *args, **kwargs: None),
+    )
+    for name in (
+                '_reject', 'is_valid_meeting', 'dependents_to_schedule',
+                'applicants_to_schedule'
+            ):
+        setattr(crawler, name, partial(getattr(crawler_class, name), crawler))
+    crawler.order_offices = crawler_class.order_offices
+    crawler.enter_burst_mode = crawler_class.enter_burst_mode
+    return crawler
+
+
+class Simulation:
+    def __init__(
+                self, crawler_class: type, strategy: Strategy,
+                slots: list[Slot], offices: list[str],
+                *, start: datetime, days: float, dependents: int = 0,
+                day_offset: int = 0, latency: float = 0.5, seed: int = 0
+            ):
+        self.strategy = strategy
+        self.slots = [
+            Slot(x.office, x.datetime, x.appeared, x.gone) for x in slots
+        ]
+        self.offices = offices
+        self.start = start
+        self.end = days * DAY
+        self.latency = latency  # in seconds per request
+        self.rng = random.Random(seed)
+        self.crawler = make_crawler(
+            crawler_class, day_offset=day_offset, dependents=dependents
+        )
+        self.reference = make_crawler(
+            crawler_class, day_offset=day_offset, dependents=0
+        )
+        self.clock = 0.0
+        self.active: list[Slot] = []
+        self._pending = iter(self.slots)
+        self._next_slot = next(self._pending, None)
+        self.checks = self.requests = self.detections = 0
+        self.failed_bookings = self.groups = 0
+        self.capture_latencies: list[float] = []
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.clock)
+
+    def advance(self, requests: int) -> None:
+        self.requests += requests
+        self.clock += requests * self.latency
+
+    def _update_active(self) -> None:
+        while self._next_slot and self._next_slot.appeared <= self.clock:
+            self.active.append(self._next_slot)
+            self._next_slot = next(self._pending, None)
+        self.active = [x for x in self.active if x.is_free(self.clock)]
+
+    def meetings(self) -> Iterator[dict]:
+        """
+        Enumerate free slots as `AppointmentPage.all_meetings()`,
+            every select costs a request.
+        """
+        for office in self.crawler.order_offices(self.offices):
+            self.advance(1)
+            self._update_active()
+            free = sorted(
+                (x for x in self.active if x.office == office),
+                key=lambda x: x.datetime
+            )
+            for _, month in groupby(
+                        free, key=lambda x: (x.datetime.year, x.datetime.month)
+                    ):
+                self.advance(1)
+                for _, day in groupby(month, key=lambda x: x.datetime.day):
+                    self.advance(1)
+                    for slot in day:
+                        yield {
+                            'datetime': slot.datetime, 'office': office,
+                            'slot': slot
+                        }
+
+    def get_valid_meeting(self, meetings: Iterator[dict]) -> Optional[dict]:
+        for meeting in meetings:
+            if self.crawler.is_valid_meeting(meeting, now=self.now()):
+                return meeting
+        return None
+
+    def check(self, timeout: 'Default') -> None:
+        """
+        Run a check as `Crawler.schedule_appointments()`.
+        """
+        self.checks += 1
+        self.advance(CHECK_REQUESTS)
+        meetings = self.meetings()
+        if not (meeting := self.get_valid_meeting(meetings)):
+            return
+        self.detections += 1
+        if self.strategy.burst:
+            self.crawler.enter_burst_mode(
+                timeout, range(*self.strategy.burst)
+            )
+        meetings = chain([meeting], meetings)
+        for applicant in self.crawler.applicants_to_schedule():
+            while meeting := self.get_valid_meeting(meetings):
+                self.advance(BOOKING_REQUESTS)
+                slot = meeting['slot']
+                if slot.is_free(self.clock):
+                    slot.captured = True
+                    applicant.updates.datetime_signed = slot.datetime
+                    applicant.updates.office_signed = slot.office
+                    self.capture_latencies.append(
+                        self.clock - slot.appeared
+                    )
+                    break
+                self.failed_bookings += 1
+            else:
+                return
+        # the group is booked, start over to collect more samples
+        self.groups += 1
+        account = self.crawler.account
+        for applicant in [account] + account.dependents:
+            applicant.updates.datetime_signed = None
+            applicant.updates.office_signed = None
+
+    def run(self) -> dict[str, float]:
+        from utils import Default
+
+        timeout = Default(
+            range(*self.strategy.appointment),
+            stash_count=self.strategy.stash_count
+        )
+        with applied(self.strategy):
+            while self.clock < self.end:
+                self.check(timeout)
+                self.clock += self.rng.choice(timeout.value)
+        valid = sum(
+            1 for x in self.slots if x.appeared < self.end and (
+                self.reference.is_valid_meeting(
+                    {'datetime': x.datetime, 'office': x.office},
+                    now=self.start + timedelta(seconds=x.appeared)
+                )
+            ) and x.office not in self.strategy.blocked_offices
+        )
+        captured = len(self.capture_latencies)
+        latencies = sorted(self.capture_latencies)
+        hours = self.end / 60 / 60
+        return {
+            'checks': self.checks,
+            'requests': self.requests,
+            'requests per hour': self.requests / hours,
+            'detections': self.detections,
+            'valid slots': valid,
+            'captured': captured,
+            'capture rate, %': captured / valid * 100 if valid else 0,
+            'groups booked': self.groups,
+            'failed bookings': self.failed_bookings,
+            'capture latency p50, min': (
+                statistics.median(latencies) / 60 if latencies
+                else float('nan')
+            ),
+            'requests per capture': (
+                self.requests / captured if captured else float('nan')
+            ),
+        }
+
+
+def load_crawler_class() -> type:
+    """
+    Import `crawler.Crawler` with files kept in a temporary directory.
+    """
+    from benchmarks.end_to_end import configure
+
+    configure(
+        'http://127.0.0.1', tempfile.mkdtemp(prefix='ari_simulator_'),
+        headless=True
+    )
+    from crawler import Crawler
+    return Crawler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '-d', '--days', type=float, default=7, help='days to simulate'
+    )
+    parser.add_argument(
+        '-s', '--strategies',
+        help='JSON file with a list of `Strategy` fields, '
+        'the current settings and their variations by default'
+    )
+    parser.add_argument('--slots', help='JSON lines file of recorded slots')
+    parser.add_argument('--save-slots', help='file to save used slots to')
+    parser.add_argument('--dependents', type=int, default=0)
+    parser.add_argument('--day-offset', type=int, default=0)
+    parser.add_argument(
+        '--latency', type=float, default=0.5, help='seconds per request'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    defaults = SlotModel()
+    parser.add_argument('--offices', nargs='+', default=defaults.offices)
+    parser.add_argument(
+        '--cancellations', type=float,
+        default=defaults.cancellations_per_day,
+        help='single slots released per office a day'
+    )
+    parser.add_argument(
+        '--batches', type=float, default=defaults.batches_per_day,
+        help='batch releases per office a day'
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=defaults.batch_size
+    )
+    parser.add_argument(
+        '--lifetime', type=float, default=defaults.lifetime / 60,
+        help='mean minutes before a slot is booked away'
+    )
+    args = parser.parse_args()
+    crawler_class = load_crawler_class()
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    if args.slots:
+        slots = load_slots(args.slots, start)
+        offices = sorted({x.office for x in slots})
+    else:
+        model = SlotModel(
+            offices=args.offices, cancellations_per_day=args.cancellations,
+            batches_per_day=args.batches, batch_size=args.batch_size,
+            lifetime=args.lifetime * 60
+        )
+        slots = generate_slots(
+            model, args.days, start, random.Random(args.seed)
+        )
+        offices = model.offices
+    if args.save_slots:
+        save_slots(args.save_slots, slots, start)
+    if args.strategies:
+        with open(args.strategies) as file:
+            strategies = [Strategy(**x) for x in json.load(file)]
+    else:
+        strategies = default_strategies()
+    results = {
+        strategy.name: Simulation(
+            crawler_class, strategy, slots, offices, start=start,
+            days=args.days, dependents=args.dependents,
+            day_offset=args.day_offset, latency=args.latency, seed=args.seed
+        ).run() for strategy in strategies
+    }
+    metrics = list(next(iter(results.values())))
+    width = max(map(len, metrics))
+    print(f"{'':<{width}}" + ''.join(f'{name:>14}' for name in results))
+    for metric in metrics:
+        print(f'{metric:<{width}}' + ''.join(
+            f'{result[metric]:>14.2f}' for result in results.values()
+        ))
+    print('\n' + '\n'.join(
+        json.dumps(asdict(strategy)) for strategy in strategies
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,18 +2,45 @@ import logging
 from typing import Any
 
 from telebot import TeleBot, logger as telebot_logger
+from telebot.apihelper import ApiTelegramException
 from telebot.types import Message
 from loguru import logger
 
 import settings
 from models import Observer, Observable
 from models.chat import Chat
+from models.dispatcher import Coalescer, Dispatcher, Notification, Photo
+from models.exceptions import RateLimitedException, UndeliverableException
 
 telebot_logger.setLevel(logging.FATAL)
 
 _bot = TeleBot(settings.BOT_TOKEN, parse_mode='html')
 
 
+def _deliver(notification: Notification) -> None:
+    try:
+        if notification.photo is not None:
+            notification.photo.send(lambda photo: _bot.send_photo(
+                notification.chat_id, photo, notification.text
+            ).photo[-1].file_id)
+        else:
+            _bot.send_message(notification.chat_id, notification.text)
+    except ApiTelegramException as e:
+        description = e.result_json.get('description')
+        if e.error_code == 429:
+            parameters = e.result_json.get('parameters') or {}
+            raise RateLimitedException(
+                parameters.get('retry_after', 1), description
+            ) from e
+        if e.error_code < 500:  # the request itself is wrong
+            raise UndeliverableException(description) from e
+        raise
+
+
+dispatcher = Dispatcher(_deliver)
+coalescer = Coalescer(dispatcher)
+
+
 class Bot(Observer):
     @staticmethod
     @_bot.message_handler(commands=['start'])
@@ -61,17 +88,21 @@ class Bot(Observer):
             message.append(f"<b>{k.replace('_', ' ').title()}</b>: {attrs[k]}")
         else:
             message = '\n'.join(message)
+        is_booking = 'datetime_signed' in attrs
+        # uploaded once for all the chats
+        photo = Photo(image) if (image := additional.get('image')) else None
         for chat in Chat.get_subscribed():
-            if additional.get('image'):
-                _bot.send_photo(chat.id, additional['image'], message)
+            if photo is not None:
+                # photos are not merged into digests
+                dispatcher.put(Notification(chat.id, message, photo=photo))
             else:
-                _bot.send_message(chat.id, message)
+                coalescer.add(chat.id, message, urgent=is_booking)
 
     @staticmethod
     def send_message(email: str, message: str) -> None:
         message = f"<b>Email</b>: {email}\n<b>Message</b>: {message}"
         for chat in Chat.get_subscribed():
-            _bot.send_message(chat.id, message)
+            coalescer.add(chat.id, message)
 
     @staticmethod
     def send_error(email: str, message: str) -> None:
@@ -79,7 +110,7 @@ class Bot(Observer):
             f'<b>Error</b>\n<b>Email</b>: {email}\n<b>Message</b>: {message}'
         )
         for chat in Chat.get_subscribed():
-            _bot.send_message(chat.id, message)
+            coalescer.add(chat.id, message, key=message)
 
     @staticmethod
     def infinity_polling() -> None:
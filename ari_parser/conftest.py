@@ -0,0 +1,45 @@
+"""
+Fixtures and options shared by `tests` and `benchmarks/micro`.
+
+Tests of the models import the project dependencies (selenium,
+    selenium-wire, loguru, pyTelegramBotAPI, Pillow) and are skipped
+    without them, `pip install` them or run `poetry install` first.
+    Pass `--require-deps` to fail instead of skipping, as in CI.
+"""
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--require-deps', action='store_true',
+        help='fail tests whose dependencies are not installed'
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if report.skipped and item.config.getoption('require_deps') and (
+                call.excinfo is not None
+                and 'could not import' in str(call.excinfo.value)
+            ):
+        report.outcome = 'failed'
+
+
+@pytest.fixture(scope='session')
+def settings(tmp_path_factory):
+    """
+    Keep the database and logs of the imported modules away
+        from the working directory.
+    Request it before importing modules which use settings.
+    """
+    settings = pytest.importorskip('settings')
+    # page urls are built from it on import
+    settings.BASE_URL = settings.BASE_URL or 'http://127.0.0.1'
+    directory = tmp_path_factory.mktemp('ari')
+    settings.DB_NAME = str(directory / 'db.sqlite3')
+    settings.LOGS_PATH = str(directory / 'logs')
+    settings.ArtifactData.PATH = str(directory / 'artifacts')
+    settings.TracingData.PATH = str(directory / 'traces')
+    return settings
@@ -3,11 +3,14 @@ import subprocess
 from functools import partial
 import sys
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from itertools import chain
 from os import path
 from time import sleep
-from typing import Callable, Iterable, Union
+from typing import Callable, Iterable, Optional, Union
+from urllib.parse import urlparse
 
 from datetimerange import DateTimeRange
 from loguru import logger
@@ -15,53 +18,98 @@ from selenium.common import exceptions as selenium_exceptions
 from requests.exceptions import ProxyError
 
 import settings
-from bot import Bot
-from models import exceptions
+from bot import Bot, coalescer, dispatcher
+from models import exceptions, waits
 from models.account import Account, Dependent
-from models.driver import Driver
+from models.artifacts import ArtifactWriter
+from models.driver import create_driver
 from models.page import HomePage, AppointmentPage, ApplicantsPage
-from utils import cycle, cleared, waited, FrozenDict, safe_iter, Default
+from utils import (
+    cycle, cleared, waited, timed, FrozenDict, safe_iter, Default, 
+    EventSampler
+)
+from utils import metrics, tracing
 from utils.url import Url
 
+LOG_FORMAT = (
+    '[{time:YYYY-MM-DD HH:mm:ss}] [{level: ^7}] {extra[email]}: {message}'
+)
 logger.remove(0)
+# sinks are written by a background worker, so logging does not block
 logger.add(
-    sys.stderr, format=(
-        '[{time:YYYY-MM-DD HH:mm:ss}] [{level: ^7}] {extra[email]}: {message}'
-    ), level=settings.LOG_LEVEL
+    sys.stderr, format=LOG_FORMAT, level=settings.LOG_LEVEL, 
+    enqueue=True, serialize=settings.LOG_JSON
 )
 logger.add(
     path.join(settings.LOGS_PATH, '{time:YYYY-MM-DD_HH-mm-ss}.log'), 
-    format=(
-        '[{time:YYYY-MM-DD HH:mm:ss}] [{level: ^7}] {extra[email]}: {message}'
-    ), level=settings.LOG_LEVEL, rotation="00:00"
+    format=LOG_FORMAT, level=settings.LOG_LEVEL, rotation="00:00", 
+    compression=settings.LOG_COMPRESSION, enqueue=True, 
+    serialize=settings.LOG_JSON
 )
 proxies = cycle([''] if not settings.PROXIES else random.sample(
     settings.PROXIES, len(settings.PROXIES)
 ))
+proxies_lock = threading.Lock()
+tracing.tracer.configure(
+    sample_rate=settings.TracingData.SAMPLE_RATE,
+    path=settings.TracingData.PATH
+)
+PROXY_SAFE_SECONDS = metrics.histogram(
+    'ari_proxy_safe_seconds', 'Duration of requests with proxy failover'
+)
+PROXY_ERRORS_TOTAL = metrics.counter(
+    'ari_proxy_errors_total', 'Number of requests failed with proxy error'
+)
+PROXY_FAILOVERS_TOTAL = metrics.counter(
+    'ari_proxy_failovers_total', 'Number of proxy switches after a failure'
+)
+DETECT_TO_BOOK_SECONDS = metrics.histogram(
+    'ari_detect_to_book_seconds', 
+    'Time from detecting a valid slot to booking it'
+)
 logger.configure(extra={'email': '\b'})
 bot = Bot()
 
 
 class Crawler:
     def __init__(self, account_data: FrozenDict, data: dict):
-        self.account = self._create_account(account_data, data)
-        self.driver = Driver(self.account)
-        self.driver.set_page_load_timeout(settings.PAGE_LOAD_TIMEOUT)
+        self.startup_timings = {}
+        with timed(self.startup_timings, 'account'):
+            self.account = self._create_account(account_data, data)
+        self.logger = logger.bind(email=self.account.email)
+        with timed(self.startup_timings, 'driver'):
+            self.driver = create_driver(self.account)
+            self.driver.set_page_load_timeout(settings.PAGE_LOAD_TIMEOUT)
+            self.driver.set_script_timeout(settings.SCRIPT_TIMEOUT)
         self.account.updates.add_observer(bot)
         for dependent in self.account.dependents:
             dependent.updates.add_observer(bot)
-        self.logger = logger.bind(email=self.account.email)
+        self.dependent_tabs = {}  # dependent's id -> tab name
+        # dependent's id -> number of failed selections, time of next try
+        self.dependent_failures: dict[int, tuple[int, float]] = {}
+        self.rejections = EventSampler(settings.LOG_SAMPLE_EVERY)
+        self.detected_at = time.monotonic()
         self.appropriate_status = threading.Event()
         self.access = threading.Event()
         self.access.set()
         self.init_driver()
         self.driver.switch_to_tab(0)
+        self.logger.info(
+            'started in {:.2f}s ({})', sum(self.startup_timings.values()),
+            ', '.join(
+                f'{name}: {seconds:.2f}s' 
+                for name, seconds in self.startup_timings.items()
+            )
+        )
 
     def init_driver(self):
-        self.update_proxy()
+        timings = self.startup_timings
+        with timed(timings, 'proxy'):
+            self.update_proxy()
         page = HomePage(self.driver)
-        self.raw_get(page.URL)
-        page.language = 'en'
+        with timed(timings, 'home page'):
+            self.raw_get(page.URL)
+            page.language = 'en'
         if self.account.auth_token:
             self.driver.add_cookie({
                 'name': settings.AUTH_TOKEN_COOKIE_NAME, 
@@ -75,45 +123,155 @@ class Crawler:
             })
             self.logger.info("a session id cookie is used")
         try:
-            self.get(page.URL)
+            with timed(timings, 'log in'):
+                self.get(page.URL)
         except exceptions.AuthorizationException as e:
             self.logger.error(str(e))
             bot.send_error(self.account.email, str(e))
             raise
-        self.driver.open_new_tab()  # reserve a tab for status checking
+        with timed(timings, 'status tab'):
+            self.driver.open_new_tab()  # reserve a tab for status checking
+        if self.account.dependents:
+            with timed(timings, 'dependents status'):
+                self.update_dependents_status(to_notify=False)
         self.driver.switch_to_tab(0)
+
+    def update_dependents_status(self, *, to_notify: bool = True) -> bool:
+        """
+        Update statuses of all the dependents in the current tab.
+        All statuses are read from the applicants table at once.
+        
+        Args:
+            to_notify (bool, optional): to notify observers about changes
+        
+        Returns:
+            bool: whether any status has changed
+        """
+        p = HomePage(self.driver)
+        self.get(p.URL)
+        p.language = 'en'
+        try:
+            p.click_applicants()
+        except selenium_exceptions.TimeoutException:
+            # there is no button so there are no dependents
+            msg = 'no dependents detected'
+            self.logger.error(msg)
+            bot.send_error(self.account.email, msg)
+            return False
+        statuses = self._read_dependents_statuses()
+        has_changed = False
         for dependent in self.account.dependents:
-            self.driver.open_new_tab()
-            p = HomePage(self.driver)
-            self.get(p.URL)
-            p.language = 'en'
-            try:
-                p.click_applicants()
-            except selenium_exceptions.TimeoutException:
-                # there is no button so there are no dependents
-                msg = 'no dependents detected'
+            if (status := statuses.get(dependent.name)) is None:
+                msg = f'no dependent with name {dependent.name!r}'
                 self.logger.error(msg)
                 bot.send_error(self.account.email, msg)
-                return
-            p = ApplicantsPage(self.driver)
+                continue
+            self.logger.debug("{!r} status is {}", dependent.name, status)
+            if status == dependent.updates.status:
+                continue
+            has_changed = True
+            dependent.updates.update(status=status, additional={
+                'to_notify': to_notify,
+                'email': self.account.email,
+                'dependent_name': dependent.name
+            })
+        return has_changed
+
+    def _read_dependents_statuses(self) -> dict[str, str]:
+        """
+        Read statuses of the dependents from the applicants table at once,
+            or one by one if the table is not recognized.
+
+        Returns:
+            dict[str, str]: names of the found dependents mapped to statuses
+        """
+        p = ApplicantsPage(self.driver)
+        try:
+            return p.applicants_statuses
+        except (
+                    exceptions.NoStatusException,
+                    selenium_exceptions.WebDriverException
+                ) as e:
+            self.logger.warning(
+                'applicants table is not recognized ({}), '
+                'reading statuses one by one', e
+            )
+        statuses = {}
+        for dependent in self.account.dependents:
             try:
                 p.set_applicant(dependent.name)
-            except selenium_exceptions.TimeoutException:
-                msg = f'no dependent with name {dependent.name!r}'
-                self.logger.error(msg)
+                statuses[dependent.name] = p.applicant_status
+            except (ValueError, selenium_exceptions.WebDriverException):
+                continue  # reported as not found by the caller
+        return statuses
+
+    def _switch_to_dependent_tab(self, dependent: Dependent) -> bool:
+        """
+        Switch to the tab of the dependent, creating it on first call.
+        The tab is inserted right after the main applicant's one.
+        Failed selections are retried with exponential backoff,
+            the error is reported once.
+        
+        Args:
+            dependent (Dependent): dependent to switch to
+        
+        Returns:
+            bool: False if the dependent can not be selected
+        """
+        if tab_name := self.dependent_tabs.get(dependent.id):
+            self.driver.switch_to_tab(self.driver.tabs.index(tab_name))
+            return True
+        failures, retry_at = self.dependent_failures.get(dependent.id, (0, 0))
+        if time.monotonic() < retry_at:
+            return False
+        timings = {}
+        self.driver.switch_to_tab(0)
+        with timed(timings, 'open tab'):
+            self.driver.open_new_tab()
+        p = HomePage(self.driver)
+        try:
+            with timed(timings, 'home page'):
+                self.get(p.URL)
+                p.language = 'en'
+            with timed(timings, 'select dependent'):
+                p.click_applicants()
+                ApplicantsPage(self.driver).set_applicant(dependent.name)
+        except (
+                    selenium_exceptions.TimeoutException, 
+                    selenium_exceptions.NoSuchElementException,
+                    ValueError
+                ):
+            msg = f'unable to select dependent {dependent.name!r}'
+            self.logger.error(msg)
+            if not failures:
                 bot.send_error(self.account.email, msg)
-                continue
-            dependent.updates.update(
-                status=p.applicant_status, additional={'to_notify': False}
+            self.driver.close_tab()
+            backoff = min(
+                settings.DEPENDENT_TAB_BACKOFF * 2 ** failures,
+                settings.DEPENDENT_TAB_MAX_BACKOFF
             )
-            self.logger.debug(
-                f"{dependent.name!r} status is {p.applicant_status}"
+            self.dependent_failures[dependent.id] = (
+                failures + 1, time.monotonic() + backoff
             )
+            return False
+        self.dependent_failures.pop(dependent.id, None)
+        self.dependent_tabs[dependent.id] = self.driver.current_tab
+        self.logger.debug(
+            '{!r} tab created in {}', dependent.name, ', '.join(
+                f'{name}: {seconds:.2f}s' 
+                for name, seconds in timings.items()
+            )
+        )
+        return True
 
     def update_proxy(self):
-        with threading.Lock():
-            self.driver.set_proxy(next(proxies))
-        self.logger.debug(f'Set proxy to {self.driver.proxy}')
+        with proxies_lock:
+            proxy = next(proxies)
+        with tracing.span('update_proxy'):
+            self.driver.set_proxy(proxy)
+        # credentials must not get into traces
+        tracing.tag(proxy=urlparse(proxy).hostname if proxy else None)
+        self.logger.debug('Set proxy to {}', self.driver.proxy)
 
     def __proxy_safe(self, func: Callable, *, args=None, kwargs=None) -> True:
         """
@@ -135,20 +293,26 @@ class Crawler:
         """
         args = args or tuple()
         kwargs = kwargs or {}
-        try:
-            result = func(*args, **kwargs)
-            if self.test_response():
-                return result
-        except ProxyError:
-            pass
-        for _ in range(len(settings.PROXIES)):
-            self.update_proxy()
+        # any exception but ProxyError escapes with the 'error' result
+        with PROXY_SAFE_SECONDS.time(result='error') as labels:
             try:
                 result = func(*args, **kwargs)
                 if self.test_response():
+                    labels['result'] = 'ok'
                     return result
             except ProxyError:
-                pass
+                PROXY_ERRORS_TOTAL.inc()
+            for _ in range(len(settings.PROXIES)):
+                PROXY_FAILOVERS_TOTAL.inc()
+                self.update_proxy()
+                try:
+                    result = func(*args, **kwargs)
+                    if self.test_response():
+                        labels['result'] = 'ok'
+                        return result
+                except ProxyError:
+                    PROXY_ERRORS_TOTAL.inc()
+            labels['result'] = 'failed'
         raise exceptions.ProxyException('unable to get page via all proxies')
 
     def test_response(self) -> bool:
@@ -181,7 +345,9 @@ class Crawler:
     def update_status(self):
         page = HomePage(self.driver)
         has_changed = False
-        with cleared(self.access):
+        with cleared(self.access), tracing.trace(
+                    'status', account=self.account.email
+                ):
             self.driver.switch_to_tab(-1)
             self.update_proxy()
             self.logger.info('checking status')
@@ -204,16 +370,21 @@ class Crawler:
                         'email': self.account.email
                     }
                 )
-                self.driver.save_snapshot(settings.SNAPSHOTS_PATH)
-                self.driver.save_screenshot(settings.SCREENSHOTS_PATH)
+                self.driver.save_snapshot()
+                self.driver.save_screenshot()
             else:
                 self.logger.info("status has not changed")
+            if self.account.dependents:
+                self.logger.info('checking dependents status')
+                has_changed |= self.update_dependents_status()
             return has_changed
 
     @logger.catch
     def schedule_appointments(self):
         page = HomePage(self.driver)
-        with waited(self.appropriate_status), cleared(self.access):
+        with waited(self.appropriate_status), cleared(self.access), (
+                    tracing.trace('appointments', account=self.account.email)
+                ):
             self.driver.switch_to_tab(0)
             self.get(page.URL)
             try:
@@ -222,23 +393,29 @@ class Crawler:
                 # inappropriate status for checking appointments
                 self.logger.error('no calendar button')
                 raise exceptions.NoAppointmentsException from None
-            iterator = self._check_new_appointments()
-            if not iterator:
-                return
-            settings.RequestTimeout.APPOINTMENT.value = (
-                settings.RequestTimeout.BURST_APPOINTMENT
-            )
-            self.driver.save_snapshot(settings.SNAPSHOTS_PATH)
-            self.driver.save_screenshot(settings.SCREENSHOTS_PATH)
-            is_ok = self._schedule_main(iterator)
-            if not is_ok:
-                return True
-            return self._schedule_dependents(iterator)
+            try:
+                iterator = self._check_new_appointments()
+                if not iterator:
+                    return
+                self.enter_burst_mode()
+                self.driver.save_snapshot()
+                self.driver.save_screenshot()
+                is_ok = self._schedule_main(iterator)
+                if not is_ok:
+                    return True
+                return self._schedule_dependents(iterator)
+            finally:
+                self._log_rejections()
+                self._log_element_lookups()
 
     def get_valid_meeting(self, meetings_iterator: 'safe_iter'):
-        while meeting := next(meetings_iterator):
-            if self.is_valid_meeting(meeting):
-                return meeting
+        with tracing.span('find_valid_meeting'):
+            while meeting := next(meetings_iterator):
+                with tracing.span('validate'):
+                    is_valid = self.is_valid_meeting(meeting)
+                if is_valid:
+                    tracing.tag(office=meeting['office'])
+                    return meeting
         return False
 
     def _check_new_appointments(self) -> Union[chain, bool]:
@@ -249,17 +426,11 @@ class Crawler:
         page.refresh()
         page.language = 'en'
         page.matter_option = 'ARI'
-        offices = list(filter(
-            lambda x: x not in settings.AppointmentData.BLOCKED_OFFICES, 
-            page.branch_options
-        ))  # filter out inappropriate offices
-        offices.sort(key=lambda x: (
-            x in settings.AppointmentData.PRIORITY_OFFICES
-        ), reverse=True)
         meetings_iterator = safe_iter(
-            page.all_meetings(offices=offices)
+            page.all_meetings(offices=self.order_offices(page.branch_options))
         )
         meeting = self.get_valid_meeting(meetings_iterator)
+        self.detected_at = time.monotonic()
         if not meeting:
             self.logger.info('no appointments have appeared')
             return False
@@ -267,21 +438,98 @@ class Crawler:
             # push meeting back to the iterator
             return chain([meeting], meetings_iterator)
 
-    def is_valid_meeting(self, meeting: dict) -> bool:
-        min_datetime = (datetime.now() + timedelta(
+    @staticmethod
+    def enter_burst_mode(
+                timeout: Optional[Default] = None,
+                burst: Optional[range] = None
+            ) -> None:
+        """
+        Check appointments more often for a while, as slots have appeared.
+        Is shared with `benchmarks.simulator`.
+
+        Args:
+            timeout (Optional[Default], optional): seconds between checks,
+                `settings.RequestTimeout.APPOINTMENT` by default
+            burst (Optional[range], optional): seconds between checks
+                in burst mode, `settings.RequestTimeout.BURST_APPOINTMENT`
+                by default
+        """
+        timeout = timeout or settings.RequestTimeout.APPOINTMENT
+        timeout.value = burst or settings.RequestTimeout.BURST_APPOINTMENT
+
+    def dependents_to_schedule(self) -> list[Dependent]:
+        """
+        Get dependents to be booked, in order of booking.
+        Signed dependents and the ones with
+            `settings.DISABLE_APPOINTMENT_CHECKS_STATUS` are skipped.
+
+        Returns:
+            list[Dependent]: sorted by id
+        """
+        return [
+            x for x in sorted(self.account.dependents, key=lambda x: x.id)
+            if not x.is_signed and x.updates.status != (
+                settings.DISABLE_APPOINTMENT_CHECKS_STATUS
+            )
+        ]
+
+    def applicants_to_schedule(self) -> list[Union[Account, Dependent]]:
+        """
+        Get applicants to be booked, in order of booking: the account
+            unless it is signed, then `dependents_to_schedule()`.
+        Booking stops at the first applicant who can not be booked.
+        Is shared with `benchmarks.simulator`.
+
+        Returns:
+            list[Union[Account, Dependent]]
+        """
+        applicants = [] if self.account.is_signed else [self.account]
+        return applicants + self.dependents_to_schedule()
+
+    @staticmethod
+    def order_offices(offices: Iterable[str]) -> list[str]:
+        """
+        Filter out blocked offices and put the priority ones first.
+        
+        Args:
+            offices (Iterable[str]): options of the branch select
+        
+        Returns:
+            list[str]: offices in order of checking
+        """
+        offices = [
+            x for x in offices 
+            if x not in settings.AppointmentData.BLOCKED_OFFICES
+        ]
+        offices.sort(key=lambda x: (
+            x in settings.AppointmentData.PRIORITY_OFFICES
+        ), reverse=True)
+        return offices
+
+    def is_valid_meeting(
+                self, meeting: dict, *, now: datetime = None
+            ) -> bool:
+        """
+        Check the meeting against day offset, unavailability periods
+            and meetings of the other applicants.
+        
+        Args:
+            meeting (dict): as yielded by `AppointmentPage.all_meetings()`
+            now (datetime, optional): current time, for simulations
+        
+        Returns:
+            bool: ...
+        """
+        min_datetime = ((now or datetime.now()) + timedelta(
             days=self.account.day_offset
         )).date()
         if meeting['datetime'].date() < min_datetime:
-            self.logger.debug(f'Meeting {meeting} is invalid by day offset')
-            return False
+            return self._reject(meeting, 'day offset')
         elif any(
                     meeting['datetime'] in drange 
                     for drange in self.account.unavailability_datetime
                 ):
-            self.logger.debug(
-                f'Meeting {meeting} is in unavailability periods'
-            )
-            return False
+            return self._reject(meeting, 'unavailability periods')
         else:
             applicants = [d.updates for d in self.account.dependents] + [
                 self.account.updates
@@ -306,25 +554,43 @@ class Crawler:
                         ):
                     is_valid = False
                     break
-            if is_valid:
-                self.logger.debug(f'Meeting {meeting} is valid')
-            else:
-                self.logger.debug(
-                    f"Meeting {meeting} is too close to scheduled meetings"
-                )
+            if not is_valid:
+                return self._reject(meeting, 'closeness to scheduled meetings')
+            self.logger.debug('Meeting {} is valid', meeting)
             return is_valid
 
+    def _reject(self, meeting: dict, reason: str) -> False:
+        """
+        Log rejection of the meeting, sampled by `self.rejections`.
+        Totals are logged by `_log_rejections()`.
+        """
+        if self.rejections(reason):
+            self.logger.debug('Meeting {} is rejected by {}', meeting, reason)
+        return False
+
+    def _log_rejections(self) -> None:
+        for reason, count in self.rejections.flush().items():
+            self.logger.info('{} slots rejected by {}', count, reason)
+
+    def _log_element_lookups(self) -> None:
+        saved, lookups = self.driver.flush_element_stats()
+        tracing.tag(element_lookups=lookups, element_lookups_saved=saved)
+        self.logger.debug(
+            '{} of {} element lookups saved by cache', saved, lookups
+        )
+
     def _schedule_main(self, meetings_iterator: 'safe_iter'):
         page = AppointmentPage(self.driver)
         if not self.account.is_signed:
             while meeting := self.get_valid_meeting(meetings_iterator):
                 page.refresh()
                 try:
-                    is_success = page.schedule(meeting)
+                    with tracing.span('book', office=meeting['office']):
+                        is_success = page.schedule(meeting)
                     if not is_success:
                         raise selenium_exceptions.NoSuchElementException
                 except selenium_exceptions.NoSuchElementException:
-                    self.logger.warning(f'Meeting {meeting} is unavailable')
+                    self.logger.warning('Meeting {} is unavailable', meeting)
                 except Exception as e:
                     self.logger.error("appointment {}", e.__class__)
                 else:
@@ -333,6 +599,7 @@ class Crawler:
                         '{!r} office',
                         meeting['datetime'], meeting['office']
                     )
+                    self._observe_booking('main')
                     self.account.updates.update(
                         office_signed=meeting['office'],
                         datetime_signed=meeting['datetime'],
@@ -343,35 +610,39 @@ class Crawler:
             return False
         return True
 
+    def _observe_booking(self, applicant: str) -> None:
+        DETECT_TO_BOOK_SECONDS.observe(
+            time.monotonic() - self.detected_at, applicant=applicant
+        )
+        self.logger.info(
+            'detect-to-book latency p50={:.2f}s p99={:.2f}s', 
+            DETECT_TO_BOOK_SECONDS.quantile(0.5, applicant=applicant),
+            DETECT_TO_BOOK_SECONDS.quantile(0.99, applicant=applicant)
+        )
+
     def _schedule_dependents(self, meetings_iterator: 'safe_iter'):
         p = ApplicantsPage(self.driver)
-        # breakpoint()
-        for tab_index, dependent in enumerate(
-                    sorted(self.account.dependents, key=lambda x: x.id), 
-                    start=1
-                ): 
-            if dependent.is_signed or dependent.updates.status == (
-                        settings.DISABLE_APPOINTMENT_CHECKS_STATUS
-                    ):
+        for dependent in self.dependents_to_schedule():
+            if not self._switch_to_dependent_tab(dependent):
                 continue
-            self.driver.switch_to_tab(tab_index)
-            sleep(0.25)
+            waits.document_ready(self.driver)
             if self.driver.url == p.URL:
                 p.get_applicant_appointment()
             page = AppointmentPage(self.driver)
             page.language = 'en'
-            self.driver.save_snapshot(settings.SNAPSHOTS_PATH)
+            self.driver.save_snapshot()
             while meeting := self.get_valid_meeting(meetings_iterator):
                 try:
                     page.refresh()
-                    is_success = page.schedule(meeting)
+                    with tracing.span('book', office=meeting['office']):
+                        is_success = page.schedule(meeting)
                     if not is_success:
                         raise selenium_exceptions.NoSuchElementException
                 except selenium_exceptions.NoSuchElementException:
-                    self.logger.warning(f'Meeting {meeting} is unavailable')                        
+                    self.logger.warning('Meeting {} is unavailable', meeting)                        
                 except Exception as e:
                     self.logger.error(
-                        f'{dependent.name!r} appointment {e.__class__}'
+                        '{!r} appointment {}', dependent.name, e.__class__
                     )
                 else:
                     self.logger.success(
@@ -381,6 +652,7 @@ class Crawler:
                         meeting['datetime'],
                         meeting['office']
                     )
+                    self._observe_booking('dependent')
                     dependent.updates.update(
                         office_signed=meeting['office'], 
                         datetime_signed=meeting['datetime'],
@@ -427,27 +699,80 @@ class Crawler:
             self._create_thread(data['method'], data['sleep_time_range'])
 
 
+def _create_crawler(account: FrozenDict, data: dict) -> Union[Crawler, None]:
+    try:
+        crawler = Crawler(account, data)
+    except Exception as e:
+        logger.error(
+            f'Crawler {account["email"]} raised '
+            f'{e.__class__.__name__}: {str(e)}'
+        )
+        return None
+    crawler.start = partial(crawler.start, checks=data['checks'])
+    return crawler
+
+
+def start_crawlers(accounts: dict[FrozenDict, dict]) -> list[Crawler]:
+    """
+    Create crawlers of the accounts concurrently and start their checks.
+    
+    Args:
+        accounts (dict[FrozenDict, dict]): as `settings.ACCOUNTS`
+    
+    Returns:
+        list[Crawler]: started crawlers, the failed ones are left out
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(
+                max_workers=settings.STARTUP_CONCURRENCY
+            ) as executor:
+        crawlers = [
+            crawler for crawler in executor.map(
+                lambda item: _create_crawler(*item), accounts.items()
+            ) if crawler is not None
+        ]
+    logger.info(
+        '{} of {} crawlers started in {:.2f}s', len(crawlers), 
+        len(accounts), time.perf_counter() - start
+    )
+    for crawler in crawlers:
+        crawler.start()
+    return crawlers
+
+
 def main():
     logger.info("Parser started")
-    crawlers = []
-    for account, data in settings.ACCOUNTS.items():
+    if settings.MetricsData.PORT:
         try:
-            crawler = Crawler(account, data)
-        except Exception as e:
+            metrics.start_server(settings.MetricsData.PORT)
+        except OSError as e:
             logger.error(
-                f'Crawler {account["email"]} raised '
-                f'{e.__class__.__name__}: {str(e)}'
+                'Unable to serve metrics on port {}: {}',
+                settings.MetricsData.PORT, e
             )
-        else:
-            crawlers.append(crawler)
-            crawler.start = partial(crawler.start, checks=data['checks'])
+    if settings.MetricsData.DUMP_PATH:
+        metrics.start_dumping(
+            settings.MetricsData.DUMP_PATH, settings.MetricsData.DUMP_INTERVAL
+        )
+    crawlers = start_crawlers(settings.ACCOUNTS)
     if not crawlers:
         logger.error('All crawlers are dead')
         return
-    for crawler in crawlers:
-        crawler.start()
     bot.infinity_polling()
     logger.info("Shutting down the parser")
+    for crawler in crawlers:
+        if crawler.driver.COUNTS_BLOCKED:
+            crawler.logger.info(
+                'resource policy: {}', crawler.driver.resource_policy.stats
+            )
+    if settings.MetricsData.DUMP_PATH:
+        metrics.Registry().dump(settings.MetricsData.DUMP_PATH)
+    if not ArtifactWriter().join(timeout=10):
+        logger.warning('not all artifacts were written')
+    coalescer.close()
+    if not dispatcher.join(timeout=10):
+        logger.warning('not all notifications were sent')
+    logger.complete()  # flush the enqueued log messages
     # Kill all instances of driver
     if crawlers:
         subprocess.call(
@@ -1,7 +1,10 @@
 import argparse
+import os
+from datetime import datetime
 
 import bot
 import crawler
+from models.artifacts import ArtifactStore
 from models.db import AccountDatabase
 from models import exceptions
 
@@ -25,6 +28,27 @@ parser_db.add_argument(
     '-n', '--name', action='append', default=list(), dest='names',
     help='name of the dependent applicant', required=False
 )
+parser_artifacts = subparsers.add_parser(
+    'artifacts', help='look up saved snapshots and screenshots'
+)
+parser_artifacts.add_argument(
+    '-e', '--email', dest='account', help='email of main applicant'
+)
+parser_artifacts.add_argument(
+    '-p', '--page', help='name of the page, e.g. ARIAgenda.aspx'
+)
+parser_artifacts.add_argument(
+    '-k', '--kind', choices=['snapshot', 'screenshot'], help='artifact kind'
+)
+parser_artifacts.add_argument(
+    '--since', type=datetime.fromisoformat, help='UTC time, e.g. 2022-01-31'
+)
+parser_artifacts.add_argument(
+    '--until', type=datetime.fromisoformat, help='UTC time, e.g. 2022-01-31'
+)
+parser_artifacts.add_argument(
+    '--export', metavar='DIR', help='write found artifacts to the directory'
+)
 
 
 if __name__ == '__main__':
@@ -70,3 +94,21 @@ if __name__ == '__main__':
                         f"[SUCCESS] Dependents's `{name}` "
                         "appointment has been deleted"
                     )
+    elif args.command == 'artifacts':
+        store = ArtifactStore()
+        entries = store.find(
+            account=args.account, page=args.page, kind=args.kind,
+            since=args.since, until=args.until
+        )
+        if args.export:
+            os.makedirs(args.export, exist_ok=True)
+        for entry in entries:
+            extension = 'html' if entry['kind'] == 'snapshot' else 'png'
+            filename = (
+                f"{entry['created']:%Y-%m-%d_%H-%M}__{entry['account']}__"
+                f"{entry['page']}__{entry['id']}.{extension}"
+            )
+            print(f"{filename} {entry['hash'][:12]} {entry['size']}B")
+            if args.export:
+                with open(os.path.join(args.export, filename), 'wb') as file:
+                    file.write(store.read(entry))
@@ -0,0 +1,265 @@
+import base64
+import gzip
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Optional, Union
+
+from loguru import logger
+
+from .db import ArtifactDatabase
+import settings
+from utils import Singleton
+
+# values of these fields change on every response of the portal
+VOLATILE_FIELDS = re.compile(
+    rb'(id="__(?:VIEWSTATE|VIEWSTATEGENERATOR|EVENTVALIDATION)" value=")'
+    rb'[^"]*"'
+)
+RETENTION_BATCH = 100  # index entries read at once by retention
+
+
+@dataclass
+class Artifact:
+    """
+    Captured page state to be persisted by `ArtifactWriter`.
+    `data` is page source for snapshots and base64-encoded PNG
+        for screenshots, as they are returned by WebDriver.
+    """
+    kind: str  # 'snapshot' or 'screenshot'
+    account: str
+    page: str
+    data: Union[str, bytes]
+    created: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def filename(self) -> str:
+        extension = 'html' if self.kind == 'snapshot' else 'png'
+        now = self.created.strftime('%Y-%m-%d_%H-%M-%S')
+        return f"{now}__{self.account}__{self.page}.{extension}"
+
+    @property
+    def content(self) -> bytes:
+        if self.kind == 'snapshot':
+            return self.data.encode('utf-8')
+        return base64.b64decode(self.data)
+
+
+class ArtifactStore(metaclass=Singleton):
+    """
+    Content-addressed storage of artifacts with an index in database.
+    Objects are named by hash of their content, so equal artifacts are 
+        stored once. Snapshots are hashed without ASP.NET state fields, 
+        which differ on every response, and stored gzip-compressed.
+    Retention removes index entries older than `max_age` days and the
+        oldest ones while stored objects exceed `max_size` bytes.
+    """
+
+    def __init__(
+                self, root: str = settings.ArtifactData.PATH,
+                *, max_size: Optional[int] = settings.ArtifactData.MAX_SIZE,
+                max_age: Optional[int] = settings.ArtifactData.MAX_AGE
+            ):
+        self.root = root
+        self.max_size = max_size
+        self.max_age = max_age
+        self._db = ArtifactDatabase()
+
+    @staticmethod
+    def hash(artifact: Artifact, content: bytes) -> str:
+        if artifact.kind == 'snapshot':
+            content = VOLATILE_FIELDS.sub(rb'\1"', content)
+        return hashlib.sha256(content).hexdigest()
+
+    def path(self, hash_: str, kind: str) -> str:
+        extension = 'html.gz' if kind == 'snapshot' else 'png'
+        return os.path.join(
+            self.root, 'objects', hash_[:2], f'{hash_[2:]}.{extension}'
+        )
+
+    def add(self, artifact: Artifact) -> str:
+        """
+        Store the artifact unless equal one is stored, and index it.
+
+        Args:
+            artifact (Artifact): artifact to be stored
+
+        Returns:
+            str: hash of the artifact's content
+        """
+        content = artifact.content
+        hash_ = self.hash(artifact, content)
+        path = self.path(hash_, artifact.kind)
+        if not os.path.exists(path):
+            if artifact.kind == 'snapshot':
+                content = gzip.compress(content)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f'{path}.tmp', 'wb') as file:
+                file.write(content)
+            os.replace(f'{path}.tmp', path)
+        self._db.add_artifact(
+            hash_, artifact.kind, artifact.account, artifact.page,
+            artifact.created, os.path.getsize(path)
+        )
+        return hash_
+
+    def find(self, **kwargs) -> list[dict[str, Any]]:
+        """
+        Look artifacts up in the index.
+        Accepts the filters of `ArtifactDatabase.get_artifacts()`.
+
+        Returns:
+            list[dict[str, Any]]: index entries, oldest first
+        """
+        return self._db.get_artifacts(**kwargs)
+
+    def read(self, entry: dict[str, Any]) -> bytes:
+        """
+        Read original content of the indexed artifact.
+
+        Args:
+            entry (dict[str, Any]): index entry from `find()`
+
+        Returns:
+            bytes: page source or PNG image
+        """
+        with open(self.path(entry['hash'], entry['kind']), 'rb') as file:
+            content = file.read()
+        if entry['kind'] == 'snapshot':
+            return gzip.decompress(content)
+        return content
+
+    def enforce_retention(self) -> int:
+        """
+        Remove entries and objects not fitting `max_age` and `max_size`.
+
+        Returns:
+            int: number of removed index entries
+        """
+        removed = []
+        if self.max_age is not None:
+            removed.extend(self._db.get_artifacts(
+                until=datetime.utcnow() - timedelta(days=self.max_age)
+            ))
+            for entry in removed:
+                self._db.delete_artifact(entry['id'])
+        if self.max_size is not None:
+            total = self._db.get_total_size()
+            last_id = None
+            while total > self.max_size:
+                batch = self._db.get_artifacts(
+                    after_id=last_id, limit=RETENTION_BATCH
+                )
+                if not batch:
+                    break
+                for entry in batch:
+                    if total <= self.max_size:
+                        break
+                    self._db.delete_artifact(entry['id'])
+                    removed.append(entry)
+                    # objects shared with newer entries are kept
+                    if not self._db.is_referenced(entry['hash']):
+                        total -= entry['size']
+                last_id = batch[-1]['id']
+        for entry in removed:
+            path = self.path(entry['hash'], entry['kind'])
+            if not self._db.is_referenced(entry['hash']) and (
+                        os.path.exists(path)
+                    ):
+                os.remove(path)
+        return len(removed)
+
+
+class ArtifactWriter(metaclass=Singleton):
+    """
+    Persist artifacts in a background thread.
+    The queue is bounded, when it is full either the oldest queued
+        artifact ('oldest') or the incoming one ('newest') is dropped,
+        so producers never wait.
+    """
+
+    def __init__(
+                self, *, maxsize: int = settings.ArtifactData.QUEUE_SIZE,
+                drop_policy: str = settings.ArtifactData.DROP_POLICY
+            ):
+        if drop_policy not in ('oldest', 'newest'):
+            raise ValueError(f'unsupported drop policy {drop_policy!r}')
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.written = 0
+        self.store = ArtifactStore()
+        self._last_retention = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def put(self, artifact: Artifact) -> bool:
+        """
+        Queue the artifact to be persisted without blocking.
+
+        Args:
+            artifact (Artifact): artifact to be persisted
+
+        Returns:
+            bool: False if the artifact was dropped
+        """
+        with self._lock:
+            try:
+                self._queue.put_nowait(artifact)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                if self.drop_policy == 'newest':
+                    logger.warning(f'{artifact.filename!r} is dropped')
+                    return False
+            try:
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                logger.warning(f'{dropped.filename!r} is dropped')
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(artifact)
+            return True
+
+    def _run(self) -> None:
+        while True:
+            artifact = self._queue.get()
+            try:
+                self.store.add(artifact)
+                self.written += 1
+                if (
+                            time.monotonic() - self._last_retention 
+                            > settings.ArtifactData.RETENTION_INTERVAL
+                        ):
+                    self._last_retention = time.monotonic()
+                    if removed := self.store.enforce_retention():
+                        logger.info(f'{removed} artifacts are removed')
+            except Exception as e:
+                logger.error(
+                    f'unable to persist {artifact.filename!r}: '
+                    f'{e.__class__.__name__}: {e}'
+                )
+            finally:
+                self._queue.task_done()
+
+    def join(self, timeout: float) -> bool:
+        """
+        Wait until all the queued artifacts are persisted.
+
+        Args:
+            timeout (float): max number of seconds to wait
+
+        Returns:
+            bool: False if timed out
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
@@ -0,0 +1,359 @@
+import base64
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from urllib.request import urlopen
+
+import websocket
+from loguru import logger
+
+from .exceptions import CDPException
+
+
+ELEMENTS_SCRIPT = '''(() => {
+    const selectors = %s;
+    const result = {};
+    for (const [name, selector] of Object.entries(selectors)) {
+        const element = document.querySelector(selector);
+        result[name] = element === null ? null : {
+            text: element.innerText,
+            value: element.value === undefined ? null : element.value
+        };
+    }
+    return result;
+})()'''
+
+RECT_SCRIPT = '''(() => {
+    const element = document.querySelector(%s);
+    if (element === null) return null;
+    const rect = element.getBoundingClientRect();
+    return {
+        x: rect.left + window.scrollX, y: rect.top + window.scrollY,
+        width: rect.width, height: rect.height
+    };
+})()'''
+
+
+@dataclass
+class RequestTiming:
+    url: str
+    start: float  # monotonic timestamp of the browser, in seconds
+    end: Optional[float] = None
+    size: int = 0  # encoded bytes received
+    failed: bool = False
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+
+class CDPClient:
+    """
+    Client of Chrome DevTools Protocol attached to a single page target.
+    Responses and events are read by a background thread.
+    Network and Page domains are enabled to provide request timings
+        and precise waits.
+    """
+    MAX_TIMINGS = 200
+
+    def __init__(
+                self, port: int, target_id: str,
+                *, host: str = '127.0.0.1', timeout: float = 10
+            ):
+        self.timeout = timeout
+        with urlopen(f'http://{host}:{port}/json', timeout=timeout) as r:
+            targets = json.load(r)
+        for target in targets:
+            if target['id'] == target_id:
+                break
+        else:
+            raise CDPException(f'no target with id {target_id!r}')
+        self._ws = websocket.create_connection(
+            target['webSocketDebuggerUrl'], timeout=timeout,
+            suppress_origin=True
+        )
+        self._ids = itertools.count(1)
+        self._pending: dict[int, list] = {}  # id -> [Event, message]
+        self._listeners: dict[str, list[Callable[[dict], None]]] = {}
+        self._condition = threading.Condition()
+        self._inflight: dict[str, float] = {}  # request id -> start
+        self._last_network_activity = time.monotonic()
+        self.timings: OrderedDict[str, RequestTiming] = OrderedDict()
+        self.is_closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self.on('Network.requestWillBeSent', self._on_request)
+        self.on('Network.loadingFinished', self._on_finished)
+        self.on('Network.loadingFailed', self._on_failed)
+        self.send('Network.enable')
+        self.send('Page.enable')
+
+    def _read_loop(self) -> None:
+        while not self.is_closed:
+            try:
+                message = json.loads(self._ws.recv())
+            except websocket.WebSocketTimeoutException:
+                continue
+            except Exception:
+                self.close()
+                break
+            try:
+                self._dispatch(message)
+            except Exception:
+                # callers fall back at once instead of timing out
+                logger.exception('CDP message {!r} is not handled', message)
+                self.close()
+                break
+
+    def _dispatch(self, message: dict) -> None:
+        if 'id' in message:
+            pending = self._pending.pop(message['id'], None)
+            if pending is not None:
+                pending[1] = message
+                pending[0].set()
+            return
+        method = message.get('method')
+        for listener in list(self._listeners.get(method, [])):
+            try:
+                listener(message.get('params', {}))
+            except Exception:
+                logger.exception('CDP listener of {} failed', method)
+        with self._condition:
+            self._condition.notify_all()
+
+    def send(
+                self, method: str, params: Optional[dict] = None,
+                *, timeout: Optional[float] = None
+            ) -> dict:
+        """
+        Send command and wait for its result.
+
+        Args:
+            method (str): e.g. 'Runtime.evaluate'
+            params (Optional[dict], optional): parameters of the command
+            timeout (Optional[float], optional): seconds to wait
+
+        Returns:
+            dict: result of the command
+
+        Raises:
+            CDPException: command failed or timed out
+        """
+        if self.is_closed:
+            raise CDPException('connection is closed')
+        id_ = next(self._ids)
+        self._pending[id_] = pending = [threading.Event(), None]
+        self._ws.send(json.dumps(
+            {'id': id_, 'method': method, 'params': params or {}}
+        ))
+        if not pending[0].wait(timeout or self.timeout):
+            self._pending.pop(id_, None)
+            raise CDPException(f'{method} timed out')
+        if 'error' in pending[1]:
+            raise CDPException(f"{method}: {pending[1]['error']['message']}")
+        return pending[1]['result']
+
+    def on(self, event: str, callback: Callable[[dict], None]) -> None:
+        self._listeners.setdefault(event, []).append(callback)
+
+    def off(self, event: str, callback: Callable[[dict], None]) -> None:
+        self._listeners.get(event, []).remove(callback)
+
+    def wait_for(
+                self, event: str, *, timeout: Optional[float] = None,
+                predicate: Optional[Callable[[dict], bool]] = None
+            ) -> dict:
+        """
+        Wait for the event to be fired.
+        Subscription happens on call, so trigger the event after it, e.g.
+            from another thread, or use `expect()`.
+
+        Args:
+            event (str): e.g. 'Page.loadEventFired'
+            timeout (Optional[float], optional): seconds to wait
+            predicate (Optional[Callable[[dict], bool]], optional):
+                to filter event's params
+
+        Returns:
+            dict: params of the event
+
+        Raises:
+            CDPException: timed out
+        """
+        with self.expect(event, predicate=predicate) as expectation:
+            pass
+        return expectation.wait(timeout or self.timeout)
+
+    def expect(
+                self, event: str,
+                *, predicate: Optional[Callable[[dict], bool]] = None
+            ) -> '_Expectation':
+        """
+        Subscribe to the event before triggering it.
+        Usage:
+            ```
+            >>> with client.expect('Page.loadEventFired') as expectation:
+            ...     driver.refresh_button.click()
+            >>> expectation.wait(10)
+            ```
+        """
+        return _Expectation(self, event, predicate)
+
+    def wait_network_idle(
+                self, *, idle_time: float = 0.5,
+                timeout: Optional[float] = None, inflight_ttl: float = 5
+            ) -> True:
+        """
+        Wait until there are no requests in flight for `idle_time` seconds.
+        Requests in flight for over `inflight_ttl` seconds, as long polls
+            or the ones whose events are lost, are forgotten.
+
+        Raises:
+            CDPException: timed out
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                for request_id, start in list(self._inflight.items()):
+                    if now - start >= inflight_ttl:
+                        self._inflight.pop(request_id, None)
+                idle_for = now - self._last_network_activity
+                if not self._inflight and idle_for >= idle_time:
+                    return True
+                if now >= deadline:
+                    raise CDPException('network is not idle')
+                self._condition.wait(min(
+                    deadline - now, max(idle_time - idle_for, 0.05)
+                ))
+
+    def evaluate(self, expression: str, *, await_promise: bool = False) -> Any:
+        """
+        Evaluate JavaScript expression in the page and return its value.
+
+        Raises:
+            CDPException: expression threw an exception
+        """
+        result = self.send('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True,
+            'awaitPromise': await_promise,
+        })
+        if 'exceptionDetails' in result:
+            raise CDPException(result['exceptionDetails'].get('text'))
+        return result['result'].get('value')
+
+    def read_elements(
+                self, selectors: dict[str, str]
+            ) -> dict[str, Optional[dict[str, Optional[str]]]]:
+        """
+        Read text and value of several elements in a single call.
+
+        Args:
+            selectors (dict[str, str]): names mapped to CSS selectors
+
+        Returns:
+            dict[str, Optional[dict[str, Optional[str]]]]: names mapped to
+                {'text': ..., 'value': ...} or None if element is absent
+        """
+        return self.evaluate(ELEMENTS_SCRIPT % json.dumps(selectors))
+
+    def capture_screenshot(
+                self, selector: Optional[str] = None,
+                *, clip: Optional[dict[str, float]] = None
+            ) -> bytes:
+        """
+        Capture PNG screenshot of the page, element or clip.
+
+        Args:
+            selector (Optional[str], optional): CSS selector of the element
+            clip (Optional[dict[str, float]], optional):
+                {'x': ..., 'y': ..., 'width': ..., 'height': ...}
+
+        Returns:
+            bytes: PNG image
+
+        Raises:
+            CDPException: no element matches the selector
+        """
+        if selector is not None:
+            clip = self.evaluate(RECT_SCRIPT % json.dumps(selector))
+            if clip is None:
+                raise CDPException(f'no element matches {selector!r}')
+        params = {'format': 'png'}
+        if clip is not None:
+            params['clip'] = {**clip, 'scale': 1}
+            params['captureBeyondViewport'] = True
+        return base64.b64decode(
+            self.send('Page.captureScreenshot', params)['data']
+        )
+
+    def request_timings(self) -> list[RequestTiming]:
+        return list(self.timings.values())
+
+    def _on_request(self, params: dict) -> None:
+        self.timings[params['requestId']] = RequestTiming(
+            params['request']['url'], params['timestamp']
+        )
+        while len(self.timings) > self.MAX_TIMINGS:
+            self.timings.popitem(last=False)
+        self._inflight[params['requestId']] = time.monotonic()
+        self._last_network_activity = time.monotonic()
+
+    def _on_finished(self, params: dict) -> None:
+        if timing := self.timings.get(params['requestId']):
+            timing.end = params['timestamp']
+            timing.size = int(params.get('encodedDataLength', 0))
+        self._inflight.pop(params['requestId'], None)
+        self._last_network_activity = time.monotonic()
+
+    def _on_failed(self, params: dict) -> None:
+        if timing := self.timings.get(params['requestId']):
+            timing.end = params['timestamp']
+            timing.failed = True
+        self._inflight.pop(params['requestId'], None)
+        self._last_network_activity = time.monotonic()
+
+    def close(self) -> None:
+        self.is_closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        for pending in list(self._pending.values()):
+            pending[1] = {'error': {'message': 'connection is closed'}}
+            pending[0].set()
+
+
+class _Expectation:
+    def __init__(
+                self, client: CDPClient, event: str,
+                predicate: Optional[Callable[[dict], bool]]
+            ):
+        self.client = client
+        self.event = event
+        self.predicate = predicate
+        self.params = None
+        self._fired = threading.Event()
+
+    def _callback(self, params: dict) -> None:
+        if self.predicate is None or self.predicate(params):
+            self.params = params
+            self._fired.set()
+
+    def __enter__(self) -> '_Expectation':
+        self.client.on(self.event, self._callback)
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def wait(self, timeout: Optional[float] = None) -> dict:
+        try:
+            if not self._fired.wait(timeout or self.client.timeout):
+                raise CDPException(f'{self.event} was not fired')
+            return self.params
+        finally:
+            self.client.off(self.event, self._callback)
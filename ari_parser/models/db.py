@@ -7,7 +7,7 @@ from typing import Any, Union, Generator
 
 from . import exceptions
 import settings
-from utils import Singleton, xor
+from utils import Singleton, xor, metrics
 
 sqlite3.register_adapter(
     datetime, lambda x: x.strftime('%Y-%m-%d %H:%M').encode('ascii')
@@ -22,12 +22,18 @@ sqlite3.register_converter("list", lambda x: pickle.loads(x))
 
 SubstitutionParameters = Union[dict[str, Any], tuple[Any, ...]]
 
+EXECUTE_SECONDS = metrics.histogram(
+    'ari_db_execute_seconds', 'Duration of SQL queries, lock wait included'
+)
+
 
 class AbstractDatabaseMeta(Singleton, abc.ABCMeta):
     pass
 
 
 class AbstractDatabase(abc.ABC, metaclass=AbstractDatabaseMeta):
+    _lock = threading.Lock()
+
     def __init__(self, *, db_name: str = None):
         self.db_name = db_name or settings.DB_NAME
         self.setup_db()
@@ -70,7 +76,7 @@ class AbstractDatabase(abc.ABC, metaclass=AbstractDatabaseMeta):
         Returns:
             Union[list[dict[str, Any]], sqlite3.Cursor]
         """
-        with threading.Lock():
+        with EXECUTE_SECONDS.time(), self._lock:
             with sqlite3.connect(
                         self.db_name, detect_types=sqlite3.PARSE_DECLTYPES
                     ) as conn:
@@ -542,3 +548,125 @@ class AccountDatabase(AbstractDatabase):
             else:
                 return True
         raise exceptions.DependentDoesNotExistException
+
+
+class ArtifactDatabase(AbstractDatabase):
+    def setup_db(self):
+        self.execute('''CREATE TABLE IF NOT EXISTS artifact(
+            id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE,
+            hash VARCHAR NOT NULL,
+            kind VARCHAR NOT NULL,
+            account VARCHAR,
+            page VARCHAR,
+            created DATETIME,
+            size INTEGER
+        )''')
+        self.execute('''CREATE INDEX IF NOT EXISTS artifact_lookup 
+            ON artifact(account, page, created)''')
+        self.execute(
+            'CREATE INDEX IF NOT EXISTS artifact_hash ON artifact(hash)'
+        )
+
+    def add_artifact(
+                self, hash_: str, kind: str, account: str, page: str,
+                created: datetime, size: int
+            ) -> int:
+        """
+        Add artifact to the index.
+        
+        Args:
+            hash_ (str): hash of the content
+            kind (str): 'snapshot' or 'screenshot'
+            account (str): account's email
+            page (str): name of the page
+            created (datetime): time of capture
+            size (int): size of the stored object in bytes
+        
+        Returns:
+            int: artifact's id in database
+        """
+        return self.execute(
+            """INSERT INTO artifact(
+                hash, kind, account, page, created, size
+            ) VALUES (?, ?, ?, ?, ?, ?)""",
+            (hash_, kind, account, page, created, size), as_default=True
+        ).lastrowid
+
+    def get_artifacts(
+                self, *, account: str = None, page: str = None,
+                kind: str = None, since: datetime = None,
+                until: datetime = None, after_id: int = None,
+                limit: int = None
+            ) -> list[dict[str, Any]]:
+        """
+        Get artifacts matching all the passed filters, oldest first.
+        
+        Args:
+            account (str, optional): account's email
+            page (str, optional): name of the page
+            kind (str, optional): 'snapshot' or 'screenshot'
+            since (datetime, optional): min time of capture, inclusive
+            until (datetime, optional): max time of capture, exclusive
+            after_id (int, optional): max id of skipped artifacts, to
+                read the artifacts in batches
+            limit (int, optional): max number of artifacts
+        
+        Returns:
+            list[dict[str, Any]]
+        """
+        clauses, params = ['1'], []
+        for clause, param in (
+                    ('account = ?', account), ('page = ?', page),
+                    ('kind = ?', kind), ('created >= ?', since), 
+                    ('created < ?', until), ('id > ?', after_id)
+                ):
+            if param is not None:
+                clauses.append(clause)
+                params.append(param)
+        if limit is not None:
+            params.append(limit)
+        return self.execute(
+            'SELECT * FROM artifact WHERE %s ORDER BY id%s' % (
+                ' AND '.join(clauses), ' LIMIT ?' if limit is not None else ''
+            ), tuple(params)
+        )
+
+    def delete_artifact(self, artifact_id: int) -> True:
+        """
+        Delete artifact from the index.
+        
+        Args:
+            artifact_id (int): artifact's id
+        
+        Returns:
+            True
+        """
+        self.execute('DELETE FROM artifact WHERE id = ?', (artifact_id, ))
+        return True
+
+    def is_referenced(self, hash_: str) -> bool:
+        """
+        Check if any artifact has the content with the hash.
+        
+        Args:
+            hash_ (str): hash of the content
+        
+        Returns:
+            bool
+        """
+        return len(self.execute(
+            'SELECT id FROM artifact WHERE hash = ? LIMIT 1', (hash_, )
+        )) > 0
+
+    def get_total_size(self) -> int:
+        """
+        Get size of all the stored objects, every object counted once.
+        
+        Returns:
+            int: bytes
+        """
+        return self.execute(
+            '''SELECT COALESCE(SUM(size), 0) AS total FROM (
+                SELECT MAX(size) AS size FROM artifact GROUP BY hash
+            )'''
+        )[0]['total']
@@ -0,0 +1,442 @@
+import collections
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Union
+
+from loguru import logger
+
+from .exceptions import RateLimitedException, UndeliverableException
+import settings
+from utils import images, metrics
+
+NOTIFICATIONS_TOTAL = metrics.counter(
+    'ari_notifications_total', 'Number of notifications by result'
+)
+NOTIFICATION_RETRIES_TOTAL = metrics.counter(
+    'ari_notification_retries_total', 'Number of retried notifications'
+)
+NOTIFICATION_DELAY_SECONDS = metrics.histogram(
+    'ari_notification_delay_seconds',
+    'Time from queueing a notification to sending it'
+)
+PHOTO_UPLOADED_BYTES_TOTAL = metrics.counter(
+    'ari_photo_uploaded_bytes_total', 'Bytes of uploaded photos'
+)
+PHOTO_REUSES_TOTAL = metrics.counter(
+    'ari_photo_reuses_total', 'Number of photos sent by file_id'
+)
+
+
+class RateLimiter:
+    """
+    Token bucket, allows `burst` events at once and `rate` events
+        per second on average.
+    Usage:
+        ```
+        >>> limiter = RateLimiter(rate=1, burst=2)
+        >>> limiter.take(), limiter.take()
+        (0.0, 0.0)
+        >>> limiter.delay()  # in seconds until the next token
+        1.0
+        ```
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def delay(self) -> float:
+        """
+        Get number of seconds until a token is available.
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def take(self) -> float:
+        """
+        Reserve a token, even if it is not available yet.
+
+        Returns:
+            float: number of seconds to wait before using the token
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+
+class Photo:
+    """
+    Image of an event sent to many chats, uploaded once.
+    The first send uploads the shrunk image, the others wait for it
+        and reuse file_id returned by Telegram.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.file_id: Optional[str] = None
+        self.uploaded = 0  # in bytes, by all the attempts
+        self._is_shrunk = False
+        self._lock = threading.Lock()
+
+    def send(self, send: Callable[[Union[bytes, str]], str]) -> None:
+        """
+        Send the photo by `send`, which takes the image or its file_id
+            and returns file_id of the sent photo.
+        """
+        if self.file_id is None:
+            with self._lock:
+                if self.file_id is None:
+                    self._upload(send)
+                    return
+        send(self.file_id)
+        PHOTO_REUSES_TOTAL.inc()
+
+    def _upload(self, send: Callable[[Union[bytes, str]], str]) -> None:
+        if not self._is_shrunk:
+            self.data = images.shrink(
+                self.data,
+                max_side=settings.NotificationData.PHOTO_MAX_SIDE,
+                max_size=settings.NotificationData.PHOTO_MAX_SIZE
+            )
+            self._is_shrunk = True
+        self.uploaded += len(self.data)
+        PHOTO_UPLOADED_BYTES_TOTAL.inc(len(self.data))
+        self.file_id = send(self.data)
+
+
+@dataclass
+class Notification:
+    chat_id: int
+    text: str
+    photo: Optional[Photo] = None
+    attempts: int = 0
+    created: float = field(default_factory=time.monotonic)
+
+
+class Dispatcher:
+    """
+    Send notifications in background threads, so that producers
+        never wait for Telegram.
+    Notifications of a chat are sent one by one in order, respecting
+        the per-chat and global rate limits, different chats are
+        notified concurrently. Failed notifications are retried with
+        exponential backoff, or after the delay asked by the API.
+    """
+
+    def __init__(
+                self, send: Callable[[Notification], Any], *,
+                workers: int = settings.NotificationData.WORKERS,
+                chat_rate: float = settings.NotificationData.CHAT_RATE,
+                chat_burst: int = settings.NotificationData.CHAT_BURST,
+                global_rate: float = settings.NotificationData.GLOBAL_RATE,
+                max_attempts: int = settings.NotificationData.MAX_ATTEMPTS
+            ):
+        """
+        Args:
+            send (Callable[[Notification], Any]): sends a notification,
+                raises `RateLimitedException` if asked to retry later,
+                `UndeliverableException` if retrying is useless
+            workers (int, optional): number of sending threads
+        """
+        self.send = send
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self.sent = self.failed = self.retried = 0
+        self._limiter = RateLimiter(global_rate, burst=1)
+        self._chats: dict[int, collections.deque] = {}  # queued by chat
+        self._limiters: dict[int, RateLimiter] = {}
+        self._ready_at: dict[int, float] = {}  # chats paused till then
+        self._busy: set[int] = set()  # chats being sent to
+        self._order = itertools.count()  # of chats becoming pending
+        self._pending: dict[int, int] = {}  # chat -> order
+        self._unfinished = 0
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+
+    def put(self, notification: Notification) -> None:
+        """
+        Queue the notification without blocking.
+        """
+        with self._condition:
+            if not self._threads:
+                self._start()
+            chat_id = notification.chat_id
+            self._chats.setdefault(chat_id, collections.deque()).append(
+                notification
+            )
+            self._pending.setdefault(chat_id, next(self._order))
+            self._unfinished += 1
+            self._condition.notify()
+
+    def _start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f'dispatcher-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self) -> Notification:
+        """
+        Wait for the earliest queued chat, which is ready to be sent to.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wakeup = None
+                for chat_id in sorted(self._pending, key=self._pending.get):
+                    if chat_id in self._busy:
+                        continue
+                    ready_at = max(
+                        self._ready_at.get(chat_id, 0),
+                        now + self._chat_limiter(chat_id).delay()
+                    )
+                    if ready_at <= now:
+                        break
+                    wakeup = ready_at if wakeup is None else min(
+                        wakeup, ready_at
+                    )
+                else:
+                    self._condition.wait(
+                        None if wakeup is None else wakeup - now
+                    )
+                    continue
+                self._busy.add(chat_id)
+                self._chat_limiter(chat_id).take()
+                return self._chats[chat_id][0]
+
+    def _chat_limiter(self, chat_id: int) -> RateLimiter:
+        if (limiter := self._limiters.get(chat_id)) is None:
+            limiter = self._limiters[chat_id] = RateLimiter(
+                self.chat_rate, self.chat_burst
+            )
+        return limiter
+
+    def _done(
+                self, notification: Notification, *,
+                retry_after: Optional[float] = None
+            ) -> None:
+        """
+        Release the chat of the notification, dequeue the notification
+            unless it is retried after `retry_after` seconds.
+        """
+        chat_id = notification.chat_id
+        with self._condition:
+            self._busy.discard(chat_id)
+            if retry_after is not None:
+                self._ready_at[chat_id] = time.monotonic() + retry_after
+            else:
+                chat = self._chats[chat_id]
+                chat.popleft()
+                self._unfinished -= 1
+                if not chat:
+                    del self._chats[chat_id]
+                    del self._pending[chat_id]
+                    self._ready_at.pop(chat_id, None)
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            notification = self._next()
+            time.sleep(self._limiter.take())
+            notification.attempts += 1
+            try:
+                self.send(notification)
+            except Exception as e:
+                retry_after = self._retry_after(notification, e)
+                if retry_after is None:
+                    self.failed += 1
+                    NOTIFICATIONS_TOTAL.inc(result='failed')
+                    logger.error(
+                        'unable to notify chat {}: {}: {}',
+                        notification.chat_id, e.__class__.__name__, e
+                    )
+                else:
+                    self.retried += 1
+                    NOTIFICATION_RETRIES_TOTAL.inc()
+                self._done(notification, retry_after=retry_after)
+                continue
+            self.sent += 1
+            NOTIFICATIONS_TOTAL.inc(result='sent')
+            NOTIFICATION_DELAY_SECONDS.observe(
+                time.monotonic() - notification.created
+            )
+            self._done(notification)
+
+    def _retry_after(
+                self, notification: Notification, error: Exception
+            ) -> Optional[float]:
+        """
+        Get number of seconds to retry the notification after.
+
+        Returns:
+            Optional[float]: None if the notification is not retried
+        """
+        if isinstance(error, UndeliverableException):
+            return None
+        if notification.attempts >= self.max_attempts:
+            return None
+        if isinstance(error, RateLimitedException):
+            return error.retry_after
+        return min(
+            settings.NotificationData.MAX_BACKOFF,
+            settings.NotificationData.BACKOFF
+            * 2 ** (notification.attempts - 1)
+        )
+
+    def join(self, timeout: float) -> bool:
+        """
+        Wait until all the queued notifications are sent or dropped.
+
+        Args:
+            timeout (float): max number of seconds to wait
+
+        Returns:
+            bool: False if timed out
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._unfinished, timeout
+            )
+
+
+class Coalescer:
+    """
+    Merge events of a chat within `window` seconds into one digest
+        notification, so that error storms do not flood the chats.
+    Identical events, as of their key, are merged with counts, and
+        an identical error is reported once per `repeat_interval`.
+    Usage:
+        ```
+        >>> coalescer = Coalescer(dispatcher)
+        >>> for _ in range(3):
+        ...     coalescer.add(1, 'Portal is down', key='Portal is down')
+        >>> coalescer.flush(1)  # or `window` seconds later
+        ```
+        chat 1 gets 'Portal is down (x3)'
+    """
+
+    def __init__(
+                self, dispatcher: Dispatcher, *,
+                window: float = settings.NotificationData.COALESCE_WINDOW,
+                repeat_interval: float = (
+                    settings.NotificationData.ERROR_REPEAT_INTERVAL
+                )
+            ):
+        self.dispatcher = dispatcher
+        self.window = window
+        self.repeat_interval = repeat_interval
+        self.merged = 0  # number of events not sent on their own
+        # chat -> key -> [text, count, is_deduplicated], in order of events
+        self._digests: dict[int, dict[Any, list]] = {}
+        # (chat, key) -> time of the report and number of skipped events
+        self._reported: dict[tuple[int, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def add(
+                self, chat_id: int, text: str, *, key: Any = None,
+                urgent: bool = False
+            ) -> None:
+        """
+        Add the event to the digest of the chat.
+
+        Args:
+            chat_id (int)
+            text (str)
+            key (Any, optional): events with equal keys are identical,
+                every event is unique by default
+            urgent (bool, optional): to send the event right away
+        """
+        if urgent:
+            self.dispatcher.put(Notification(chat_id, text))
+            return
+        with self._lock:
+            if key is not None and not self._is_due(chat_id, key):
+                self.merged += 1
+                return
+            if (digest := self._digests.get(chat_id)) is None:
+                digest = self._digests[chat_id] = {}
+                timer = threading.Timer(self.window, self.flush, (chat_id, ))
+                timer.daemon = True
+                timer.start()
+            if key is None:
+                digest[object()] = [text, 1, False]
+            elif (entry := digest.get(key)) is not None:
+                entry[1] += 1
+                self.merged += 1
+            else:
+                digest[key] = [text, 1, True]
+
+    def _is_due(self, chat_id: int, key: Any) -> bool:
+        """
+        Check whether the identical event is to be reported, count it
+            otherwise.
+        """
+        now = time.monotonic()
+        self._reported = {
+            k: v for k, v in self._reported.items()
+            if now - v[0] < self.repeat_interval or v[1]
+        }
+        reported = self._reported.get((chat_id, key))
+        if reported is None or now - reported[0] >= self.repeat_interval:
+            return True
+        reported[1] += 1
+        return False
+
+    def flush(self, chat_id: int) -> None:
+        """
+        Send the digest of the chat.
+        """
+        with self._lock:
+            digest = self._digests.pop(chat_id, None)
+            if not digest:
+                return
+            now = time.monotonic()
+            parts = []
+            for key, (text, count, is_deduplicated) in digest.items():
+                if is_deduplicated:
+                    if reported := self._reported.get((chat_id, key)):
+                        count += reported[1]  # skipped since the last report
+                    self._reported[(chat_id, key)] = [now, 0]
+                parts.append(text if count == 1 else f'{text} (x{count})')
+        for text in self._split(parts):
+            self.dispatcher.put(Notification(chat_id, text))
+
+    @staticmethod
+    def _split(parts: list[str], limit: int = 4096) -> list[str]:
+        """
+        Join the parts into messages fitting the length limit of Telegram.
+        """
+        messages = []
+        for part in parts:
+            part = part[:limit]
+            if messages and len(messages[-1]) + 2 + len(part) <= limit:
+                messages[-1] = f'{messages[-1]}\n\n{part}'
+            else:
+                messages.append(part)
+        return messages
+
+    def close(self) -> None:
+        """
+        Send digests of all the chats.
+        """
+        with self._lock:
+            chat_ids = list(self._digests)
+        for chat_id in chat_ids:
+            self.flush(chat_id)
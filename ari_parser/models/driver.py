@@ -1,26 +1,57 @@
 import os
 import sys
-from datetime import datetime
+import time
 from typing import Optional, Union
 
 from loguru import logger
-from seleniumwire import webdriver
+from selenium import webdriver as selenium_webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from seleniumwire import webdriver as wire_webdriver
+from seleniumwire.utils import decode
 
 from .account import Account
 from .exceptions import InvalidCredentialsException, AuthorizationException
-from .page import LoginPage
+from . import proxy_extension
+from .artifacts import Artifact, ArtifactWriter
+from .cdp import CDPClient
+from .page import AppointmentPage, ElementCache, LoginPage, PageState
+from .postback import ENUMERATOR_HEADER, SelectFeed, parse_response
+from .waits import Postback
+from .recording import Fixture, Recorder
+from .resources import ResourcePolicy, guess_resource_type
 import settings
+from utils import metrics, tracing
 from utils.url import Url
 
+PAGE_LOAD_SECONDS = metrics.histogram(
+    'ari_page_load_seconds', 'Duration of page navigations'
+)
+LOGIN_SECONDS = metrics.histogram('ari_login_seconds', 'Duration of logging in')
 
-class Driver(webdriver.Chrome):
+
+class BaseDriver:
+    """
+    Functionality shared by all the driver modes.
+    Must precede selenium's Chrome in the bases of the child class.
+    """
     NO_PROXY_IP = 'localhost,127.0.0.1,dev_server:8080'
+    COUNTS_BLOCKED = True  # whether `resource_policy.stats` are collected
 
-    def __init__(
-            self, account: Account,
-            *, headless: Optional[bool] = settings.ChromeData.HEADLESS
-            ):
-        chrome_options = webdriver.ChromeOptions()
+    def create_options(
+                self, *, headless: bool, allow_extensions: bool = False
+            ) -> selenium_webdriver.ChromeOptions:
+        """
+        Create options of Chrome shared by all the driver modes.
+
+        Args:
+            headless (bool): to run the browser without window
+            allow_extensions (bool, optional): to keep extensions working
+                in headless mode
+
+        Returns:
+            selenium_webdriver.ChromeOptions
+        """
+        chrome_options = selenium_webdriver.ChromeOptions()
         chrome_options.add_experimental_option(
             "excludeSwitches", ["enable-automation"]
         )
@@ -32,30 +63,126 @@ class Driver(webdriver.Chrome):
         chrome_options.add_experimental_option(
             "excludeSwitches", ["enable-logging"]
         )
-        seleniumwire_options = {'proxy': {'no_proxy': self.NO_PROXY_IP}}
         if headless:
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--headless")
+            if allow_extensions:
+                chrome_options.add_argument("--headless=new")
+            else:
+                chrome_options.add_argument("--disable-extensions")
+                chrome_options.add_argument("--headless")
             chrome_options.add_experimental_option(
                 "excludeSwitches", ["enable-logging"]
             )
             if sys.platform == 'linux':
                 chrome_options.add_argument("--no-sandbox")
                 chrome_options.add_argument('--disable-dev-shm-usage')
-        self.account = account
-        self.logger = logger.bind(email=self.account.email)
-        remote_debugging_port = 9222 + self.account.id  
         # for every browser unique port
+        self.remote_debugging_port = 9222 + self.account.id  
         chrome_options.add_argument(
-            f"--remote-debugging-port={remote_debugging_port}"
-        )
-        super().__init__(
-            executable_path=settings.ChromeData.PATH, 
-            options=chrome_options,
-            port=self.account.id,
-            seleniumwire_options=seleniumwire_options
+            f"--remote-debugging-port={self.remote_debugging_port}"
         )
+        return chrome_options
+
+    def _setup(self) -> None:
+        """
+        Initialize the state shared by all the driver modes.
+        Must be called after the browser is started.
+        """
         self.tabs = self.window_handles[:]
+        self.resource_policy = ResourcePolicy.from_settings()
+        self._cdp_clients = {}  # tab -> CDPClient or False if unavailable
+        # current tab is tracked to avoid asking the browser for it
+        self._tab = self.tabs[0]
+        self._element_caches = {}  # tab -> ElementCache
+        self._page_states = {}  # tab -> PageState
+        self.postback: Optional[Postback] = None  # not waited for yet
+        self.select_feed: Optional[SelectFeed] = None  # of the wire mode
+
+    @property
+    def current_tab(self) -> str:
+        """
+        Handle of the current tab, tracked without asking the browser.
+        """
+        return self._tab
+
+    @property
+    def cdp(self) -> Optional[CDPClient]:
+        """
+        Chrome DevTools Protocol client attached to the current tab.
+        Connects to `remote_debugging_port` on first access.
+        
+        Returns:
+            Optional[CDPClient]: None if CDP is disabled or unavailable
+        """
+        if not settings.ChromeData.USE_CDP:
+            return None
+        tab_name = self._tab
+        client = self._cdp_clients.get(tab_name)
+        if client is None or (client and client.is_closed):
+            try:
+                client = CDPClient(
+                    self.remote_debugging_port, 
+                    tab_name.replace('CDwindow-', '')
+                )
+            except Exception as e:
+                self.logger.warning(
+                    'CDP is unavailable: {}: {}', e.__class__.__name__, e
+                )
+                client = False
+            self._cdp_clients[tab_name] = client
+        return client or None
+
+    @property
+    def element_cache(self) -> ElementCache:
+        """
+        Element handles located by page objects in the current tab.
+        """
+        if (cache := self._element_caches.get(self._tab)) is None:
+            cache = self._element_caches[self._tab] = ElementCache()
+        return cache
+
+    @property
+    def page_state(self) -> PageState:
+        """
+        Known state of the page in the current tab, kept by page objects
+            to skip redundant postbacks.
+        """
+        if (state := self._page_states.get(self._tab)) is None:
+            state = self._page_states[self._tab] = PageState()
+        return state
+
+    def settle(self) -> None:
+        """
+        Wait for the postback started by a page object, if any.
+
+        Raises:
+            TimeoutException: the postback has not completed in time
+        """
+        if (postback := self.postback) is not None:
+            self.postback = None
+            postback.wait()
+
+    def flush_element_stats(self) -> tuple[int, int]:
+        """
+        Get element lookups of all the tabs since the previous flush.
+
+        Returns:
+            tuple[int, int]: lookups saved by the caches and all the lookups
+        """
+        saved = lookups = 0
+        for cache in self._element_caches.values():
+            cache_saved, cache_lookups = cache.flush()
+            saved += cache_saved
+            lookups += cache_lookups
+        return saved, lookups
+
+    def _before_navigation(self, url: str) -> None:
+        """
+        Hook called by `raw_get` before the url is requested.
+
+        Args:
+            url (str): url to be requested
+        """
+        pass
 
     @property
     def is_redirected_to_login(self) -> bool:
@@ -80,15 +207,18 @@ class Driver(webdriver.Chrome):
         """
         # TODO: Relocate setting the cookies to outer scope
         # TODO: Remove account from driver 
-        page = LoginPage(self)
-        self.raw_get(page.URL)
-        page.email = self.account.email
-        page.password = self.account.password
-        page.submit()
-        if page.is_invalid_credentials:
-            raise InvalidCredentialsException("invalid credentials")
-        elif self.is_redirected_to_login:
-            raise AuthorizationException('unable to log in')
+        with LOGIN_SECONDS.time(result='ok') as labels:
+            page = LoginPage(self)
+            self.raw_get(page.URL)
+            page.email = self.account.email
+            page.password = self.account.password
+            page.submit()
+            if page.is_invalid_credentials:
+                labels['result'] = 'invalid_credentials'
+                raise InvalidCredentialsException("invalid credentials")
+            elif self.is_redirected_to_login:
+                labels['result'] = 'failed'
+                raise AuthorizationException('unable to log in')
         self.account.update(auth_token=self.get_cookie(
             settings.AUTH_TOKEN_COOKIE_NAME
         )['value'])
@@ -99,7 +229,11 @@ class Driver(webdriver.Chrome):
 
     @property
     def url(self) -> Url:
-        return Url(self.current_url)
+        self.settle()
+        state = self.page_state
+        if state.url is None:
+            state.url = Url.intern(self.current_url)
+        return state.url
 
     def get(self, url: Union[Url, str]) -> bool:
         """
@@ -136,70 +270,41 @@ class Driver(webdriver.Chrome):
         """
         if isinstance(url, Url):
             url = url.url
-        return super().get(url)
+        self._before_navigation(url)
+        self.element_cache.clear()
+        self.page_state.clear()
+        self.postback = None  # superseded by the navigation
+        if self.select_feed is not None:
+            self.select_feed.reset()
+        page = Url.intern(url).rsplit()[1]
+        with PAGE_LOAD_SECONDS.time(page=page), tracing.span(
+                    'navigate', page=page
+                ):
+            return super().get(url)
 
-    def set_proxy(self, proxy: Union[str, None]) -> True:
+    def save_snapshot(self) -> None:
         """
-        Set proxy for the driver.
-        If no proxy is passed, proxy is removed.
-        Proxy with authentication are supported.
-        Supported proxy types are HTTP(S), SOCKS4 and SOCKS5
-        
-        Args:
-            proxy (Union[str, None]): proxy to be set
-        
-        Returns:
-            True
-        
-        Raises:
-            ValueError: invalid proxy type
+        Save page source to `ArtifactStore`.
+        Only the page source is grabbed here, it is stored by 
+            `ArtifactWriter` in background.
         """
-        proxies = {'no_proxy': self.NO_PROXY_IP}
-        if not proxy:
-            pass
-        elif proxy.startswith('http'):
-            proxies['https'] = proxy
-        elif proxy.startswith('socks'):
-            proxies['http'] = proxies['https'] = proxy
-        else:
-            raise ValueError('unsupported proxy type')
-        self.proxy = proxies
-        return True
+        self.settle()
+        ArtifactWriter().put(Artifact(
+            'snapshot', self.account.email, self.url.rsplit()[1],
+            self.page_source
+        ))
 
-    def save_snapshot(self, dirname: Optional[str] = '') -> None:
+    def save_screenshot(self) -> None:
         """
-        Save page source as html-file to specified directory.
-        
-        Args:
-            dirname (Optional[str], optional): Directory to save to
+        Save screenshot of current tab to `ArtifactStore`.
+        Only the screenshot is grabbed here, it is decoded and stored by
+            `ArtifactWriter` in background.
         """
-        if not dirname:
-            dirname = ''
-        os.makedirs(dirname, exist_ok=True)
-        now = datetime.utcnow().strftime('%Y-%m-%d_%H-%M-%S')
-        with open(
-                os.path.join(
-                    dirname, 
-                    f"{now}__{self.account.email}__{self.url.rsplit()[1]}.html"
-                ), 'w', encoding='utf-8') as file:
-            file.write(self.page_source)
-
-    def save_screenshot(self, dirname: Optional[str] = '') -> None:
-        """
-        Save screenshot of current tab to specified directory.
-
-        Args:
-            dirname (Optional[str], optional): Directory to save to
-        """
-        if not dirname:
-            dirname = ''        
-        os.makedirs(dirname, exist_ok=True)
-        now = datetime.utcnow().strftime('%Y-%m-%d_%H-%M-%S')
-        filename = os.path.join(
-            os.path.abspath(os.curdir), dirname, 
-            f"{now}__{self.account.email}__{self.url.rsplit()[1]}.png"
-        )
-        super().save_screenshot(filename)
+        self.settle()
+        ArtifactWriter().put(Artifact(
+            'screenshot', self.account.email, self.url.rsplit()[1],
+            self.get_screenshot_as_base64()
+        ))
 
     def open_new_tab(self) -> True:
         """
@@ -208,9 +313,10 @@ class Driver(webdriver.Chrome):
         Returns:
             True
         """
+        self.settle()
         self.execute_script("window.open('', '_blank')")
         tab_name = (set(self.window_handles) - set(self.tabs)).pop()
-        index = self.tabs.index(self.current_window_handle) + 1
+        index = self.tabs.index(self._tab) + 1
         self.tabs.insert(index, tab_name)
         self.switch_to_tab(index)
         return True
@@ -222,7 +328,12 @@ class Driver(webdriver.Chrome):
         Returns:
             True
         """
-        tab_name = self.current_window_handle
+        self.settle()
+        tab_name = self._tab
+        if client := self._cdp_clients.pop(tab_name, None):
+            client.close()
+        self._element_caches.pop(tab_name, None)
+        self._page_states.pop(tab_name, None)
         self.execute_script('window.close();')
         self.tabs.remove(tab_name)
         self.switch_to_tab(0)
@@ -239,7 +350,12 @@ class Driver(webdriver.Chrome):
             True
         """
         tab_name = self.tabs[index]
-        self.switch_to.window(tab_name)
+        self.settle()  # postbacks are awaited in their own tab
+        with tracing.span('switch_to_tab', index=index):
+            self.switch_to.window(tab_name)
+        if tab_name != self._tab and self.select_feed is not None:
+            self.select_feed.reset()  # states are of the other tab
+        self._tab = tab_name
         return True
 
     def __del__(self):
@@ -247,3 +363,307 @@ class Driver(webdriver.Chrome):
             self.quit()
         except Exception:
             pass
+
+
+class Driver(BaseDriver, wire_webdriver.Chrome):
+    """
+    Driver running through selenium-wire's proxy.
+    Requests can be intercepted, captured ones are kept in memory
+        within `settings.CaptureData` limits.
+    Traffic is recorded to `settings.CaptureData.RECORD_PATH` or
+        served from `settings.CaptureData.REPLAY_PATH` if set.
+    """
+
+    def __init__(
+            self, account: Account,
+            *, headless: Optional[bool] = settings.ChromeData.HEADLESS
+            ):
+        self.account = account
+        self.logger = logger.bind(email=self.account.email)
+        seleniumwire_options = {
+            'proxy': {'no_proxy': self.NO_PROXY_IP},
+            'request_storage': 'memory',
+            'request_storage_max_size': settings.CaptureData.MAX_SIZE,
+        }
+        super().__init__(
+            executable_path=settings.ChromeData.PATH, 
+            options=self.create_options(headless=headless),
+            port=self.account.id,
+            seleniumwire_options=seleniumwire_options
+        )
+        self._setup()
+        # requests out of scopes are neither captured nor intercepted
+        self.scopes = settings.CaptureData.SCOPES
+        self._last_purge = time.monotonic()
+        self.recorder = self.fixture = None
+        self.select_feed = (
+            SelectFeed() if settings.CaptureData.PARSE_POSTBACKS else None
+        )
+        if settings.CaptureData.REPLAY_PATH:
+            self.fixture = Fixture.load(settings.CaptureData.REPLAY_PATH)
+        elif settings.CaptureData.RECORD_PATH:
+            os.makedirs(settings.CaptureData.RECORD_PATH, exist_ok=True)
+            self.recorder = Recorder(
+                os.path.join(
+                    settings.CaptureData.RECORD_PATH,
+                    f'{time.strftime("%Y%m%d-%H%M%S")}__{self.account.id}'
+                    '.jsonl.gz'
+                ),
+                secrets=(self.account.email, self.account.password)
+            )
+        self.request_interceptor = self._intercept_request
+        self.response_interceptor = self._intercept_response
+
+    def _intercept_request(self, request) -> None:
+        """
+        Abort requests that are unnecessary according to `resource_policy`.
+        Is called by selenium-wire for every request of the browser.
+        """
+        type_ = self.resource_policy.block_reason(
+            request.url, accept=request.headers.get('Accept'),
+            referer=request.headers.get('Referer'),
+            dest=request.headers.get('Sec-Fetch-Dest')
+        )
+        if type_ is not None:
+            self.resource_policy.stats.add_blocked(type_)
+            request.abort(error_code=403)
+            return
+        if self.select_feed is not None and self._is_postback(request):
+            self.select_feed.add_request()
+        if self.fixture is not None:
+            self._replay(request)
+
+    def _replay(self, request) -> None:
+        """
+        Answer the request with the recorded response,
+            it never reaches the network.
+        """
+        exchange = self.fixture.match(
+            request.method, request.url, request.body
+        )
+        if exchange is None:
+            self.logger.debug(
+                '{} {} is not recorded', request.method, request.url
+            )
+            request.create_response(status_code=404, body=b'')
+            return
+        request.create_response(
+            status_code=exchange.status, headers=exchange.response_headers,
+            body=exchange.body
+        )
+        if self.select_feed is not None and self._is_postback(request):
+            self._feed_selects(exchange.body, next((
+                v for k, v in exchange.headers
+                if k.lower() == 'content-encoding'
+            ), 'identity'))
+
+    def _intercept_response(self, request, response) -> None:
+        """
+        Record sizes of the allowed responses to estimate saved bytes.
+        Is called by selenium-wire for every response to the browser.
+        """
+        size = response.headers.get('Content-Length')
+        size = int(size) if size and size.isdigit() else len(response.body)
+        self.resource_policy.stats.add_response(
+            guess_resource_type(
+                request.url, request.headers.get('Accept'),
+                request.headers.get('Sec-Fetch-Dest')
+            ),
+            size
+        )
+        if self.recorder is not None:
+            self.recorder.add(request, response)
+        if self.select_feed is not None and self._is_postback(request):
+            self._feed_selects(
+                response.body,
+                response.headers.get('Content-Encoding', 'identity')
+            )
+
+    @staticmethod
+    def _is_postback(request) -> bool:
+        """
+        Check whether the request posts the rendered agenda back,
+            requests of the slot enumerator leave it intact.
+        """
+        return request.method == 'POST' and (
+            ENUMERATOR_HEADER not in request.headers
+        ) and Url.intern(request.url) == AppointmentPage.URL
+
+    def _feed_selects(self, body: bytes, encoding: str) -> None:
+        """
+        Parse agenda selects of the postback response for `select_feed`,
+            before the response reaches the browser.
+        """
+        try:
+            text = decode(body, encoding).decode('utf-8', errors='replace')
+            states, partial = parse_response(
+                text, AppointmentPage.select_ids()
+            )
+        except Exception as e:
+            self.logger.warning(
+                'unable to parse postback: {}: {}', e.__class__.__name__, e
+            )
+            # the page is read instead
+            self.select_feed.add_response(None, partial=False)
+        else:
+            self.select_feed.add_response(states, partial=partial)
+
+    def quit(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+        super().quit()
+
+    def _before_navigation(self, url: str) -> None:
+        if (
+                    time.monotonic() - self._last_purge 
+                    > settings.CaptureData.PURGE_INTERVAL
+                ):
+            self.purge_captured()
+
+    def purge_captured(self) -> True:
+        """
+        Remove all the captured requests and responses from the storage.
+
+        Returns:
+            True
+        """
+        del self.requests
+        self._last_purge = time.monotonic()
+        return True
+
+    def set_proxy(self, proxy: Union[str, None]) -> True:
+        """
+        Set proxy for the driver.
+        If no proxy is passed, proxy is removed.
+        Proxy with authentication are supported.
+        Supported proxy types are HTTP(S), SOCKS4 and SOCKS5
+        
+        Args:
+            proxy (Union[str, None]): proxy to be set
+        
+        Returns:
+            True
+        
+        Raises:
+            ValueError: invalid proxy type
+        """
+        proxies = {'no_proxy': self.NO_PROXY_IP}
+        if not proxy:
+            pass
+        elif proxy.startswith('http'):
+            proxies['https'] = proxy
+        elif proxy.startswith('socks'):
+            proxies['http'] = proxies['https'] = proxy
+        else:
+            raise ValueError('unsupported proxy type')
+        self.proxy = proxies
+        return True
+
+
+class NativeDriver(BaseDriver, selenium_webdriver.Chrome):
+    """
+    Driver without selenium-wire, requests go from Chrome directly.
+    Proxies are applied by the generated extension, authentication included.
+    Resources are blocked by Chrome itself, so third-party domains are not
+        recognized and blocked requests are not counted.
+    """
+    COUNTS_BLOCKED = False
+
+    def __init__(
+            self, account: Account,
+            *, headless: Optional[bool] = settings.ChromeData.HEADLESS
+            ):
+        self.account = account
+        self.logger = logger.bind(email=self.account.email)
+        chrome_options = self.create_options(
+            headless=headless, allow_extensions=True
+        )
+        chrome_options.add_argument(
+            f"--load-extension={proxy_extension.create_extension()}"
+        )
+        super().__init__(
+            executable_path=settings.ChromeData.PATH, 
+            options=chrome_options,
+            port=self.account.id
+        )
+        self._setup()
+        self._proxy = None
+        self._proxy_config = None
+        self._blocked_urls = {}  # tab -> applied patterns
+
+    @property
+    def proxy(self) -> Optional[str]:
+        return self._proxy
+
+    def _before_navigation(self, url: str) -> None:
+        patterns = self.resource_policy.url_patterns(url)
+        tab_name = self._tab
+        if self._blocked_urls.get(tab_name) != patterns:
+            self.execute_cdp_cmd('Network.enable', {})
+            self.execute_cdp_cmd(
+                'Network.setBlockedURLs', {'urls': list(patterns)}
+            )
+            self._blocked_urls[tab_name] = patterns
+
+    def set_proxy(self, proxy: Union[str, None]) -> True:
+        """
+        Set proxy for the driver via the proxy extension.
+        If no proxy is passed, proxy is removed.
+        Proxy with authentication are supported.
+        Supported proxy types are HTTP(S), SOCKS4 and SOCKS5 
+            (the latter ones without authentication)
+        
+        Args:
+            proxy (Union[str, None]): proxy to be set
+        
+        Returns:
+            True
+        
+        Raises:
+            ValueError: invalid proxy type
+        """
+        config = proxy_extension.proxy_config(
+            proxy, self.NO_PROXY_IP.split(',')
+        )
+        if config == self._proxy_config:
+            return True
+        tab_name = self._tab
+        self.execute_script("window.open('', '_blank')")
+        extension_tab = (set(self.window_handles) - set(self.tabs)).pop()
+        self.switch_to.window(extension_tab)
+        try:
+            super(BaseDriver, self).get(
+                proxy_extension.proxy_page_url(config)
+            )
+            WebDriverWait(self, 5).until(lambda d: d.title == 'ok')
+        finally:
+            self.close()
+            self.switch_to.window(tab_name)
+        self._proxy, self._proxy_config = proxy, config
+        return True
+
+
+def create_driver(
+            account: Account, *, mode: Optional[str] = None, **kwargs
+        ) -> BaseDriver:
+    """
+    Create driver of the mode.
+
+    Args:
+        account (Account): account of the driver
+        mode (Optional[str], optional): 'wire' or 'native',
+            `settings.ChromeData.DRIVER_MODE` by default
+        **kwargs: passed to the driver
+
+    Returns:
+        BaseDriver
+
+    Raises:
+        ValueError: unsupported driver mode
+    """
+    mode = mode or settings.ChromeData.DRIVER_MODE
+    if mode == 'wire':
+        return Driver(account, **kwargs)
+    elif mode == 'native':
+        return NativeDriver(account, **kwargs)
+    raise ValueError(f'unsupported driver mode {mode!r}')
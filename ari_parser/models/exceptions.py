@@ -44,3 +44,21 @@ class NoAppointmentsException(CrawlerException):
 
 class NoStatusException(CrawlerException):
     pass
+
+
+class CDPException(CrawlerException):
+    pass
+
+
+class NotificationException(Exception):
+    pass
+
+
+class RateLimitedException(NotificationException):
+    def __init__(self, retry_after: float, *args):
+        super().__init__(*args)
+        self.retry_after = retry_after  # in seconds
+
+
+class UndeliverableException(NotificationException):
+    pass
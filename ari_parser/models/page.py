@@ -1,56 +1,541 @@
+import json
+import re
 from abc import ABC
+from dataclasses import dataclass, fields
 from datetime import datetime
 from time import sleep
-from typing import Union
+from typing import (
+    Any, Callable, ClassVar, Iterator, Optional, TypeVar, Union
+)
 
 from selenium.common import exceptions
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.select import Select
+from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 
-from settings import locators, BASE_URL
+from .exceptions import CDPException, NoStatusException
+from .postback import ENUMERATOR_SCRIPT, SelectFeed, SelectState
+from .waits import Postback, network_idle
+from settings import locators, AppointmentData, CaptureData, WaitData, BASE_URL
+from utils import metrics, tracing
 from utils.url import Url
 
+POSTBACK_SECONDS = metrics.histogram(
+    'ari_select_postback_seconds', 'Duration of selecting an option'
+)
+SCAN_SECONDS = metrics.histogram(
+    'ari_slot_scan_seconds',
+    'Lifetime of appointment slots enumeration, consumer time included'
+)
+SLOTS_TOTAL = metrics.counter(
+    'ari_slots_enumerated_total', 'Number of enumerated appointment slots'
+)
+BOOKING_SECONDS = metrics.histogram(
+    'ari_booking_attempt_seconds', 'Duration of an appointment booking attempt'
+)
+ENUMERATIONS_TOTAL = metrics.counter(
+    'ari_slot_enumerations_total', 'Number of slot scans by the way of scan'
+)
+SELECT_READS_TOTAL = metrics.counter(
+    'ari_select_reads_total', 'Number of select reads by source of the state'
+)
+ELEMENT_LOOKUPS_TOTAL = metrics.counter(
+    'ari_element_lookups_total', 'Number of element lookups by page objects'
+)
+
+T = TypeVar('T')
+
+SELECTS_SCRIPT = '''
+const result = {};
+for (const [name, selector] of Object.entries(arguments[0])) {
+    const select = document.querySelector(selector);
+    if (select === null) {
+        result[name] = null;
+        continue;
+    }
+    const options = Array.from(select.options);
+    result[name] = {
+        options: options.map(x => x.text.replace(/\\s+/g, ' ').trim()),
+        values: options.map(x => x.value),
+        selected: select.selectedIndex,
+    };
+}
+return result;
+'''
+
+
+@dataclass
+class PageState:
+    """
+    Known state of the page in a tab, None if unknown.
+    Setting a field resets the ones depending on it, as the portal resets
+        dependent selects.
+    """
+    url: Optional[Url] = None
+    language: Optional[str] = None  # value of the option
+    matter: Optional[str] = None
+    office: Optional[str] = None
+    month: Optional[str] = None
+
+    DEPENDENTS: ClassVar[dict[str, tuple[str, ...]]] = {
+        'language': ('matter', 'office', 'month'),
+        'matter': ('office', 'month'),
+        'office': ('month', ),
+        'month': (),
+    }
+
+    def update(self, field: str, value: Optional[str]) -> None:
+        setattr(self, field, value)
+        for dependent in self.DEPENDENTS[field]:
+            setattr(self, dependent, None)
+
+    def clear(self, *, keep_language: bool = False) -> None:
+        """
+        Forget the state, the language is kept by the session
+            if `keep_language` is passed.
+        """
+        for field in fields(self):
+            if not (keep_language and field.name == 'language'):
+                setattr(self, field.name, None)
+
+
+class ElementCache:
+    """
+    Element handles located in a tab, valid until its page is reloaded.
+    Page objects clear it after postbacks and clicks, the driver does
+        after navigation.
+    """
+
+    def __init__(self):
+        self._elements: dict[tuple[str, str], WebElement] = {}
+        self.lookups = self.hits = 0
+        self._flushed = (0, 0)
+
+    def get(
+                self, locator: tuple[str, str],
+                find: Callable[[tuple[str, str]], WebElement]
+            ) -> WebElement:
+        """
+        Get cached element or locate it.
+
+        Args:
+            locator (tuple[str, str])
+            find (Callable[[tuple[str, str]], WebElement]): locates
+                the element on cache miss
+
+        Returns:
+            WebElement
+        """
+        self.lookups += 1
+        if (element := self._elements.get(locator)) is not None:
+            self.hits += 1
+            ELEMENT_LOOKUPS_TOTAL.inc(result='hit')
+            return element
+        ELEMENT_LOOKUPS_TOTAL.inc(result='miss')
+        element = self._elements[locator] = find(locator)
+        return element
+
+    def clear(self) -> None:
+        self._elements.clear()
+
+    def flush(self) -> tuple[int, int]:
+        """
+        Get statistics since the previous flush.
+
+        Returns:
+            tuple[int, int]: lookups saved by the cache and all the lookups
+        """
+        lookups, hits = self._flushed
+        self._flushed = (self.lookups, self.hits)
+        return self.hits - hits, self.lookups - lookups
+
 
 class BasePage(ABC):
     """
     Base class to initialize the base page that will be called from all
     pages
     """
-    URL = Url(BASE_URL)
+    URL = Url.intern(BASE_URL)
     LOCATORS = locators.BasePageLocators
+    # selects tracked by `PageState`, locator name -> field
+    STATE_FIELDS = {'language_select': 'language'}
 
     def __init__(self, driver):
         self.driver = driver
+        self._feed_mark = None  # of `select_feed` before the last postback
+        self._fed_states = None  # select id -> SelectState
 
     def __getattr__(self, attr):
         locator = getattr(self.LOCATORS, attr.upper())
+        self.driver.settle()
+        if (cache := self.element_cache) is not None:
+            return cache.get(locator, self._locate)
+        return self._locate(locator)
+
+    def _locate(self, locator: tuple[str, str]) -> WebElement:
         webelement = self.get_webelement(locator)
         webelement.found_by = locator
         return webelement
 
+    @property
+    def element_cache(self) -> Optional[ElementCache]:
+        return getattr(self.driver, 'element_cache', None)
+
+    def invalidate(self) -> None:
+        """
+        Forget located elements, as the page has been reloaded.
+        """
+        if (cache := self.element_cache) is not None:
+            cache.clear()
+        self._feed_mark = self._fed_states = None
+
+    @property
+    def page_state(self) -> Optional[PageState]:
+        return getattr(self.driver, 'page_state', None)
+
+    def _remember(self, attr: str, state: SelectState) -> None:
+        """
+        Remember selection of the select read from the page.
+        """
+        if (page_state := self.page_state) is None:
+            return
+        if (field := self.STATE_FIELDS.get(attr)) is not None:
+            setattr(page_state, field, (
+                state.selected_value if field == 'language'
+                else state.selected_option
+            ))
+
+    def _selected(self, attr: str) -> Optional[str]:
+        """
+        Get selection of the select tracked by `PageState`, read from
+            the page if unknown.
+
+        Returns:
+            Optional[str]: value for the language, visible text otherwise,
+                None if unknown
+        """
+        page_state = self.page_state
+        field = self.STATE_FIELDS.get(attr)
+        if page_state is None or field is None:
+            return None
+        if (value := getattr(page_state, field)) is None:
+            try:
+                self.select_state(attr)
+            except exceptions.TimeoutException:
+                return None
+            value = getattr(page_state, field)
+        return value
+
+    @property
+    def select_feed(self) -> Optional[SelectFeed]:
+        return getattr(self.driver, 'select_feed', None)
+
+    def _fed_state(self, attr: str) -> Optional[SelectState]:
+        """
+        Get state of the select parsed from the response to the last
+            postback, waiting for the response if needed.
+        """
+        if self._feed_mark is not None:
+            self._fed_states = self.select_feed.wait(
+                self._feed_mark, grace=CaptureData.POSTBACK_GRACE,
+                timeout=CaptureData.POSTBACK_TIMEOUT
+            )
+            self._feed_mark = None
+        if not self._fed_states:
+            return None
+        return self._fed_states.get(
+            self.element_id(getattr(self.LOCATORS, attr.upper()))
+        )
+
+    def with_element(
+                self, attr: str, function: Callable[[WebElement], T]
+            ) -> T:
+        """
+        Call the function with the located element.
+        If the cached element turns out to be stale, it is located again.
+
+        Args:
+            attr (str): locator name, as for attribute access
+            function (Callable[[WebElement], T])
+
+        Returns:
+            T: result of the function
+        """
+        try:
+            return function(getattr(self, attr))
+        except exceptions.StaleElementReferenceException:
+            self.invalidate()
+            return function(getattr(self, attr))
+
+    def post_back(
+                self, attr: str, action: Callable[[WebElement], Any]
+            ) -> None:
+        """
+        Do the action with the located element, which posts the page back.
+        The page is considered reloaded, the postback is waited for by
+            the driver once the page is needed again.
+        Known state of the agenda is kept for selects, whose setters
+            update it, and forgotten otherwise.
+
+        Args:
+            attr (str): locator name, as for attribute access
+            action (Callable[[WebElement], Any])
+        """
+        self.driver.settle()
+        is_select = attr.endswith('_select')  # as of `select_ids()`
+        feed = self.select_feed
+        mark = feed.mark() if feed is not None else None
+        postback = Postback(self.driver).arm()
+        try:
+            self.with_element(attr, action)
+        finally:
+            self.invalidate()
+            if (page_state := self.page_state) is not None:
+                if is_select:
+                    page_state.url = None  # the page may be left
+                else:
+                    page_state.clear(keep_language=True)
+        self.driver.postback = postback
+        if is_select:
+            # the following reads are served by the response to the postback
+            self._feed_mark = mark
+
+    def click(self, attr: str) -> True:
+        """
+        Click the located element, the page is considered reloaded.
+
+        Args:
+            attr (str): locator name, as for attribute access
+
+        Returns:
+            True
+        """
+        self.post_back(attr, lambda x: x.click())
+        return True
+
     def get_webelement(self, locator: tuple[str, str], *, start_element=None):
-        return WebDriverWait(start_element or self.driver, 0.5).until(
-            EC.presence_of_element_located(locator)
+        return WebDriverWait(
+            start_element or self.driver, WaitData.ELEMENT_TIMEOUT,
+            poll_frequency=WaitData.POLL_FREQUENCY
+        ).until(EC.presence_of_element_located(locator))
+
+    @property
+    def cdp(self):
+        return getattr(self.driver, 'cdp', None)
+
+    def read_selects(
+                self, *attrs: str
+            ) -> dict[str, Optional[SelectState]]:
+        """
+        Read options and selection of the selects in a single script call,
+            instead of a WebDriver call per option.
+
+        Args:
+            *attrs (str): locator names, as for attribute access,
+                all the selects of the page if none are passed
+
+        Returns:
+            dict[str, Optional[SelectState]]: attrs mapped to the states,
+                None if the select is absent
+        """
+        attrs = attrs or tuple(
+            x.lower() for x in dir(self.LOCATORS) if x.endswith('_SELECT')
         )
+        selectors = {}
+        for attr in attrs:
+            locator = getattr(self.LOCATORS, attr.upper())
+            if (selector := self.css_selector(locator)) is None:
+                raise ValueError(f'{attr} is not located by CSS selector')
+            selectors[attr] = selector
+        self.driver.settle()
+        states = self.driver.execute_script(SELECTS_SCRIPT, selectors)
+        return {
+            attr: None if (state := states.get(attr)) is None else SelectState(
+                state['options'], state['values'],
+                state['selected'] if state['selected'] >= 0 else None
+            ) for attr in attrs
+        }
+
+    def select_state(
+                self, attr: str, *, timeout: Optional[float] = None
+            ) -> SelectState:
+        """
+        Read state of the select, waiting for it as attribute access does.
+        After a postback, the state is taken from the intercepted response
+            if possible, without reading the page.
+
+        Args:
+            attr (str): locator name, as for attribute access
+            timeout (Optional[float], optional): seconds to wait for
+                the select, `WaitData.ELEMENT_TIMEOUT` by default
+
+        Returns:
+            SelectState
+
+        Raises:
+            TimeoutException: the select is absent
+        """
+        if (state := self._fed_state(attr)) is not None:
+            SELECT_READS_TOTAL.inc(source='response')
+        else:
+            SELECT_READS_TOTAL.inc(source='page')
+            state = WebDriverWait(
+                self.driver, timeout or WaitData.ELEMENT_TIMEOUT,
+                poll_frequency=WaitData.POLL_FREQUENCY
+            ).until(
+                lambda _: self.read_selects(attr)[attr],
+                message=f'{attr} is absent'
+            )
+        self._remember(attr, state)
+        return state
+
+    @staticmethod
+    def element_id(locator: tuple[str, str]) -> Optional[str]:
+        by, value = locator
+        if by == By.ID:
+            return value
+        elif by == By.CSS_SELECTOR and (
+                    match := re.search(r'#([\w$-]+)$', value)
+                ):
+            return match.group(1)
+        return None
+
+    @classmethod
+    def select_ids(cls) -> list[str]:
+        """
+        Get ids of the selects of the page, located by id.
+        """
+        return [
+            id_ for x in dir(cls.LOCATORS) if x.endswith('_SELECT')
+            if (id_ := cls.element_id(getattr(cls.LOCATORS, x))) is not None
+        ]
+
+    @staticmethod
+    def css_selector(locator: tuple[str, str]) -> Union[str, None]:
+        by, value = locator
+        if by == By.CSS_SELECTOR:
+            return value
+        elif by == By.ID:
+            return f'#{value}'
+        elif by == By.NAME:
+            return f'[name="{value}"]'
+        return None
+
+    def read_elements(self, *attrs: str) -> Union[dict[str, dict], None]:
+        """
+        Read text and value of located elements in a single CDP call.
+        
+        Args:
+            *attrs (str): locator names, as for attribute access
+        
+        Returns:
+            Union[dict[str, dict], None]: attrs mapped to {'text', 'value'},
+                None if CDP is unavailable or any of elements is absent,
+                so WebDriver has to be used instead
+        """
+        selectors = {
+            attr: self.css_selector(getattr(self.LOCATORS, attr.upper()))
+            for attr in attrs
+        }
+        if not (cdp := self.cdp) or None in selectors.values():
+            return None
+        self.driver.settle()
+        try:
+            elements = cdp.read_elements(selectors)
+        except CDPException:
+            return None
+        if None in elements.values():
+            return None
+        return elements
+
+    def evaluate_on(self, attr: str, function: str) -> Any:
+        """
+        Call JavaScript function with the located element in a single call,
+            via CDP if available.
+        
+        Args:
+            attr (str): locator name, as for attribute access
+            function (str): JavaScript function accepting the element,
+                e.g. '(element) => element.id'
+        
+        Returns:
+            Any: JSON-serializable result of the function
+        """
+        locator = getattr(self.LOCATORS, attr.upper())
+        selector = self.css_selector(locator)
+        if (cdp := self.cdp) and selector:
+            self.driver.settle()
+            try:
+                result = cdp.evaluate(
+                    f'(() => {{ const e = document.querySelector('
+                    f'{json.dumps(selector)}); '
+                    f'return e === null ? null : ({function})(e); }})()'
+                )
+            except CDPException:
+                pass
+            else:
+                if result is not None:
+                    return result
+        return self.with_element(attr, lambda x: self.driver.execute_script(
+            f'return ({function})(arguments[0]);', x
+        ))
+
+    def element_screenshot(self, attr: str) -> bytes:
+        """
+        Take PNG screenshot of the located element, via CDP if available.
+        
+        Args:
+            attr (str): locator name, as for attribute access
+        
+        Returns:
+            bytes: PNG image
+        """
+        selector = self.css_selector(getattr(self.LOCATORS, attr.upper()))
+        if (cdp := self.cdp) and selector:
+            self.driver.settle()
+            try:
+                return cdp.capture_screenshot(selector)
+            except CDPException:
+                pass
+        return self.with_element(attr, lambda x: x.screenshot_as_png)
 
     @property
     def language(self):
-        return Select(self.language_select).first_selected_option
+        return self.with_element(
+            'language_select', lambda x: Select(x).first_selected_option
+        )
 
     @language.setter
     def language(self, lang_code: str):
-        Select(self.language_select).select_by_value(lang_code)
+        if self._selected('language_select') == lang_code:
+            return
+        self.post_back('language_select', lambda x: (
+            Select(x).select_by_value(lang_code)
+        ))
+        if (page_state := self.page_state) is not None:
+            page_state.update('language', lang_code)
 
     @staticmethod
     def enter_input(webelement, value: str) -> True:
+        """
+        Type the value as `WaitData.TYPING_MODE` tells.
+        """
+        if WaitData.TYPING_MODE == 'instant':
+            webelement.send_keys(value.strip())
+            return True
         for symbol in value.strip():
-            sleep(0.1)
+            sleep(WaitData.TYPING_DELAY)
             webelement.send_keys(symbol)
         return True
 
     def get(self):
-        sleep(1)
+        try:
+            # let requests of the previous page finish
+            network_idle(self.driver)
+        except exceptions.TimeoutException as e:
+            self.driver.logger.debug('{}, getting {} anyway', e.msg, self.URL)
         self.driver.get(self.URL)
 
     def raw_get(self):
@@ -67,36 +552,45 @@ class BasePage(ABC):
 
     @staticmethod
     def get_selected_option(select_webelement):
-        return Select(select_webelement).first_selected_option.text
+        # `parent` of the element is the driver
+        return select_webelement.parent.execute_script(
+            'const x = arguments[0].selectedOptions[0]; '
+            "return x ? x.text.replace(/\\s+/g, ' ').trim() : null;",
+            select_webelement
+        )
 
     @staticmethod
     def get_select_options(select_webelement):
-        return [x.text for x in Select(select_webelement).options]
+        return select_webelement.parent.execute_script(
+            'return Array.from(arguments[0].options, '
+            "x => x.text.replace(/\\s+/g, ' ').trim());",
+            select_webelement
+        )
 
 
 class HomePage(BasePage):
-    URL = BasePage.URL / 'ARIApplication.aspx'
+    URL = Url.intern(f'{BasePage.URL}/ARIApplication.aspx')
     LOCATORS = locators.HomePageLocators
 
     def click_calendar(self):
-        self.calendar_button.click()
-        return True
+        return self.click('calendar_button')
 
     def click_applicants(self):
-        self.applicants_button.click()
-        return True
+        return self.click('applicants_button')
 
     @property
     def status(self):
+        if elements := self.read_elements('status_span'):
+            return elements['status_span']['text'].strip()
         return self.status_span.text.strip()
 
     @property
     def status_screenshot(self):
-        return self.status_outer_table.screenshot_as_png
+        return self.element_screenshot('status_outer_table')
 
 
 class LoginPage(BasePage):
-    URL = BasePage.URL / 'Account' / 'Entrada.aspx'
+    URL = Url.intern(f'{BasePage.URL}/Account/Entrada.aspx')
     LOCATORS = locators.LoginPageLocators
 
     @property
@@ -130,144 +624,293 @@ class LoginPage(BasePage):
         ]
 
     def submit(self):
-        self.submit_button.click()
-        return True
+        return self.click('submit_button')
 
 
 class ApplicantsPage(BasePage):
-    URL = BasePage.URL / 'ARIRF.aspx'
+    URL = Url.intern(f'{BasePage.URL}/ARIRF.aspx')
     LOCATORS = locators.ApplicantsPageLocators
+    NAME_HEADERS = ('name', 'nome')
+    STATUS_HEADERS = ('status', 'situa', 'estado')
+    TABLE_ROWS_SCRIPT = (
+        '(tbody) => Array.from(tbody.rows).map('
+        'row => Array.from(row.cells).map(cell => cell.innerText.trim()))'
+    )
+
+    @property
+    def applicants_statuses(self) -> dict[str, str]:
+        """
+        Read statuses of all the applicants from the table in a single call.
+        Columns are recognized by the header row.
+        
+        Returns:
+            dict[str, str]: applicant's name mapped to status
+        
+        Raises:
+            NoStatusException: no name or status column in the table
+        """
+        return self.parse_statuses(
+            self.evaluate_on('table', self.TABLE_ROWS_SCRIPT)
+        )
+
+    @classmethod
+    def parse_statuses(cls, rows: list[list[str]]) -> dict[str, str]:
+        """
+        Map applicants to statuses in texts of the table cells,
+            the first row being the header.
+
+        Raises:
+            NoStatusException: no name or status column in the table
+        """
+        if not rows:
+            return {}
+        header, *rows = rows
+        header = [x.lower() for x in header]
+
+        def column(keywords: tuple[str, ...]) -> int:
+            for index, title in enumerate(header):
+                if any(keyword in title for keyword in keywords):
+                    return index
+            raise NoStatusException(f'no {keywords[0]} column in {header}')
+
+        name_index, status_index = (
+            column(cls.NAME_HEADERS), column(cls.STATUS_HEADERS)
+        )
+        return {
+            row[name_index]: row[status_index] 
+            for row in rows if len(row) > max(name_index, status_index)
+        }
 
     def set_applicant(self, name: str):
         try:
-            self.table.find_element(
+            self.post_back('table', lambda x: x.find_element(
                 'xpath', f'//td[.="{name}"]/../td[1]/input'
-            ).click()
+            ).click())
         except exceptions.TimeoutException:
             raise ValueError(
                 f'unable to locate element with name "{name}"'
             ) from None
 
     def get_applicant_appointment(self):
-        self.applicant_calendar_button.click()
-        return True
+        return self.click('applicant_calendar_button')
 
     @property
     def applicant_status(self):
+        if elements := self.read_elements('applicant_status_span'):
+            return elements['applicant_status_span']['text']
         return self.applicant_status_span.text
 
 
 class AppointmentPage(BasePage):
-    URL = BasePage.URL / 'ARIAgenda.aspx'
+    URL = Url.intern(f'{BasePage.URL}/ARIAgenda.aspx')
     LOCATORS = locators.AppointmentPageLocators
+    STATE_FIELDS = {
+        **BasePage.STATE_FIELDS,
+        'matter_select': 'matter',
+        'branch_select': 'office',
+        'date_select': 'month',
+    }
 
     def schedule(self, data: dict[str, Union[datetime, str]]) -> bool:
-        self.matter_option = 'ARI'
-        self.branch_option = data['office']
-        self.date = data['datetime'].strftime('%Y - %B')
-        self.day = str(data['datetime'].day)
-        self.time = data['datetime'].strftime('%H:%M')
-        self.submit()
-        try:
-            _ = self.matter_option and self.branch_option and self.date
-        except exceptions.TimeoutException:
-            # if no such element are present on the page,
-            # then we got to another page and scheduling succeeded
-            return True
-        else:
+        with BOOKING_SECONDS.time(result='booked') as labels:
+            self.matter_option = 'ARI'
+            self.branch_option = data['office']
+            self.date = data['datetime'].strftime('%Y - %B')
+            self.day = str(data['datetime'].day)
+            self.time = data['datetime'].strftime('%H:%M')
+            self.submit()
+            states = self.read_selects(
+                'matter_select', 'branch_select', 'date_select'
+            )
+            if None in states.values():
+                # if no such element are present on the page,
+                # then we got to another page and scheduling succeeded
+                return True
+            labels['result'] = 'rejected'
             return False
 
+    def _select(self, attr: str, value: str) -> None:
+        """
+        Select option by visible text, it triggers postback of the page.
+        
+        Args:
+            attr (str): locator name of the select, as for attribute access
+            value (str): visible text of the option
+        """
+        if value is not None and self._selected(attr) == value:
+            return  # no postback, the option is selected already
+        with POSTBACK_SECONDS.time(select=attr), tracing.span(
+                    'postback', select=attr, value=value
+                ):
+            self.post_back(
+                attr, lambda x: Select(x).select_by_visible_text(value)
+            )
+        if (field := self.STATE_FIELDS.get(attr)) is not None and (
+                    page_state := self.page_state
+                ) is not None:
+            page_state.update(field, value)
+
     @property
-    def matter_option(self):
-        try:
-            return Select(self.matter_select).first_selected_option
-        except exceptions.NoSuchElementException:
-            return None
+    def matter_option(self) -> Optional[str]:
+        return self.select_state('matter_select').selected_option
 
     @property
-    def matter_options(self):
-        return [x.text for x in Select(self.matter_select).options]
+    def matter_options(self) -> list[str]:
+        return self.select_state('matter_select').options
 
     @matter_option.setter
     def matter_option(self, value: str):
-        Select(self.matter_select).select_by_visible_text(value)
+        self._select('matter_select', value)
 
     @property
-    def branch_options(self):
-        return [x.text for x in Select(self.branch_select).options]
+    def branch_options(self) -> list[str]:
+        return self.select_state('branch_select').options
 
     @property
-    def branch_option(self):
-        try:
-            return Select(self.branch_select).first_selected_option
-        except exceptions.NoSuchElementException:
-            return None
+    def branch_option(self) -> Optional[str]:
+        return self.select_state('branch_select').selected_option
 
     @branch_option.setter
     def branch_option(self, value: str):
-        Select(self.branch_select).select_by_visible_text(value)
+        self._select('branch_select', value)
 
     @property
-    def times(self):
-        return [x.text for x in Select(self.time_select).options]
+    def times(self) -> list[str]:
+        return self.select_state('time_select').options
 
     @property
-    def time(self):
-        try:
-            return Select(self.time_select).first_selected_option
-        except exceptions.NoSuchElementException:
-            return None
+    def time(self) -> Optional[str]:
+        return self.select_state('time_select').selected_option
 
     @time.setter
     def time(self, value: str):
-        Select(self.time_select).select_by_visible_text(value)
+        self._select('time_select', value)
 
     @property
-    def dates(self):
-        return [x.text for x in Select(self.date_select).options]
+    def dates(self) -> list[str]:
+        return self.select_state('date_select').options
 
     @property
-    def date(self):
-        try:
-            return Select(self.date_select).first_selected_option
-        except exceptions.NoSuchElementException:
-            return None
+    def date(self) -> Optional[str]:
+        return self.select_state('date_select').selected_option
     
     @date.setter
     def date(self, value: str):
-        Select(self.date_select).select_by_visible_text(value)
+        self._select('date_select', value)
 
     @property
-    def days(self):
-        return [x.text for x in Select(self.day_select).options]
+    def days(self) -> list[str]:
+        return self.select_state('day_select').options
 
     @property
-    def day(self):
-        try:
-            return Select(self.day_select).first_selected_option
-        except exceptions.NoSuchElementException:
-            return None
+    def day(self) -> Optional[str]:
+        return self.select_state('day_select').selected_option
 
     @day.setter
     def day(self, value: str):
-        Select(self.day_select).select_by_visible_text(value)
+        self._select('day_select', value)
 
     def all_meetings(self, *, offices: list[str] = None):
+        with SCAN_SECONDS.time():
+            options = None
+            if AppointmentData.ENUMERATE_IN_PAGE:
+                try:
+                    options = self._walk_tree(
+                        self.enumerate_meetings(offices=offices)
+                    )
+                except exceptions.WebDriverException as e:
+                    self.driver.logger.warning(
+                        'in-page enumeration failed: {}', e.msg
+                    )
+            if options is None:
+                ENUMERATIONS_TOTAL.inc(way='selenium')
+                options = self._walk_selects(offices)
+            else:
+                ENUMERATIONS_TOTAL.inc(way='in_page')
+            dates = {}
+            for office, date, day, time in options:
+                if (parsed := dates.get(date)) is None:
+                    parsed = dates[date] = datetime.strptime(date, '%Y - %B')
+                SLOTS_TOTAL.inc(office=office)
+                yield self.parse_meeting(office, parsed, day, time)
+
+    def enumerate_meetings(self, *, offices: list[str] = None) -> list:
+        """
+        Enumerate options of all the selects in a single WebDriver call.
+        The script posts the selects back in the page by itself,
+            see `postback.ENUMERATOR_SCRIPT`.
+
+        Args:
+            offices (list[str], optional): all the offices by default
+
+        Returns:
+            list: [[office, [[month, [[day, [time, ...]], ...]], ...]], ...]
+
+        Raises:
+            JavascriptException: enumeration failed
+            TimeoutException: enumeration took longer than script timeout
+        """
+        selectors = {
+            name: self.css_selector(getattr(self.LOCATORS, locator))
+            for name, locator in (
+                ('branch', 'BRANCH_SELECT'), ('date', 'DATE_SELECT'),
+                ('day', 'DAY_SELECT'), ('time', 'TIME_SELECT')
+            )
+        }
+        with tracing.span('enumerate'):
+            result = self.driver.execute_async_script(
+                ENUMERATOR_SCRIPT, selectors, offices
+            )
+        if isinstance(result, dict):
+            raise exceptions.JavascriptException(result.get('error'))
+        return result
+
+    @staticmethod
+    def _walk_tree(tree: list) -> Iterator[tuple[str, str, str, str]]:
+        for office, months in tree:
+            for date, days in months:
+                for day, times in days:
+                    for time in times:
+                        yield office, date, day, time
+
+    def _walk_selects(
+                self, offices: Optional[list[str]]
+            ) -> Iterator[tuple[str, str, str, str]]:
+        """
+        Enumerate options by selecting them one by one via WebDriver.
+        """
         for office in offices or self.branch_options:
             self.branch_option = office
             for date in self.dates:
                 self.date = date
-                date = datetime.strptime(date, '%Y - %B')
                 for day in self.days:
                     self.day = day
                     for time in self.times:
-                        yield {'datetime': datetime.combine(
-                            date.replace(day=int(day)).date(), 
-                            datetime.strptime(time, '%H:%M').time()
-                        ), 'office': office}
+                        yield office, date, day, time
+
+    @staticmethod
+    def parse_meeting(
+                office: str, date: datetime, day: str, time: str
+            ) -> dict[str, Union[datetime, str]]:
+        """
+        Make meeting of the selected options.
+
+        Args:
+            office (str): option of the branch select
+            date (datetime): parsed option of the date select
+            day (str): option of the day select
+            time (str): option of the time select, e.g. '09:30'
+
+        Returns:
+            dict[str, Union[datetime, str]]: as accepted by `schedule()`
+        """
+        return {'datetime': datetime.combine(
+            date.replace(day=int(day)).date(), 
+            datetime.strptime(time, '%H:%M').time()
+        ), 'office': office}
 
     def submit(self):
-        self.submit_button.click()
+        self.click('submit_button')
 
     def refresh(self):
-        self.refresh_button.click()
+        self.click('refresh_button')
@@ -0,0 +1,406 @@
+import re
+import threading
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+
+DELTA_PATTERN = re.compile(r'^\d+\|')
+# tags requests of `ENUMERATOR_SCRIPT`, which do not change the page
+ENUMERATOR_HEADER = 'X-Ari-Enumerator'
+
+
+@dataclass
+class SelectState:
+    options: list[str]  # visible texts
+    values: list[str]
+    selected: Optional[int]  # index of the selected option
+
+    @property
+    def selected_option(self) -> Optional[str]:
+        return None if self.selected is None else self.options[self.selected]
+
+    @property
+    def selected_value(self) -> Optional[str]:
+        return None if self.selected is None else self.values[self.selected]
+
+
+class _SelectParser(HTMLParser):
+    def __init__(self, ids: Optional[Iterable[str]]):
+        super().__init__()
+        self.ids = None if ids is None else set(ids)
+        self.states: dict[str, SelectState] = {}
+        self._select: Optional[SelectState] = None
+        self._option: Optional[list[str]] = None  # text parts
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'select':
+            id_ = attrs.get('id')
+            if id_ and (self.ids is None or id_ in self.ids):
+                self._select = self.states[id_] = SelectState([], [], None)
+        elif tag == 'option' and self._select is not None:
+            self._end_option()
+            if 'selected' in attrs:
+                self._select.selected = len(self._select.options)
+            self._select.values.append(attrs.get('value'))
+            self._option = []
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'option':
+            self._end_option()
+        elif tag == 'select' and self._select is not None:
+            self._end_option()
+            select = self._select
+            if select.selected is None and select.options:
+                select.selected = 0  # as browsers select the first one
+            self._select = None
+
+    def _end_option(self) -> None:
+        if self._option is None:
+            return
+        text = ' '.join(''.join(self._option).split())
+        self._select.options.append(text)
+        index = len(self._select.options) - 1
+        if self._select.values[index] is None:
+            self._select.values[index] = text
+        self._option = None
+
+
+def parse_selects(
+            html: str, ids: Optional[Iterable[str]] = None
+        ) -> dict[str, SelectState]:
+    """
+    Parse options and selection of the selects in HTML.
+
+    Args:
+        html (str): page or its fragment
+        ids (Optional[Iterable[str]], optional): ids of the selects,
+            all the selects by default
+
+    Returns:
+        dict[str, SelectState]: ids of the found selects mapped to states
+    """
+    parser = _SelectParser(ids)
+    parser.feed(html)
+    parser.close()
+    return parser.states
+
+
+def parse_delta(text: str) -> list[tuple[str, str, str]]:
+    """
+    Split response of a partial (UpdatePanel) postback into records,
+        formatted as `length|type|id|content|`.
+
+    Returns:
+        list[tuple[str, str, str]]: types, ids and contents of records
+
+    Raises:
+        ValueError: the response is malformed
+    """
+    records = []
+    index = 0
+    while index < len(text):
+        parts = []
+        for _ in range(3):
+            end = text.find('|', index)
+            if end == -1:
+                raise ValueError('malformed delta response')
+            parts.append(text[index:end])
+            index = end + 1
+        length, type_, id_ = parts
+        if not length.isdigit():
+            raise ValueError('malformed delta response')
+        records.append((type_, id_, text[index:index + int(length)]))
+        index += int(length) + 1
+    return records
+
+
+def parse_response(
+            text: str, ids: Optional[Iterable[str]] = None
+        ) -> tuple[dict[str, SelectState], bool]:
+    """
+    Parse selects of a postback response, either a partial or a full one.
+
+    Args:
+        text (str): decoded body of the response
+        ids (Optional[Iterable[str]], optional): ids of the selects,
+            all the selects by default
+
+    Returns:
+        tuple[dict[str, SelectState], bool]: states of the found selects
+            and whether the response is partial, so that selects out of
+            the updated panels keep their states
+    """
+    if not DELTA_PATTERN.match(text):
+        return parse_selects(text, ids), False
+    return parse_selects(''.join(
+        content for type_, _, content in parse_delta(text)
+        if type_ == 'updatePanel'
+    ), ids), True
+
+
+class SelectFeed:
+    """
+    States of the selects parsed from intercepted postback responses,
+        known before the browser renders them.
+    Is fed by `Driver` interceptors, a driver is used by one thread
+        at a time, so postbacks of a driver come one by one.
+    States are of the current page, the driver resets them on navigation
+        and tab switch. Until a full response is seen, only the selects
+        of the last partial one are known.
+    """
+
+    def __init__(self):
+        self.requests = self.responses = 0
+        self._states: dict[str, SelectState] = {}
+        self._is_complete = False  # whether states of the page are known
+        self._condition = threading.Condition()
+
+    def reset(self) -> None:
+        """
+        Forget the states, e.g. when another page is shown.
+        Marks taken before stay valid.
+        """
+        with self._condition:
+            self._states = {}
+            self._is_complete = False
+
+    def mark(self) -> tuple[int, int]:
+        """
+        Get position of the feed to wait for newer states with `wait()`.
+        """
+        with self._condition:
+            return self.requests, self.responses
+
+    def add_request(self) -> None:
+        with self._condition:
+            self.requests += 1
+            self._condition.notify_all()
+
+    def add_response(
+                self, states: Optional[dict[str, SelectState]],
+                *, partial: bool
+            ) -> None:
+        """
+        Add states parsed from a response.
+
+        Args:
+            states (Optional[dict[str, SelectState]]): None if the response
+                is not parsed, so all the states are unknown
+            partial (bool): only the passed states are updated
+        """
+        with self._condition:
+            self.responses += 1
+            if states is None:
+                self._states = {}
+                self._is_complete = False
+            elif partial and self._is_complete:
+                self._states.update(states)
+            else:
+                # a delta to an unknown page is returned as is
+                self._states = dict(states)
+                self._is_complete = not partial
+            self._condition.notify_all()
+
+    def wait(
+                self, mark: tuple[int, int], *, grace: float, timeout: float
+            ) -> Optional[dict[str, SelectState]]:
+        """
+        Wait for responses to the postbacks sent after the mark.
+
+        Args:
+            mark (tuple[int, int]): as returned by `mark()`
+            grace (float): seconds to wait for a postback to be sent
+            timeout (float): seconds to wait for the responses
+
+        Returns:
+            Optional[dict[str, SelectState]]: ids of the selects mapped to
+                states, None if no postback was sent or answered in time
+        """
+        requests, responses = mark
+        with self._condition:
+            if not self._condition.wait_for(
+                        lambda: self.requests > requests, grace
+                    ):
+                return None
+            # failed requests are never answered, so they are not awaited
+            if not self._condition.wait_for(
+                        lambda: self.responses > responses, timeout
+                    ):
+                return None
+            return dict(self._states)
+
+
+# Asynchronous WebDriver script enumerating appointment slots in the page.
+# Selects are changed by posting the form with fetch and the page's own
+#   viewstate, as partial (UpdatePanel) postbacks if the page uses
+#   ASP.NET AJAX, or as full ones otherwise. The page itself is intact.
+# Requests are tagged by `ENUMERATOR_HEADER`.
+# Arguments: selectors of branch, date, day and time selects,
+#   offices to enumerate or null for all.
+# Result: [[office, [[month, [[day, [time, ...]], ...]], ...]], ...]
+#   in order of the options, or {error: message}.
+ENUMERATOR_SCRIPT = r'''
+const [selectors, offices, done] = arguments;
+const form = document.forms[0];
+const Sys = window.Sys;
+const prm = Sys && Sys.WebForms && Sys.WebForms.PageRequestManager
+    ? Sys.WebForms.PageRequestManager.getInstance() : null;
+const SKIPPED_TYPES = ['submit', 'button', 'image', 'reset', 'file'];
+
+function fieldsOf(form) {
+    const fields = {};
+    for (const element of form.elements) {
+        const type = (element.type || '').toLowerCase();
+        if (!element.name || element.disabled) continue;
+        if (SKIPPED_TYPES.includes(type)) continue;
+        if (['checkbox', 'radio'].includes(type) && !element.checked) continue;
+        fields[element.name] = element.value;
+    }
+    return fields;
+}
+
+function panelOf(select) {
+    // unique id of the UpdatePanel containing the select
+    if (!prm || !prm._scriptManagerID || !prm._updatePanelClientIDs) {
+        return null;
+    }
+    const ids = prm._updatePanelClientIDs;
+    for (let i = 0; i < ids.length; i++) {
+        const panel = document.getElementById(ids[i]);
+        if (panel && panel.contains(select)) return prm._updatePanelIDs[i];
+    }
+    return null;
+}
+
+function optionsOf(state, selector) {
+    for (const root of state.roots) {
+        const select = root.querySelector(selector);
+        if (select !== null) {
+            return Array.from(select.options, x => ({
+                text: x.text.replace(/\s+/g, ' ').trim(), value: x.value
+            }));
+        }
+    }
+    throw new Error(`${selector} is absent`);
+}
+
+function parseDelta(text) {
+    // length|type|id|content| records of a partial postback response
+    const delta = {panels: [], hidden: {}};
+    let i = 0;
+    const next = () => {
+        const j = text.indexOf('|', i);
+        if (j === -1) throw new Error('malformed delta response');
+        const value = text.substring(i, j);
+        i = j + 1;
+        return value;
+    };
+    while (i < text.length) {
+        const length = parseInt(next(), 10);
+        const type = next();
+        const id = next();
+        if (isNaN(length)) throw new Error('malformed delta response');
+        const content = text.substr(i, length);
+        i += length + 1;
+        if (type === 'updatePanel') delta.panels.push(content);
+        else if (type === 'hiddenField') delta.hidden[id] = content;
+        else if (type === 'pageRedirect' || type === 'error') {
+            throw new Error(`${type}: ${content}`);
+        }
+    }
+    return delta;
+}
+
+async function postback(state, name, value, panel) {
+    const fields = Object.assign({}, state.fields, {
+        [name]: value, __EVENTTARGET: name, __EVENTARGUMENT: ''
+    });
+    const headers = {
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+        'X-Ari-Enumerator': '1'
+    };
+    if (panel) {
+        fields[prm._scriptManagerID] = `${panel}|${name}`;
+        fields.__ASYNCPOST = 'true';
+        headers['X-MicrosoftAjax'] = 'Delta=true';
+    }
+    const response = await fetch(state.action, {
+        method: 'POST', headers, body: new URLSearchParams(fields),
+        credentials: 'same-origin'
+    });
+    if (!response.ok) throw new Error(`${name} postback: ${response.status}`);
+    const text = await response.text();
+    const parser = new DOMParser();
+    if (panel) {
+        const delta = parseDelta(text);
+        // parsed documents are inert, nothing is loaded or run
+        const root = parser.parseFromString(
+            delta.panels.join(''), 'text/html'
+        );
+        Object.assign(fields, delta.hidden);
+        delete fields[prm._scriptManagerID];
+        delete fields.__ASYNCPOST;
+        for (const select of root.querySelectorAll('select[name]')) {
+            fields[select.name] = select.value;
+        }
+        return {action: state.action, fields, roots: [root, ...state.roots]};
+    }
+    const root = parser.parseFromString(text, 'text/html');
+    if (!root.forms[0]) throw new Error(`${name} postback: no form`);
+    return {
+        action: new URL(
+            root.forms[0].getAttribute('action') || response.url, response.url
+        ).href,
+        fields: fieldsOf(root.forms[0]), roots: [root]
+    };
+}
+
+async function enumerate() {
+    const names = {}, panels = {};
+    for (const [key, selector] of Object.entries(selectors)) {
+        const select = document.querySelector(selector);
+        if (select === null) throw new Error(`${selector} is absent`);
+        names[key] = select.name;
+        panels[key] = panelOf(select);
+    }
+    const initial = {
+        action: form.action, fields: fieldsOf(form), roots: [document]
+    };
+    const branches = optionsOf(initial, selectors.branch);
+    const tree = [];
+    for (const office of offices || branches.map(x => x.text)) {
+        const branch = branches.find(x => x.text === office);
+        if (branch === undefined) continue;
+        const months = [];
+        const byBranch = await postback(
+            initial, names.branch, branch.value, panels.branch
+        );
+        for (const month of optionsOf(byBranch, selectors.date)) {
+            const days = [];
+            const byMonth = await postback(
+                byBranch, names.date, month.value, panels.date
+            );
+            for (const day of optionsOf(byMonth, selectors.day)) {
+                const byDay = await postback(
+                    byMonth, names.day, day.value, panels.day
+                );
+                days.push([day.text, optionsOf(byDay, selectors.time).map(
+                    x => x.text
+                )]);
+            }
+            months.push([month.text, days]);
+        }
+        tree.push([office, months]);
+    }
+    return tree;
+}
+
+enumerate().then(done, error => done({
+    error: String(error && error.message || error)
+}));
+'''
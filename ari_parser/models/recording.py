@@ -0,0 +1,288 @@
+import base64
+import gzip
+import json
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlparse
+
+from loguru import logger
+from seleniumwire.utils import decode
+
+import settings
+
+REDACTED = '[redacted]'
+REDACTED_REQUEST_HEADERS = ('cookie', 'authorization', 'proxy-authorization')
+# hop-by-hop and length headers are not replayed as recorded
+SKIPPED_HEADERS = (
+    'connection', 'keep-alive', 'transfer-encoding', 'content-length'
+)
+
+
+def path_of(url: str) -> str:
+    """
+    Get path with query of the url, so that exchanges are matched
+        regardless of the host they are served from.
+    """
+    parsed = urlparse(url)
+    return f'{parsed.path}?{parsed.query}' if parsed.query else parsed.path
+
+
+@dataclass(frozen=True)
+class Exchange:
+    method: str
+    url: str
+    request_headers: tuple[tuple[str, str], ...]
+    request_body: bytes
+    status: int
+    reason: str
+    headers: tuple[tuple[str, str], ...]
+    body: bytes
+
+    @property
+    def key(self) -> tuple[str, str, bytes]:
+        return self.method, path_of(self.url), self.request_body
+
+    @property
+    def response_headers(self) -> list[tuple[str, str]]:
+        return [
+            (k, v) for k, v in self.headers
+            if k.lower() not in SKIPPED_HEADERS
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            'method': self.method, 'url': self.url,
+            'request_headers': self.request_headers,
+            'request_body': base64.b64encode(self.request_body).decode(),
+            'status': self.status, 'reason': self.reason,
+            'headers': self.headers,
+            'body': base64.b64encode(self.body).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Exchange':
+        return cls(
+            data['method'], data['url'],
+            tuple(map(tuple, data['request_headers'])),
+            base64.b64decode(data['request_body']),
+            data['status'], data['reason'],
+            tuple(map(tuple, data['headers'])),
+            base64.b64decode(data['body'])
+        )
+
+
+def redact_form(body: bytes, fields: Iterable[str]) -> bytes:
+    """
+    Replace values of the fields in url-encoded form data.
+    Bodies of other types are returned as is.
+    """
+    fields = set(fields)
+    try:
+        pairs = parse_qsl(
+            body.decode('ascii'), keep_blank_values=True, strict_parsing=True
+        )
+    except (UnicodeDecodeError, ValueError):
+        return body
+    if not any(k in fields for k, _ in pairs):
+        return body
+    return urlencode([
+        (k, REDACTED if k in fields else v) for k, v in pairs
+    ]).encode('ascii')
+
+
+def redact_cookie(header: str) -> str:
+    """
+    Replace value of the cookie in Set-Cookie header, keeping its name
+        and attributes.
+    """
+    cookie, _, attributes = header.partition(';')
+    name = cookie.split('=', maxsplit=1)[0]
+    return f'{name}={REDACTED}' + (f';{attributes}' if attributes else '')
+
+
+def decode_body(exchange: Exchange) -> Exchange:
+    """
+    Decode the response body by its Content-Encoding, e.g. gzip or br,
+        so that it can be searched for secrets.
+    The header is dropped, the body is kept decoded. A body which can
+        not be decoded is dropped as well, it can not be redacted.
+    """
+    encoding = next((
+        v for k, v in exchange.headers if k.lower() == 'content-encoding'
+    ), 'identity')
+    if encoding.strip().lower() == 'identity':
+        return exchange
+    try:
+        body = decode(exchange.body, encoding)
+    except ValueError as e:
+        logger.warning(f'body of {exchange.url} is not recorded: {e}')
+        body = b''
+    return replace(
+        exchange,
+        headers=tuple(
+            (k, v) for k, v in exchange.headers
+            if k.lower() != 'content-encoding'
+        ),
+        body=body
+    )
+
+
+def redact(
+            exchange: Exchange, *, fields: Iterable[str] = (),
+            secrets: Iterable[str] = ()
+        ) -> Exchange:
+    """
+    Remove credentials from the exchange: the form fields, cookies,
+        authorization headers and any occurrence of the secrets,
+        as is or url-encoded. The response body is decoded first.
+
+    Args:
+        exchange (Exchange): exchange to be redacted
+        fields (Iterable[str], optional): names of the form fields
+        secrets (Iterable[str], optional): e.g. email and password
+
+    Returns:
+        Exchange: redacted copy
+    """
+    # too short secrets would mangle unrelated content
+    secrets = [x for x in secrets if x and len(x) >= 4]
+    # e.g. email in the query or the form is 'user%40example.com'
+    secrets = sorted(
+        {y for x in secrets for y in (x, quote_plus(x))}, key=len,
+        reverse=True
+    )
+    exchange = decode_body(exchange)
+
+    def scrub(value: str) -> str:
+        for secret in secrets:
+            value = value.replace(secret, REDACTED)
+        return value
+
+    def scrub_bytes(value: bytes) -> bytes:
+        for secret in secrets:
+            value = value.replace(secret.encode('utf-8'), REDACTED.encode())
+        return value
+
+    return replace(
+        exchange,
+        url=scrub(exchange.url),
+        request_headers=tuple(
+            (k, REDACTED) if k.lower() in REDACTED_REQUEST_HEADERS
+            else (k, scrub(v)) for k, v in exchange.request_headers
+        ),
+        request_body=scrub_bytes(redact_form(exchange.request_body, fields)),
+        headers=tuple(
+            (k, redact_cookie(v) if k.lower() == 'set-cookie' else scrub(v))
+            for k, v in exchange.headers
+        ),
+        body=scrub_bytes(exchange.body),
+    )
+
+
+class Recorder:
+    """
+    Record traffic of a driver to a gzipped JSON lines fixture.
+    Exchanges are redacted before being written.
+    """
+
+    def __init__(
+                self, filename: str,
+                *, fields: Optional[Iterable[str]] = None,
+                secrets: Iterable[str] = ()
+            ):
+        self.filename = filename
+        self.fields = list(
+            settings.CaptureData.REDACTED_FIELDS if fields is None else fields
+        )
+        self.secrets = list(secrets)
+        self.count = 0
+        self._file = gzip.open(filename, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def add(self, request, response) -> None:
+        """
+        Record the exchange of selenium-wire.
+        Is called by selenium-wire for every response to the browser.
+        """
+        exchange = redact(Exchange(
+            request.method, request.url, tuple(request.headers.items()),
+            request.body or b'', response.status_code, response.reason,
+            tuple(response.headers.items()), response.body or b''
+        ), fields=self.fields, secrets=self.secrets)
+        line = json.dumps(exchange.to_dict())
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + '\n')
+            # keep the fixture readable if the process is killed
+            self._file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Fixture:
+    """
+    Recorded exchanges to be replayed.
+    Requests are matched by method, path with query and body, with
+        the same redaction applied, so recorded postbacks are found as
+        long as the pages are replayed in the recorded order. Equal
+        requests get their responses in the recorded order, the last
+        one is repeated.
+    """
+
+    def __init__(
+                self, exchanges: Iterable[Exchange],
+                *, fields: Optional[Iterable[str]] = None
+            ):
+        self.fields = list(
+            settings.CaptureData.REDACTED_FIELDS if fields is None else fields
+        )
+        self.exchanges = list(exchanges)
+        self._queues: dict[tuple, deque] = defaultdict(deque)
+        self._by_path: dict[tuple[str, str], Exchange] = {}
+        for exchange in self.exchanges:
+            self._queues[exchange.key].append(exchange)
+            self._by_path.setdefault(exchange.key[:2], exchange)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def load(cls, filename: str, **kwargs) -> 'Fixture':
+        exchanges = []
+        with gzip.open(filename, 'rt', encoding='utf-8') as file:
+            try:
+                for line in file:
+                    exchanges.append(Exchange.from_dict(json.loads(line)))
+            except (EOFError, ValueError):
+                # recording was interrupted, the written part is used
+                logger.warning(f'{filename!r} is truncated')
+        return cls(exchanges, **kwargs)
+
+    def match(
+                self, method: str, url: str, body: Optional[bytes] = None
+            ) -> Optional[Exchange]:
+        """
+        Find the recorded response of the request.
+        If no request with the same body is recorded, the first one
+            with the same method and path is used.
+
+        Returns:
+            Optional[Exchange]: None if the path was not recorded
+        """
+        key = (method, path_of(url), redact_form(body or b'', self.fields))
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                exchange = queue.popleft() if len(queue) > 1 else queue[0]
+            else:
+                exchange = self._by_path.get(key[:2])
+            if exchange is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return exchange
@@ -0,0 +1,211 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+import settings
+
+
+RESOURCE_EXTENSIONS = {
+    'image': ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.svg', '.webp'),
+    'font': ('.woff', '.woff2', '.ttf', '.otf', '.eot'),
+    'stylesheet': ('.css', ),
+    'media': ('.mp3', '.mp4', '.webm', '.ogg', '.wav', '.avi'),
+    'script': ('.js', ),
+}
+ACCEPT_PREFIXES = {
+    'image': ('image/', ),
+    'stylesheet': ('text/css', ),
+    'font': ('font/', 'application/font'),
+    'media': ('audio/', 'video/'),
+    'document': ('text/html', ),
+}
+# Sec-Fetch-Dest header sent by Chrome -> resource type
+FETCH_DESTINATIONS = {
+    'image': 'image', 'style': 'stylesheet', 'font': 'font',
+    'audio': 'media', 'video': 'media', 'track': 'media',
+    'script': 'script', 'document': 'document', 'iframe': 'document',
+    'frame': 'document', 'empty': 'xhr',  # fetch() and XMLHttpRequest
+}
+# needed for login and postbacks, blocked by domain only if listed
+NEVER_THIRD_PARTY_TYPES = frozenset({'document', 'script', 'xhr'})
+
+
+def guess_resource_type(
+            path: str, accept: Optional[str] = None,
+            dest: Optional[str] = None
+        ) -> str:
+    """
+    Guess the type of the requested resource by its Sec-Fetch-Dest header,
+        or by its path and Accept header if the header is not sent.
+
+    Args:
+        path (str): url or path of the request
+        accept (Optional[str], optional): value of the Accept header
+        dest (Optional[str], optional): value of the Sec-Fetch-Dest header
+
+    Returns:
+        str: one of `FETCH_DESTINATIONS` values or 'other'
+    """
+    if (dest or '').lower() in FETCH_DESTINATIONS:
+        return FETCH_DESTINATIONS[dest.lower()]
+    extension = os.path.splitext(urlparse(path).path)[1].lower()
+    for type_, extensions in RESOURCE_EXTENSIONS.items():
+        if extension in extensions:
+            return type_
+    accept = (accept or '').lower()
+    for type_, prefixes in ACCEPT_PREFIXES.items():
+        if accept.startswith(prefixes):
+            return type_
+    return 'other'
+
+
+class ResourceStats:
+    """
+    Thread-safe statistics of the requests blocked by `ResourcePolicy`.
+    Saved bytes are estimated by average size of the allowed responses
+        of the same type, or by the fallback sizes if none were seen yet.
+    Page load time saved is measured by `benchmarks.driver_modes`, which
+        loads the same pages with the policy on and off.
+    """
+
+    def __init__(self, fallback_sizes: Optional[dict[str, int]] = None):
+        self.fallback_sizes = fallback_sizes or {}
+        self.blocked_requests = defaultdict(int)
+        self.blocked_bytes = 0
+        self._seen_sizes = defaultdict(lambda: [0, 0])  # [total, count]
+        self._lock = threading.Lock()
+
+    def add_response(self, type_: str, size: int) -> None:
+        with self._lock:
+            seen = self._seen_sizes[type_]
+            seen[0] += size
+            seen[1] += 1
+
+    def add_blocked(self, type_: str) -> None:
+        with self._lock:
+            self.blocked_requests[type_] += 1
+            total, count = self._seen_sizes.get(type_, (0, 0))
+            if count:
+                self.blocked_bytes += total // count
+            else:
+                self.blocked_bytes += self.fallback_sizes.get(type_, 0)
+
+    @property
+    def total_blocked(self) -> int:
+        return sum(self.blocked_requests.values())
+
+    def __str__(self) -> str:
+        return (
+            f"blocked {self.total_blocked} requests "
+            f"({dict(self.blocked_requests)}), "
+            f"~{self.blocked_bytes / 1024:.1f} KiB saved"
+        )
+
+
+class ResourcePolicy:
+    """
+    Decide which requests of the browser are unnecessary for the crawler.
+    Page exceptions map the last segment of the page path to resource types
+        that have to be loaded on that page, e.g. `{'ARIApplication.aspx':
+        ['stylesheet']}`. The page is determined by the Referer header.
+    """
+
+    def __init__(
+                self, *, domain: str,
+                blocked_types: Iterable[str] = (),
+                blocked_domains: Iterable[str] = (),
+                block_third_party: bool = False,
+                page_exceptions: Optional[dict[str, Iterable[str]]] = None,
+                fallback_sizes: Optional[dict[str, int]] = None,
+                enabled: bool = True
+            ):
+        self.domain = domain
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_domains = frozenset(blocked_domains)
+        self.block_third_party = block_third_party
+        self.page_exceptions = {
+            page: frozenset(types)
+            for page, types in (page_exceptions or {}).items()
+        }
+        self.enabled = enabled
+        self.stats = ResourceStats(fallback_sizes)
+
+    @classmethod
+    def from_settings(cls) -> 'ResourcePolicy':
+        return cls(
+            domain=urlparse(settings.BASE_URL).hostname,
+            blocked_types=settings.ResourcePolicy.BLOCKED_TYPES,
+            blocked_domains=settings.ResourcePolicy.BLOCKED_DOMAINS,
+            block_third_party=settings.ResourcePolicy.BLOCK_THIRD_PARTY,
+            page_exceptions=settings.ResourcePolicy.PAGE_EXCEPTIONS,
+            fallback_sizes=settings.ResourcePolicy.FALLBACK_SIZES,
+            enabled=settings.ResourcePolicy.ENABLED,
+        )
+
+    def allowed_types(self, page_url: Optional[str]) -> frozenset[str]:
+        if not page_url:
+            return frozenset()
+        page = urlparse(page_url).path.rstrip('/').rsplit('/', 1)[-1]
+        return self.page_exceptions.get(page, frozenset())
+
+    def is_third_party(self, host: str) -> bool:
+        return not (host == self.domain or host.endswith(f'.{self.domain}'))
+
+    def block_reason(
+                self, url: str, *, accept: Optional[str] = None,
+                referer: Optional[str] = None, dest: Optional[str] = None
+            ) -> Optional[str]:
+        """
+        Check whether the request should be blocked.
+        Third-party requests are blocked only if they are assets, pages,
+            scripts and XHR are blocked by domain only if it is listed.
+
+        Args:
+            url (str): requested url
+            accept (Optional[str], optional): Accept header of the request
+            referer (Optional[str], optional): Referer header of the request
+            dest (Optional[str], optional): Sec-Fetch-Dest header
+
+        Returns:
+            Optional[str]: resource type to be blocked or None to allow
+        """
+        if not self.enabled:
+            return None
+        host = urlparse(url).hostname or ''
+        type_ = guess_resource_type(url, accept, dest)
+        if type_ in self.allowed_types(referer):
+            return None
+        if host in self.blocked_domains or (
+                    self.block_third_party and self.is_third_party(host)
+                    and type_ not in NEVER_THIRD_PARTY_TYPES
+                ):
+            return 'third-party' if type_ == 'other' else type_
+        if type_ in self.blocked_types:
+            return type_
+        return None
+
+    def url_patterns(self, page_url: Optional[str]) -> tuple[str, ...]:
+        """
+        Get url patterns to be blocked by Chrome itself on the page.
+        Third-party domains can not be expressed as patterns, so only 
+            resource types and blocked domains are taken into account.
+
+        Args:
+            page_url (Optional[str]): url of the page to be loaded
+
+        Returns:
+            tuple[str, ...]: patterns for `Network.setBlockedURLs`
+        """
+        if not self.enabled:
+            return ()
+        types = self.blocked_types - self.allowed_types(page_url)
+        patterns = [
+            pattern
+            for type_ in sorted(types)
+            for extension in RESOURCE_EXTENSIONS.get(type_, ())
+            for pattern in (f'*{extension}', f'*{extension}?*')
+        ]
+        patterns.extend(f'*://{domain}/*' for domain in self.blocked_domains)
+        return tuple(patterns)
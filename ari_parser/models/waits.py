@@ -0,0 +1,180 @@
+from selenium.common import exceptions
+
+from .exceptions import CDPException
+import settings
+
+# Arms the page before an action which may post it back.
+# The postback is started once its request is issued: a form is submitted
+#   or the page's scripts send XMLHttpRequest. ASP.NET AJAX pages report
+#   partial postbacks by PageRequestManager events, other pages are
+#   watched by MutationObserver. Full postbacks replace the document,
+#   so the state is gone from the new one.
+ARM_SCRIPT = '''
+const state = window.__ariPostback = {started: false, done: false};
+window.addEventListener('beforeunload', () => { state.started = true; });
+document.addEventListener('submit', () => { state.started = true; }, true);
+if (!window.__ariSendHooked) {
+    window.__ariSendHooked = true;
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        const state = window.__ariPostback;
+        if (state) {
+            state.started = true;
+            // handlers of the response run before loadend
+            this.addEventListener('loadend', () => { state.done = true; });
+        }
+        return send.apply(this, arguments);
+    };
+}
+const Sys = window.Sys;
+const prm = Sys && Sys.WebForms && Sys.WebForms.PageRequestManager
+    ? Sys.WebForms.PageRequestManager.getInstance() : null;
+if (prm) {
+    const started = () => {
+        state.started = true;
+        prm.remove_initializeRequest(started);
+    };
+    const ended = () => {
+        state.done = true;
+        prm.remove_endRequest(ended);
+    };
+    prm.add_initializeRequest(started);
+    prm.add_endRequest(ended);
+} else {
+    const observer = new MutationObserver(() => {
+        state.started = state.done = true;
+        observer.disconnect();
+    });
+    observer.observe(
+        document.body || document.documentElement,
+        {childList: true, subtree: true}
+    );
+}
+'''
+# Arguments: grace in turns of the event loop, timeout and poll frequency
+#   in seconds.
+# Result: true if the postback is complete, or if its request has not been
+#   issued within grace turns, false if timed out.
+# Tasks queued by the action, as `setTimeout(__doPostBack, 0)` of
+#   AutoPostBack controls, run before the next turns however slow the tab
+#   is, so the request is issued by then if the action posts the page back.
+WAIT_SCRIPT = '''
+const [grace, timeout, poll, done] = arguments;
+const start = performance.now();
+let turns = 0;
+(function check() {
+    const state = window.__ariPostback;
+    const elapsed = (performance.now() - start) / 1000;
+    if (state === undefined) {
+        if (document.readyState === 'complete') return done(true);
+    } else if (state.done || !state.started && turns >= grace) {
+        delete window.__ariPostback;
+        return done(true);
+    }
+    if (elapsed >= timeout) return done(false);
+    const isIssuing = state !== undefined && !state.started;
+    setTimeout(check, isIssuing && turns++ < grace ? 0 : poll * 1000);
+})();
+'''
+# Arguments: timeout in seconds. Result: false if timed out.
+READY_SCRIPT = '''
+const [timeout, done] = arguments;
+if (document.readyState === 'complete') {
+    done(true);
+} else {
+    window.addEventListener('load', () => done(true), {once: true});
+    setTimeout(() => done(false), timeout * 1000);
+}
+'''
+
+
+class Postback:
+    """
+    Wait for the page to be posted back after an action.
+    Usage:
+        ```
+        >>> postback = Postback(driver).arm()
+        >>> Select(select_webelement).select_by_visible_text('Lisboa')
+        >>> postback.wait()
+        ```
+    Waiting can be deferred till the page is needed again.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def arm(self) -> 'Postback':
+        self.driver.execute_script(ARM_SCRIPT)
+        return self
+
+    def wait(self, timeout: float = None) -> True:
+        """
+        Wait for the postback to complete.
+        If the action has not issued the postback request within
+            `settings.WaitData.POSTBACK_GRACE_TURNS` turns of the page's
+            event loop, it is not waited for.
+
+        Args:
+            timeout (float, optional): in seconds,
+                `settings.WaitData.POSTBACK_TIMEOUT` by default
+
+        Returns:
+            True
+
+        Raises:
+            TimeoutException: the postback has not completed in time
+        """
+        timeout = timeout or settings.WaitData.POSTBACK_TIMEOUT
+        for _ in range(2):
+            try:
+                is_complete = self.driver.execute_async_script(
+                    WAIT_SCRIPT, settings.WaitData.POSTBACK_GRACE_TURNS,
+                    timeout,
+                    settings.WaitData.POLL_FREQUENCY
+                )
+            except exceptions.JavascriptException as e:
+                # the document was replaced while waiting, the new one
+                #   is checked by the second attempt
+                if 'unloaded' not in (e.msg or ''):
+                    raise
+                continue
+            if not is_complete:
+                raise exceptions.TimeoutException('postback is not complete')
+            return True
+        raise exceptions.TimeoutException('postback is not complete')
+
+
+def document_ready(driver, timeout: float = None) -> True:
+    """
+    Wait for the document of the current tab to be loaded.
+
+    Raises:
+        TimeoutException: the document is not loaded in time
+    """
+    if not driver.execute_async_script(
+                READY_SCRIPT, timeout or settings.PAGE_LOAD_TIMEOUT
+            ):
+        raise exceptions.TimeoutException('document is not loaded')
+    return True
+
+
+def network_idle(driver, timeout: float = None) -> True:
+    """
+    Wait until the current tab has no requests in flight for
+        `settings.WaitData.NETWORK_IDLE_TIME`.
+    Without CDP, only the document is waited for.
+
+    Raises:
+        TimeoutException: the network is not idle in time
+    """
+    timeout = timeout or settings.PAGE_LOAD_TIMEOUT
+    if cdp := getattr(driver, 'cdp', None):
+        try:
+            return cdp.wait_network_idle(
+                idle_time=settings.WaitData.NETWORK_IDLE_TIME,
+                timeout=timeout,
+                inflight_ttl=settings.WaitData.INFLIGHT_TTL
+            )
+        except CDPException as e:
+            raise exceptions.TimeoutException(str(e)) from None
+    return document_ready(driver, timeout)
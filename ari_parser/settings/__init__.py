@@ -23,11 +23,49 @@ AUTH_TOKEN_COOKIE_NAME = '.ASPXAUTH'
 SESSION_ID_COOKIE_NAME = 'ASP.NET_SessionId'
 
 DB_NAME = 'db.sqlite3'
-SNAPSHOTS_PATH = 'snapshots'
-SCREENSHOTS_PATH = 'screenshots'
 LOGS_PATH = 'logs'
 
 LOG_LEVEL = "DEBUG"  # ("DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR")
+LOG_JSON = False  # to write logs as JSON lines
+LOG_COMPRESSION = 'gz'  # of rotated log files, None to keep them as is
+LOG_SAMPLE_EVERY = 50  # every n-th repetitive per-slot event is logged
+
+
+class ArtifactData:  # snapshots and screenshots
+    PATH = 'artifacts'
+    MAX_SIZE = 500 * 1024 ** 2  # in bytes, None to keep any size
+    MAX_AGE = 30  # in days, None to keep forever
+    RETENTION_INTERVAL = 60 * 60  # in seconds
+    QUEUE_SIZE = 32  # max number of artifacts waiting to be written
+    DROP_POLICY = 'oldest'  # ('oldest', 'newest') to drop if queue is full
+
+
+class MetricsData:
+    PORT = None  # serve Prometheus metrics on localhost, e.g. 9100
+    DUMP_PATH = None  # dump metrics to the file, e.g. 'metrics.prom'
+    DUMP_INTERVAL = 60  # in seconds
+
+
+class TracingData:  # Chrome trace-event files, viewable in Perfetto
+    SAMPLE_RATE = 0  # share of traced check cycles, from 0 (off) to 1
+    PATH = 'traces'
+
+
+class NotificationData:  # Telegram notifications, sent in background
+    WORKERS = 4  # number of chats notified concurrently
+    CHAT_RATE = 1  # max messages per second to a chat
+    CHAT_BURST = 3  # max messages to a chat at once
+    GLOBAL_RATE = 25  # max messages per second to all chats
+    MAX_ATTEMPTS = 5  # to send a message, including retries
+    BACKOFF = 1  # in seconds, doubled with every retry
+    MAX_BACKOFF = 60  # in seconds
+    # in seconds, events of a chat are merged into one message meanwhile
+    COALESCE_WINDOW = 30
+    # in seconds, identical errors are reported once meanwhile with counts
+    ERROR_REPEAT_INTERVAL = 60 * 60
+    # photos are downscaled to fit, Telegram shows them at 1280 at most
+    PHOTO_MAX_SIDE = 1280  # in pixels
+    PHOTO_MAX_SIZE = 512 * 1024  # in bytes, recompressed as JPEG otherwise
 
 
 class RequestTimeout:
@@ -39,14 +77,37 @@ class RequestTimeout:
 
 PROXIES = []
 PAGE_LOAD_TIMEOUT = 10  # max number of seconds to load the page
+SCRIPT_TIMEOUT = 120  # max number of seconds of asynchronous page scripts
+STARTUP_CONCURRENCY = 4  # max number of crawlers initialized at once
+# in seconds, doubled with every failure to open the tab of a dependent
+DEPENDENT_TAB_BACKOFF = 10 * 60
+DEPENDENT_TAB_MAX_BACKOFF = 6 * 60 * 60  # in seconds
 
 DISABLE_APPOINTMENT_CHECKS_STATUS = 'Under review'
 
 
+class WaitData:
+    POLL_FREQUENCY = 0.05  # in seconds, of checking the awaited conditions
+    ELEMENT_TIMEOUT = 0.5  # in seconds, for an element to be present
+    # turns of the page's event loop for an action to issue its postback
+    POSTBACK_GRACE_TURNS = 2
+    POSTBACK_TIMEOUT = 10  # in seconds, for a postback to complete
+    NETWORK_IDLE_TIME = 0.5  # in seconds without requests in flight
+    # in seconds, requests in flight longer are not waited for idle network
+    INFLIGHT_TTL = 5
+    # 'instant' - inputs are filled at once
+    # 'human' - symbol by symbol with `TYPING_DELAY` in between
+    TYPING_MODE = 'instant'
+    TYPING_DELAY = 0.1  # in seconds
+
+
 class AppointmentData:
     PRIORITY_OFFICES = []
     BLOCKED_OFFICES = []
     HOUR_OFFICE_OFFSET = 3
+    # enumerate slots by a script posting the selects back in the page,
+    #   otherwise every option is selected via WebDriver
+    ENUMERATE_IN_PAGE = True
 
 
 class ChromeData:
@@ -56,3 +117,41 @@ class ChromeData:
         else 'killall chrome'
     )
     HEADLESS: bool = False
+    # 'wire' - through selenium-wire, requests can be intercepted
+    # 'native' - plain selenium, proxies are set by the generated extension
+    DRIVER_MODE = 'wire'
+    # read DOM and take screenshots via Chrome DevTools Protocol if possible
+    USE_CDP = True
+
+
+class CaptureData:  # selenium-wire storage of captured requests
+    SCOPES = []  # url regexes to capture and intercept, empty for all
+    MAX_SIZE = 100  # max number of requests kept in memory
+    PURGE_INTERVAL = 10 * 60  # in seconds
+    # directory to record traffic of every driver to, None to disable
+    RECORD_PATH = None
+    # recorded fixture to serve instead of the portal, None to disable
+    REPLAY_PATH = None
+    # form fields redacted in the recorded requests
+    REDACTED_FIELDS = ['txtUtilizador', 'txtChaveAcesso']
+    # read agenda selects from intercepted postback responses
+    PARSE_POSTBACKS = True
+    POSTBACK_GRACE = 0.5  # in seconds, for a postback to be sent
+    POSTBACK_TIMEOUT = 10  # in seconds, for a postback to be answered
+
+
+class ResourcePolicy:
+    ENABLED = True
+    # ('image', 'font', 'stylesheet', 'media', 'script')
+    BLOCKED_TYPES = ['image', 'font', 'stylesheet', 'media']
+    BLOCKED_DOMAINS = []
+    # block assets of other domains, their pages, scripts and XHR are kept
+    BLOCK_THIRD_PARTY = False
+    # last segment of page path -> resource types needed on that page
+    PAGE_EXCEPTIONS = {
+        'ARIApplication.aspx': ['stylesheet'],  # for `status_screenshot`
+    }
+    FALLBACK_SIZES = {  # in bytes, used until real sizes are seen
+        'image': 15 * 1024, 'font': 40 * 1024, 'stylesheet': 10 * 1024,
+        'media': 200 * 1024, 'script': 30 * 1024, 'third-party': 20 * 1024,
+    }
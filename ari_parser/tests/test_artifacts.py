@@ -0,0 +1,38 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def store(settings, monkeypatch, tmp_path):
+    artifacts = pytest.importorskip('models.artifacts')
+    store = artifacts.ArtifactStore()
+    monkeypatch.setattr(store, 'root', str(tmp_path))
+    monkeypatch.setattr(store, 'max_age', None)
+    monkeypatch.setattr(artifacts, 'RETENTION_BATCH', 2)
+    for entry in store.find():
+        store._db.delete_artifact(entry['id'])
+    return store
+
+
+def screenshot(data: bytes, minutes: int):
+    from models.artifacts import Artifact
+    return Artifact(
+        'screenshot', 'user@example.com', 'Home.aspx',
+        base64.b64encode(data).decode(),
+        datetime.utcnow() - timedelta(minutes=minutes)
+    )
+
+
+def test_retention_by_size(store, monkeypatch):
+    # 'a' is referenced by the oldest and the newest entries
+    for data, minutes in [
+                (b'a' * 100, 6), (b'b' * 100, 5), (b'c' * 100, 4),
+                (b'd' * 100, 3), (b'e' * 100, 2), (b'a' * 100, 1),
+            ]:
+        store.add(screenshot(data, minutes))
+    monkeypatch.setattr(store, 'max_size', 250)
+    assert store.enforce_retention() == 4
+    assert [store.read(x) for x in store.find()] == [b'e' * 100, b'a' * 100]
+    assert store._db.get_total_size() == 200
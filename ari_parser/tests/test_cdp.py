@@ -0,0 +1,61 @@
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def cdp(settings):
+    return pytest.importorskip('models.cdp')
+
+
+def make_client(cdp, messages):
+    """
+    Client reading the messages, without a browser.
+    """
+    class WebSocket:
+        def recv(self):
+            if not messages:
+                raise ConnectionError('closed')
+            return json.dumps(messages.pop(0))
+
+        def close(self):
+            pass
+
+    client = cdp.CDPClient.__new__(cdp.CDPClient)
+    client._ws = WebSocket()
+    client._pending = {}
+    client._listeners = {}
+    client._condition = threading.Condition()
+    client.is_closed = False
+    return client
+
+
+def test_read_loop_survives_listeners(cdp):
+    client = make_client(cdp, [
+        {'unexpected': True},
+        {'method': 'Page.loadEventFired', 'params': {}},
+        {'method': 'Page.loadEventFired', 'params': {'ok': True}},
+        {'id': 1, 'result': {}},
+    ])
+    events = []
+
+    def listener(params):
+        events.append(params)
+        if not params:
+            raise KeyError('timestamp')
+
+    client.on('Page.loadEventFired', listener)
+    client._pending[1] = pending = [threading.Event(), None]
+    client._read_loop()
+    assert events == [{}, {'ok': True}]
+    assert pending[1] == {'id': 1, 'result': {}}
+
+
+def test_read_loop_closes_on_error(cdp):
+    client = make_client(cdp, [['not', 'a', 'message']])
+    client._pending[1] = pending = [threading.Event(), None]
+    client._read_loop()
+    # the waiting command fails at once
+    assert client.is_closed and pending[0].is_set()
+    assert 'error' in pending[1]
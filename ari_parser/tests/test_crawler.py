@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_read_dependents_statuses_fallback(settings, monkeypatch):
+    """
+    Statuses are read one by one if the table header is not recognized.
+    """
+    crawler_module = pytest.importorskip('crawler')
+    from models.exceptions import NoStatusException
+
+    class ApplicantsPage:
+        selected = None
+
+        def __init__(self, driver):
+            pass
+
+        @property
+        def applicants_statuses(self):
+            raise NoStatusException('no name column in []')
+
+        def set_applicant(self, name):
+            if name == 'Unknown':
+                raise ValueError(name)
+            self.selected = name
+
+        @property
+        def applicant_status(self):
+            return f'{self.selected} status'
+
+    monkeypatch.setattr(crawler_module, 'ApplicantsPage', ApplicantsPage)
+    crawler = SimpleNamespace(
+        driver=None,
+        account=SimpleNamespace(dependents=[
+            SimpleNamespace(name='John'), SimpleNamespace(name='Unknown')
+        ]),
+        logger=SimpleNamespace(warning=lambda *args, **kwargs: None),
+    )
+    assert crawler_module.Crawler._read_dependents_statuses(crawler) == {
+        'John': 'John status'
+    }
+
+
+def test_applicants_to_schedule(settings):
+    """
+    Dependents are booked by id, signed and disabled ones are skipped.
+    """
+    Crawler = pytest.importorskip('crawler').Crawler
+
+    def applicant(id_, signed=False, status=None):
+        return SimpleNamespace(
+            id=id_, is_signed=signed, updates=SimpleNamespace(status=status)
+        )
+
+    account = applicant(0)
+    account.dependents = [
+        applicant(3), applicant(1),
+        applicant(2, status=settings.DISABLE_APPOINTMENT_CHECKS_STATUS),
+        applicant(4, signed=True),
+    ]
+    crawler = SimpleNamespace(account=account)
+    crawler.dependents_to_schedule = (
+        lambda: Crawler.dependents_to_schedule(crawler)
+    )
+    assert [x.id for x in Crawler.applicants_to_schedule(crawler)] == [
+        0, 1, 3
+    ]
+    account.is_signed = True
+    assert [x.id for x in Crawler.applicants_to_schedule(crawler)] == [1, 3]
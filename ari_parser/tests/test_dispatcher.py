@@ -0,0 +1,59 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def dispatcher_module(settings):
+    return pytest.importorskip('models.dispatcher')
+
+
+def test_retry_after(dispatcher_module):
+    from models.exceptions import RateLimitedException
+    attempts = []
+
+    def send(notification):
+        attempts.append(notification.text)
+        if len(attempts) == 1:
+            raise RateLimitedException(0.05)
+
+    dispatcher = dispatcher_module.Dispatcher(send, workers=2)
+    for text in ('first', 'second'):
+        dispatcher.put(dispatcher_module.Notification(1, text))
+    assert dispatcher.join(timeout=5)
+    # the chat is paused, so its notifications keep their order
+    assert attempts == ['first', 'first', 'second']
+    assert (dispatcher.sent, dispatcher.retried) == (2, 1)
+
+
+def test_photo_fan_out(dispatcher_module):
+    """
+    The photo is uploaded to the fake Bot API once, shrunk.
+    """
+    telebot = pytest.importorskip('telebot')
+    Image = pytest.importorskip('PIL.Image')
+    from io import BytesIO
+    from benchmarks.fake_bot_api import FakeBotAPI
+
+    buffer = BytesIO()
+    Image.effect_noise((2560, 1440), 64).save(buffer, 'PNG')
+    api = FakeBotAPI()
+    api.start()
+    telebot.apihelper.API_URL = api.api_url
+    bot = telebot.TeleBot('TOKEN')
+    dispatcher = dispatcher_module.Dispatcher(
+        lambda x: x.photo.send(lambda photo: bot.send_photo(
+            x.chat_id, photo, x.text
+        ).photo[-1].file_id)
+    )
+    photo = dispatcher_module.Photo(buffer.getvalue())
+    try:
+        for chat_id in range(1, 6):
+            dispatcher.put(dispatcher_module.Notification(
+                chat_id, 'Status: Approved', photo=photo
+            ))
+        assert dispatcher.join(timeout=10)
+    finally:
+        api.stop()
+    assert (dispatcher.sent, api.count('sendPhoto')) == (5, 5)
+    assert photo.uploaded < len(buffer.getvalue())
+    # the other chats get the photo by file_id, without its bytes
+    assert photo.uploaded <= api.uploaded('sendPhoto') < photo.uploaded + 4096
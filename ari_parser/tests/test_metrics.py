@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def metrics():
+    return pytest.importorskip('utils.metrics')
+
+
+def test_metric_is_abstract(metrics):
+    with pytest.raises(TypeError):
+        metrics.Metric('ari_test', 'Test')
+
+
+def test_dumping_survives_os_error(metrics, monkeypatch, tmp_path):
+    pytest.importorskip('loguru')
+    dump = metrics.Registry.dump
+    calls = []
+
+    def flaky_dump(self, filename):
+        calls.append(filename)
+        if len(calls) == 1:
+            raise OSError(28, 'No space left on device')
+        dump(self, filename)
+
+    monkeypatch.setattr(metrics.Registry, 'dump', flaky_dump)
+    filename = tmp_path / 'metrics.prom'
+    metrics.start_dumping(str(filename), 0.01)
+    deadline = time.monotonic() + 5
+    while not filename.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert filename.exists() and len(calls) > 1
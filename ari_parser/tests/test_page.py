@@ -0,0 +1,14 @@
+import pytest
+
+
+def test_parse_statuses_unknown_header(settings):
+    page = pytest.importorskip('models.page')
+    from models.exceptions import NoStatusException
+    rows = [['', 'Name', 'Status'], ['', 'John Doe', 'Approved']]
+    assert page.ApplicantsPage.parse_statuses(rows) == {
+        'John Doe': 'Approved'
+    }
+    with pytest.raises(NoStatusException):
+        page.ApplicantsPage.parse_statuses(
+            [['', 'Requerente', 'Fase'], ['', 'John Doe', 'Approved']]
+        )
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_enumerator_is_not_postback(settings):
+    """
+    Requests of the slot enumerator do not feed the agenda selects.
+    """
+    Driver = pytest.importorskip('models.driver').Driver
+    from models.page import AppointmentPage
+    from models.postback import ENUMERATOR_HEADER, ENUMERATOR_SCRIPT
+
+    assert f"'{ENUMERATOR_HEADER}': '1'" in ENUMERATOR_SCRIPT
+    postback = SimpleNamespace(
+        method='POST', url=AppointmentPage.URL.url, headers={}
+    )
+    assert Driver._is_postback(postback)
+    postback.headers[ENUMERATOR_HEADER] = '1'
+    assert not Driver._is_postback(postback)
+
+
+def test_select_feed_reset():
+    """
+    Deltas are not merged into states of another page or tab.
+    """
+    from models.postback import SelectFeed, SelectState
+
+    def state(selected):
+        return SelectState(['a', 'b'], ['1', '2'], selected)
+
+    feed = SelectFeed()
+    feed.add_request()
+    feed.add_response({'branch': state(0), 'month': state(0)}, partial=False)
+    mark = feed.mark()
+    feed.add_request()
+    feed.add_response({'month': state(1)}, partial=True)
+    assert feed.wait(mark, grace=0, timeout=0) == {
+        'branch': state(0), 'month': state(1)
+    }
+    feed.reset()  # e.g. switched to a dependent tab
+    mark = feed.mark()
+    feed.add_request()
+    feed.add_response({'day': state(1)}, partial=True)
+    assert feed.wait(mark, grace=0, timeout=0) == {'day': state(1)}
@@ -0,0 +1,43 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+EMAIL = 'user@example.com'
+
+
+@pytest.fixture(scope='module')
+def recording(settings):
+    return pytest.importorskip('models.recording')
+
+
+def test_gzipped_response_is_redacted(recording, tmp_path):
+    filename = str(tmp_path / 'fixture.jsonl.gz')
+    recorder = recording.Recorder(filename, fields=[], secrets=[EMAIL])
+    request = SimpleNamespace(
+        method='POST', url='https://example.com/ARIRF/Home.aspx',
+        headers={'Cookie': 'session=1'},
+        body=f'email={EMAIL.replace("@", "%40")}&lang=en'.encode()
+    )
+    response = SimpleNamespace(
+        status_code=200, reason='OK',
+        headers={'Content-Encoding': 'gzip', 'Content-Type': 'text/html'},
+        body=gzip.compress(f'<span>{EMAIL}</span>'.encode())
+    )
+    recorder.add(request, response)
+    recorder.close()
+
+    exchange, = recording.Fixture.load(filename, fields=[]).exchanges
+    assert exchange.body == f'<span>{recording.REDACTED}</span>'.encode()
+    assert 'content-encoding' not in {k.lower() for k, _ in exchange.headers}
+    assert b'example.com' not in exchange.request_body
+    assert dict(exchange.request_headers)['Cookie'] == recording.REDACTED
+
+
+def test_secrets_in_url_are_redacted(recording):
+    exchange = recording.redact(recording.Exchange(
+        'GET', f'https://example.com/?email={EMAIL.replace("@", "%40")}',
+        (), b'', 200, 'OK', (), b''
+    ), secrets=[EMAIL])
+    assert 'example.com/?email=' in exchange.url
+    assert EMAIL.split('@')[0] not in exchange.url
@@ -0,0 +1,41 @@
+import pytest
+
+
+@pytest.fixture
+def policy(settings):
+    from models.resources import ResourcePolicy
+    return ResourcePolicy(
+        domain='example.com', blocked_types=['image', 'stylesheet'],
+        blocked_domains=['ads.example.net'], block_third_party=True
+    )
+
+
+def test_third_party_assets_are_blocked(policy):
+    assert policy.block_reason('https://cdn.net/logo.png') == 'image'
+    assert policy.block_reason('https://cdn.net/pixel') == 'third-party'
+    assert policy.block_reason(
+        'https://cdn.net/font', dest='font'
+    ) == 'font'
+
+
+def test_third_party_scripts_and_pages_are_kept(policy):
+    # e.g. MicrosoftAjax from a CDN, captcha and Cloudflare challenge
+    assert policy.block_reason('https://cdn.net/MicrosoftAjax.js') is None
+    assert policy.block_reason(
+        'https://challenges.cloudflare.com/turnstile', dest='script'
+    ) is None
+    assert policy.block_reason(
+        'https://captcha.net/frame', accept='text/html,*/*'
+    ) is None
+    assert policy.block_reason('https://api.net/check', dest='empty') is None
+    # unless the domain is listed
+    assert policy.block_reason(
+        'https://ads.example.net/ad.js', dest='script'
+    ) == 'script'
+
+
+def test_first_party(policy):
+    assert policy.block_reason('https://example.com/ARIRF/Home.aspx') is None
+    assert policy.block_reason('https://www.example.com/a.css') == (
+        'stylesheet'
+    )
@@ -0,0 +1,45 @@
+import pickle
+
+import pytest
+
+BASE_URL = 'https://example.com/ARIRF'
+URL_WITH_PARAMS = (
+    f'{BASE_URL}/Account/Entrada.aspx?ReturnUrl=%2fARIRF%2fARIAgenda.aspx'
+    '&lang=en&lang=pt'
+)
+
+
+@pytest.fixture
+def url():
+    from utils.url import Url
+    return Url(URL_WITH_PARAMS)
+
+
+def test_params_round_trip(url):
+    params = url.params
+    assert params['ReturnUrl'] == '/ARIRF/ARIAgenda.aspx'
+    assert params['lang'] == ['en', 'pt']
+    # the escapes are re-encoded in upper case, the params stay the same
+    assert url.with_params(params).params == params
+    assert url.with_params(params) == url
+
+
+def test_eq_and_hash(url):
+    from utils.url import Url
+    assert Url(URL_WITH_PARAMS) == URL_WITH_PARAMS
+    assert url == Url(URL_WITH_PARAMS) == Url.intern(URL_WITH_PARAMS)
+    # the query is ignored by both equality and hash
+    other = Url(f'{BASE_URL}/Account/Entrada.aspx')
+    assert url == other and hash(url) == hash(other)
+    assert hash(other) == hash(other.url) and other == other.url
+    assert url != f'{BASE_URL}/ARIApplication.aspx'
+    assert {url: 1}[other] == 1
+
+
+def test_pickle(url):
+    from utils.url import Url
+    for value in (url, Url.intern(URL_WITH_PARAMS)):
+        restored = pickle.loads(pickle.dumps(value))
+        assert restored == value and hash(restored) == hash(value)
+        assert restored.url == value.url
+        assert restored.params == value.params
@@ -1,9 +1,11 @@
 import collections
+import collections.abc
 import re
 import threading
+import time
 from contextlib import contextmanager
 from functools import wraps
-from typing import Iterable, TypeVar, Union, Callable, Iterator
+from typing import Iterable, TypeVar, Union, Callable, Iterator, Hashable
 
 T = TypeVar('T')
 S = TypeVar('S')
@@ -20,15 +22,15 @@ def safe_iter(iterable: Iterator[T], default_value: S = None) -> Union[T, S]:
     Yields:
         Union[T, S]: T if it is from iterable else S
     """
-    try:
-        while True:
-            try:
-                yield next(iterable)
-            except Exception:
-                pass
-    except StopIteration:
-        while True:
-            yield default_value
+    while True:
+        try:
+            yield next(iterable)
+        except StopIteration:
+            break
+        except Exception:
+            pass
+    while True:
+        yield default_value
 
 
 class Default:
@@ -75,6 +77,36 @@ class Default:
         self.__stash_count = self.default_stash_count
 
 
+class EventSampler:
+    """
+    Count repetitive events and let through only every n-th of them.
+    Usage:
+        ```
+        >>> sampler = EventSampler(every=2)
+        >>> [sampler('day offset') for _ in range(3)]
+        [True, False, True]
+        >>> sampler.flush()
+        {'day offset': 3}
+        ```
+    
+    Attributes:
+        every (int): every n-th event is let through, 1st included
+        counts (dict[Hashable, int]): events counted since last flush
+    """
+
+    def __init__(self, every: int):
+        self.every = max(every, 1)
+        self.counts = collections.Counter()
+
+    def __call__(self, event: Hashable) -> bool:
+        self.counts[event] += 1
+        return self.counts[event] % self.every == 1 % self.every
+
+    def flush(self) -> dict[Hashable, int]:
+        counts, self.counts = dict(self.counts), collections.Counter()
+        return counts
+
+
 def xor(parameters: list[str]):
     """
     Accept only one of given parameters.
@@ -126,6 +158,26 @@ def cleared(event: threading.Event) -> None:
         event.set()
 
 
+@contextmanager
+def timed(timings: dict[str, float], name: str) -> None:
+    """
+    Measure execution time of the code block and add it to timings.
+    Used as a context manager
+    
+    Args:
+        timings (dict[str, float]): name mapped to seconds spent
+        name (str): name of the code block
+    
+    Yields:
+        None: ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+
+
 @contextmanager
 def waited(event: threading.Event) -> None:
     """
@@ -143,7 +195,7 @@ def waited(event: threading.Event) -> None:
     yield
 
 
-class FrozenDict(collections.Mapping):
+class FrozenDict(collections.abc.Mapping):
     """
     Immutable dict.
     Can be hashed and used in usual dict keys
@@ -211,10 +263,14 @@ def validate_email(s: str) -> bool:
 
 class Singleton(type):
     _instances = {}
+    # reentrant, as singletons may create other singletons on init
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(
-                *args, **kwargs
-            )
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(Singleton, cls).__call__(
+                        *args, **kwargs
+                    )
         return cls._instances[cls]
@@ -0,0 +1,31 @@
+from io import BytesIO
+
+from PIL import Image
+
+
+def shrink(data: bytes, *, max_side: int, max_size: int) -> bytes:
+    """
+    Downscale the image to fit `max_side` and recompress it, as JPEG
+        if PNG still exceeds `max_size`.
+
+    Args:
+        data (bytes): PNG or JPEG image
+        max_side (int): in pixels
+        max_size (int): in bytes
+
+    Returns:
+        bytes: the smaller of the shrunk and the original images
+    """
+    with Image.open(BytesIO(data)) as image:
+        if len(data) <= max_size and max(image.size) <= max_side:
+            return data
+        image.thumbnail((max_side, max_side))
+        buffer = BytesIO()
+        image.save(buffer, 'PNG', optimize=True)
+        if buffer.tell() > max_size:
+            buffer = BytesIO()
+            image.convert('RGB').save(
+                buffer, 'JPEG', quality=85, optimize=True
+            )
+    shrunk = buffer.getvalue()
+    return shrunk if len(shrunk) < len(data) else data
@@ -0,0 +1,307 @@
+import abc
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+
+from . import Singleton
+
+LabelsKey = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120
+)
+
+
+def _labels_key(labels: dict[str, object]) -> LabelsKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelsKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[str]:
+        """
+        Lines of the metric in Prometheus text format, without comments.
+        """
+        pass
+
+    def render(self) -> str:
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.TYPE}',
+            *self.samples()
+        ])
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: dict[LabelsKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(key)} {_format_value(value)}'
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Histogram with cumulative buckets for Prometheus.
+    The most recent observations are kept to compute exact quantiles,
+        e.g. p50 and p99, which are exported as `<name>_recent` gauge.
+    """
+    TYPE = 'histogram'
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(
+                self, name: str, documentation: str,
+                *, buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+                reservoir_size: int = 1024
+            ):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'), )
+        self.reservoir_size = reservoir_size
+        self._counts: dict[LabelsKey, list[int]] = {}
+        self._sums: dict[LabelsKey, float] = {}
+        self._recent: dict[LabelsKey, deque] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            if key not in self._counts:
+                self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+                self._recent[key] = deque(maxlen=self.reservoir_size)
+            self._counts[key][bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] += value
+            self._recent[key].append(value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[dict[str, object]]:
+        """
+        Observe execution time of the code block.
+        Labels can be changed inside the block via the yielded dict.
+        Usage:
+            ```
+            >>> with histogram.time(result='ok') as labels:
+            ...     if not book():
+            ...         labels['result'] = 'failed'
+            ```
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Compute quantile of the recent observations.
+
+        Args:
+            q (float): from 0 to 1, e.g. 0.99
+            **labels: labels of the observations
+
+        Returns:
+            Optional[float]: None if nothing was observed
+        """
+        with self._lock:
+            values = sorted(self._recent.get(_labels_key(labels), ()))
+        if not values:
+            return None
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return sum(self._counts.get(_labels_key(labels), ()))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+        for key in sorted(counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts[key]):
+                cumulative += count
+                labels = _format_labels(key, le=_format_value(bound))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(key)
+            yield f'{self.name}_sum{labels} {_format_value(sums[key])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+    def render(self) -> str:
+        with self._lock:
+            keys = sorted(self._counts)
+        recent = [
+            f'{self.name}_recent'
+            f'{_format_labels(key, quantile=str(q))} '
+            f'{_format_value(self.quantile(q, **dict(key)))}'
+            for key in keys for q in self.QUANTILES
+        ]
+        return '\n'.join([
+            super().render(),
+            f'# HELP {self.name}_recent Quantiles of recent observations',
+            f'# TYPE {self.name}_recent gauge',
+            *recent
+        ])
+
+
+class Registry(metaclass=Singleton):
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            metric = self._metrics[name]
+        if type(metric) is not cls:
+            raise ValueError(f'{name!r} is already registered as other type')
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in Prometheus text exposition format.
+
+        Returns:
+            str
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def dump(self, filename: str) -> None:
+        """
+        Write all metrics to the file atomically.
+
+        Args:
+            filename (str): path to the file
+        """
+        os.makedirs(os.path.dirname(filename) or os.curdir, exist_ok=True)
+        with open(f'{filename}.tmp', 'w') as file:
+            file.write(self.render())
+        os.replace(f'{filename}.tmp', filename)
+
+
+def counter(name: str, documentation: str) -> Counter:
+    return Registry()._get_or_create(Counter, name, documentation)
+
+
+def gauge(name: str, documentation: str) -> Gauge:
+    return Registry()._get_or_create(Gauge, name, documentation)
+
+
+def histogram(name: str, documentation: str, **kwargs) -> Histogram:
+    return Registry()._get_or_create(Histogram, name, documentation, **kwargs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = Registry().render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve metrics on http://host:port/metrics in a background thread.
+
+    Args:
+        port (int): port to listen to
+        host (str, optional): interface to listen to, local by default
+
+    Returns:
+        ThreadingHTTPServer: started server
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_dumping(filename: str, interval: float) -> threading.Thread:
+    """
+    Dump metrics to the file periodically in a background thread.
+
+    Args:
+        filename (str): path to the file
+        interval (float): seconds between dumps
+
+    Returns:
+        threading.Thread: started thread
+    """
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                Registry().dump(filename)
+            except OSError as e:
+                # imported here, so that models.db imports without loguru
+                from loguru import logger
+
+                # e.g. the disk is full, next dumps may succeed
+                logger.error('Unable to dump metrics to {}: {}', filename, e)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
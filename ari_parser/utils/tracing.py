@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+
+class Trace:
+    """
+    Spans of a single traced operation in Chrome trace-event format,
+        viewable in Perfetto or chrome://tracing.
+    """
+
+    def __init__(self, name: str, tags: dict[str, object]):
+        self.name = name
+        self.tags = tags
+        self.created = datetime.utcnow()
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(
+                self, name: str, start: float, end: float,
+                tags: dict[str, object]
+            ) -> None:
+        thread = threading.current_thread()
+        with self._lock:
+            self.events.append({
+                'name': name, 'cat': self.name, 'ph': 'X',
+                'ts': start * 1e6, 'dur': (end - start) * 1e6,
+                'pid': os.getpid(), 'tid': thread.ident,
+                'args': {k: str(v) for k, v in tags.items()},
+            })
+
+    def to_dict(self) -> dict:
+        threads = {
+            event['tid']: thread.name
+            for thread in threading.enumerate() for event in self.events
+            if event['tid'] == thread.ident
+        }
+        metadata = [
+            {
+                'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(),
+                'tid': tid, 'args': {'name': name}
+            } for tid, name in threads.items()
+        ]
+        return {
+            'traceEvents': metadata + self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {k: str(v) for k, v in self.tags.items()},
+        }
+
+    @property
+    def filename(self) -> str:
+        now = self.created.strftime('%Y-%m-%d_%H-%M-%S-%f')
+        account = re.sub(r'[^\w.@-]', '_', str(self.tags.get('account', '')))
+        return f'{now}__{self.name}{"__" if account else ""}{account}.json'
+
+
+class _Span:
+    def __init__(self, name: str, tags: dict[str, object]):
+        self.name = name
+        self.tags = tags
+
+
+class Tracer:
+    """
+    Trace operations as trees of timed spans.
+    A trace is started by `trace()` and is sampled with `sample_rate`
+        probability; spans outside of a sampled trace cost nearly nothing.
+    Traces are written as Chrome trace-event JSON files to `path`.
+    """
+
+    def __init__(self, *, sample_rate: float = 0, path: str = 'traces'):
+        self.sample_rate = sample_rate
+        self.path = path
+        self._local = threading.local()
+
+    def configure(
+                self, *, sample_rate: Optional[float] = None,
+                path: Optional[str] = None
+            ) -> None:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if path is not None:
+            self.path = path
+
+    @property
+    def current(self) -> Optional[Trace]:
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def trace(self, name: str, **tags) -> Iterator[Optional[Trace]]:
+        """
+        Start a trace of the code block in the current thread.
+        Tags can be added later via `tag()`.
+
+        Args:
+            name (str): name of the traced operation
+            **tags: e.g. account, proxy
+
+        Yields:
+            Optional[Trace]: None if the trace is not sampled
+        """
+        if self.current is not None or random.random() >= self.sample_rate:
+            yield None
+            return
+        trace = self._local.trace = Trace(name, tags)
+        self._local.spans = []
+        try:
+            with self.span(name, **tags):
+                yield trace
+        finally:
+            self._local.trace = None
+            self.export(trace)
+
+    @contextmanager
+    def span(self, name: str, **tags) -> Iterator[None]:
+        """
+        Time the code block as a span of the current trace.
+
+        Args:
+            name (str): name of the step
+            **tags: e.g. office, select
+        """
+        trace = self.current
+        if trace is None:
+            yield
+            return
+        span = _Span(name, tags)
+        self._local.spans.append(span)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.add(name, start, time.perf_counter(), span.tags)
+            # spans of generators may be closed out of order
+            self._local.spans.remove(span)
+
+    def tag(self, **tags) -> None:
+        """
+        Add tags to the innermost span and to the trace itself.
+        """
+        if (trace := self.current) is None:
+            return
+        trace.tags.update(tags)
+        if self._local.spans:
+            self._local.spans[-1].tags.update(tags)
+
+    def export(self, trace: Trace) -> str:
+        """
+        Write the trace to `path`.
+
+        Args:
+            trace (Trace): trace to be written
+
+        Returns:
+            str: name of the written file
+        """
+        os.makedirs(self.path, exist_ok=True)
+        filename = os.path.join(self.path, trace.filename)
+        with open(filename, 'w') as file:
+            json.dump(trace.to_dict(), file)
+        return filename
+
+
+tracer = Tracer()
+trace = tracer.trace
+span = tracer.span
+tag = tracer.tag
@@ -1,42 +1,94 @@
-from dataclasses import dataclass
+from functools import lru_cache
 from typing import Union
-from urllib.parse import urlparse
+from urllib.parse import parse_qsl, quote, urlencode, urlparse
+
+INTERN_SIZE = 256  # max number of interned urls
+
+
+def _split(url: str) -> tuple[str, str]:
+    """
+    Split the url into path and query, as compared by `Url`.
+
+    Returns:
+        tuple[str, str]: path and query without '?'
+    """
+    url = url.rstrip('/')
+    index = url.rfind('?')
+    if index == -1:
+        return url, ''
+    return url[:index], url[index + 1:]
 
 
-@dataclass(eq=False)
 class Url(object):
-    url: str
+    """
+    Immutable url, parsed once on creation.
+    Urls are equal if their paths are equal, the query is ignored.
+    Equal urls created by `Url.intern()` are the same object.
+    """
+    __slots__ = ('url', 'path', '_query', '_params', '_domain', '_hash')
+
+    def __init__(self, url: str):
+        set_ = object.__setattr__
+        set_(self, 'url', url.rstrip('/'))
+        path, query = _split(self.url)
+        set_(self, 'path', path)
+        set_(self, '_query', query)
+        set_(self, '_params', None)
+        set_(self, '_domain', None)
+        set_(self, '_hash', hash(path))
 
-    def __post_init__(self):
-        self.url = self.url.rstrip('/')
+    @staticmethod
+    @lru_cache(maxsize=INTERN_SIZE)
+    def intern(url: str) -> 'Url':
+        """
+        Get the shared instance of the url.
+        Suits the fixed page urls and urls reported by the browser,
+            which repeat all the time.
 
-    @property
-    def path(self):
-        if '?' not in self.url:
-            return self.url
-        return self.url[:self.url.rfind('?')]
+        Args:
+            url (str)
+
+        Returns:
+            Url
+        """
+        return Url(url)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
 
     @property
-    def domain(self):
-        return urlparse(self.url).netloc
+    def domain(self) -> str:
+        if self._domain is None:
+            object.__setattr__(self, '_domain', urlparse(self.url).netloc)
+        return self._domain
 
     @property
-    def params(self):
-        if '?' not in self.url:
+    def params(self) -> dict[str, Union[str, list[str]]]:
+        if not self._query:
             return {}
-        return self.decode_params(self.url[self.url.rfind('?'):])
-
-    @params.setter
-    def params(self, params: dict[str, Union[str, list[str]]]):
-        if not params:
-            self.url = self.path
-        self.url = f'{self.path}{self.encode_params(params)}'
+        if self._params is None:
+            object.__setattr__(
+                self, '_params', self.decode_params(self._query)
+            )
+        # a copy, so that the cached params stay intact
+        return {
+            k: v[:] if isinstance(v, list) else v
+            for k, v in self._params.items()
+        }
+
+    def with_params(self, params: dict[str, Union[str, list[str]]]) -> 'Url':
+        """
+        Get the url with query replaced by the params.
+        """
+        return Url(f'{self.path}{self.encode_params(params)}')
 
     @staticmethod
-    def decode_params(params_str: str):
+    def decode_params(params_str: str) -> dict[str, Union[str, list[str]]]:
         result = {}
-        for param in params_str.lstrip('?').split('&'):
-            k, v = param.split('=', maxsplit=1)
+        for k, v in parse_qsl(params_str.lstrip('?'), keep_blank_values=True):
             if k in result:
                 if isinstance(result[k], list):
                     result[k].append(v)
@@ -47,15 +99,10 @@ class Url(object):
         return result
 
     @staticmethod
-    def encode_params(params: dict[str, Union[str, list[str]]]):
-        result_str = '?'
-        for k, v in params.items():
-            if isinstance(v, list):
-                for item in v:
-                    result_str += f"{k}={item}&"
-            else:
-                result_str += f"{k}={v}&"
-        return result_str.rstrip('&')
+    def encode_params(params: dict[str, Union[str, list[str]]]) -> str:
+        if not params:
+            return ''
+        return '?' + urlencode(params, doseq=True, quote_via=quote)
 
     @property
     def parent(self):
@@ -67,24 +114,38 @@ class Url(object):
         return Url(f"{self.url}/{other}")
 
     def __copy__(self):
-        return Url(self.url)
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self.url, )
 
     def rsplit(self):
         return self.parent, self.path.rsplit('/', maxsplit=1)[1]
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, self.__class__):
-            return self.path == other.path
+        if self is other:
+            return True
+        elif isinstance(other, self.__class__):
+            return self._hash == other._hash and self.path == other.path
         elif isinstance(other, str):
-            return self == Url(other)
+            return self.path == _split(other)[0]
         else:
             return False
 
+    def __hash__(self) -> int:
+        return self._hash
+
     def __add__(self, other: Union[str, dict]) -> 'Url':
         if isinstance(other, dict):
             return Url(f"{self.url}{self.encode_params(other)}")
         return Url(f"{self.url}{other}")
 
+    def __repr__(self):
+        return f'{self.__class__.__name__}(url={self.url!r})'
+
     def __str__(self):
         return self.url
 